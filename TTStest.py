@@ -10,6 +10,7 @@ import collections
 import webrtcvad
 from faster_whisper import WhisperModel
 from smolagents import CodeAgent, DuckDuckGoSearchTool, LiteLLMModel
+from utils.http_client import HttpClient
 
 # --- 配置区 ---
 VLLM_API_BASE = "http://192.168.123.100:18000/v1"
@@ -45,7 +46,7 @@ class TTSWorker(threading.Thread):
             }
 
             try:
-                response = requests.post(
+                response = HttpClient.shared().post(
                     self.api_url,
                     json=payload,
                     headers={"Content-Type": "application/json"},
@@ -166,7 +167,7 @@ def run_optimized_agent():
         for endpoint in endpoints:
             try:
                 print(f"  尝试连接: {endpoint}")
-                resp = requests.get(endpoint, timeout=3)
+                resp = HttpClient.shared().get(endpoint, timeout=3)
                 print(f"  ✓ 响应 {resp.status_code}: {resp.text[:100]}")
                 connected = True
                 break
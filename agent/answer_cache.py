@@ -0,0 +1,230 @@
+import re
+import threading
+import time
+from collections import Counter, OrderedDict
+from dataclasses import dataclass, field
+from typing import Callable, Dict, FrozenSet, Iterable, Optional, Set, Tuple
+import numpy as np
+from config.settings import AnswerCacheConfig
+from memory.embedder import HashingEmbedder
+from .router import is_follow_up
+
+# 代码读取了当前时间时记为这个伪工具，回答只能短暂复用
+CLOCK = "clock"
+# 回答依赖用户个人记忆或会改写记忆，不缓存
+NO_CACHE_TOOLS = frozenset({"recall_memory", "remember"})
+# final_answer 每轮都会调用，不影响有效期
+_IGNORED_TOOLS = frozenset({"final_answer"})
+_CLOCK_PATTERN = re.compile(r"\b(datetime|time\.(time|localtime|strftime|ctime)|date\.today)\b")
+
+_PUNCTUATION = re.compile(r"[\s\u3000-\u303f\uff00-\uff0f\uff1a-\uff20\uff3b-\uff40\uff5b-\uff65!-/:-@\[-`{-~]+")
+_LEADING_FILLERS = re.compile(r"^(请问|请|麻烦你?|一下|帮我|给我|那个|嗯|呃)+")
+_TRAILING_FILLERS = re.compile(r"(啊|呀|呢|吧|吗|嘛|哦|了|啦|呗)+$")
+# 两个问题之间只差这些字时视为同一问题
+_FILLER_CHARS = frozenset("啊呀呢吧吗嘛哦了啦呗的请问麻烦一下嗯呃")
+# 希望每次得到不同回答的请求
+_NO_CACHE_PATTERN = re.compile(r"再|换|另|随机|笑话|故事|诗")
+# 问到用户自己的问题，回答多半来自本会话的对话内容
+_PERSONAL_PATTERN = re.compile(r"我|咱")
+
+
+def normalize_query(text: str) -> str:
+    """去掉标点、空白和首尾的语气词/礼貌用语，英文转小写"""
+    text = _PUNCTUATION.sub("", text.lower())
+    text = _LEADING_FILLERS.sub("", text)
+    return _TRAILING_FILLERS.sub("", text)
+
+
+def refers_to_user(question: str) -> bool:
+    """问题是否问到用户自己（“我叫什么名字”），这类回答不能跨会话复用"""
+    return bool(_PERSONAL_PATTERN.search(question))
+
+
+def tools_in_code(code: str, tool_names: Iterable[str]) -> Set[str]:
+    """从 CodeAgent 生成的代码中找出调用过的工具"""
+    used = {name for name in tool_names if re.search(rf"\b{re.escape(name)}\(", code)}
+    if _CLOCK_PATTERN.search(code):
+        used.add(CLOCK)
+    return used
+
+
+def _only_fillers_differ(a: str, b: str) -> bool:
+    diff = (Counter(a) - Counter(b)) + (Counter(b) - Counter(a))
+    return all(char in _FILLER_CHARS for char in diff)
+
+
+@dataclass
+class CachedAnswer:
+    """一条缓存的回答"""
+    key: str
+    question: str
+    text: str
+    tools: FrozenSet[str]
+    expires_at: float
+    audio: Dict[str, bytes] = field(default_factory=dict)  # 句子 → 合成好的完整音频
+    hits: int = 0
+    context: str = ""  # 作用域：可能来自记忆的回答按命中的长期记忆或会话隔离，空串表示与记忆无关
+
+    @property
+    def slot(self) -> Tuple[str, str]:
+        return self.context, self.key
+
+
+class AnswerCache:
+    """
+    语音问答的回答缓存
+
+    先按归一化文本精确匹配，再用哈希向量找最相似的问题（只差语气词时才算命中，
+    避免“北京/上海”“今天/明天”这类只差一两个字的问题互相串用）。
+    有效期由回答用到的工具决定：天气几分钟、搜索半小时、不用工具的回答几小时；
+    读取当前时间的回答只保留几十秒，调用了记忆工具的回答不缓存。
+
+    可能来自记忆的回答（注入了长期记忆、问到用户自己）按调用方给出的作用域分开存放，
+    只在同一作用域内复用；其余回答存在公共作用域（空串），任何作用域下都可命中。
+    """
+
+    def __init__(self, config: AnswerCacheConfig, clock: Callable[[], float] = time.monotonic):
+        self.config = config
+        self._clock = clock
+        self._embedder = HashingEmbedder()
+        # (作用域, 归一化问题) → 条目
+        self._entries: "OrderedDict[Tuple[str, str], CachedAnswer]" = OrderedDict()
+        self._vectors: Dict[Tuple[str, str], np.ndarray] = {}
+        self._lock = threading.Lock()
+        self._tool_ttls = {
+            "get_weather": config.weather_ttl,
+            "get_weather_batch": config.weather_ttl,
+            "web_search": config.search_ttl,
+            "visit_webpage": config.search_ttl,
+            CLOCK: config.clock_ttl,
+        }
+        self._audio_bytes = 0
+        self.exact_hits = 0
+        self.similar_hits = 0
+        self.misses = 0
+        self.audio_reused = 0
+
+    def ttl_for(self, tools: Iterable[str]) -> float:
+        """按用到的工具取最短的有效期，0 表示不缓存"""
+        ttls = []
+        for tool in tools:
+            if tool in NO_CACHE_TOOLS:
+                return 0.0
+            if tool not in _IGNORED_TOOLS:
+                ttls.append(self._tool_ttls.get(tool, self.config.tool_ttl))
+        return min(ttls, default=self.config.static_ttl)
+
+    @staticmethod
+    def cacheable(question: str) -> bool:
+        """追问依赖上下文，要求换个说法的请求希望每次不同，都不缓存"""
+        key = normalize_query(question)
+        return bool(key) and not is_follow_up(question) and not _NO_CACHE_PATTERN.search(key)
+
+    def lookup(self, question: str, context: str = "") -> Optional[CachedAnswer]:
+        """
+        查找未过期的回答
+
+        Args:
+            context: 本轮的作用域，公共作用域的条目在任何作用域下都可复用
+        """
+        if not self.cacheable(question):
+            return None
+        key = normalize_query(question)
+        contexts = {context, ""}
+        with self._lock:
+            self._evict_expired()
+            entry = self._entries.get((context, key)) or self._entries.get(("", key))
+            if entry is not None:
+                self.exact_hits += 1
+            else:
+                entry = self._find_similar(key, contexts)
+                if entry is None:
+                    self.misses += 1
+                    return None
+                self.similar_hits += 1
+            entry.hits += 1
+            self._entries.move_to_end(entry.slot)
+            return entry
+
+    def _find_similar(self, key: str, contexts: Set[str]) -> Optional[CachedAnswer]:
+        slots = [slot for slot in self._vectors if slot[0] in contexts]
+        if not slots:
+            return None
+        scores = np.stack([self._vectors[slot] for slot in slots]) @ self._embedder.embed(key)
+        for i in np.argsort(-scores):
+            if scores[i] < self.config.similarity:
+                break
+            if _only_fillers_differ(key, slots[i][1]):
+                return self._entries[slots[i]]
+        return None
+
+    def put(self, question: str, answer: str, tools: Iterable[str], context: str = "") -> Optional[CachedAnswer]:
+        """
+        写入一轮回答
+
+        Args:
+            context: 回答的作用域，与记忆无关时为空串
+
+        Returns:
+            写入的条目；不可缓存时返回 None
+        """
+        tools = frozenset(tools)
+        ttl = self.ttl_for(tools)
+        if ttl <= 0 or not answer.strip() or not self.cacheable(question):
+            return None
+        key = normalize_query(question)
+        entry = CachedAnswer(
+            key=key, question=question, text=answer, tools=tools,
+            expires_at=self._clock() + ttl, context=context
+        )
+        with self._lock:
+            self._remove(entry.slot)
+            self._entries[entry.slot] = entry
+            self._vectors[entry.slot] = self._embedder.embed(key)
+            while len(self._entries) > self.config.max_entries:
+                self._remove(next(iter(self._entries)))
+        return entry
+
+    def attach_audio(self, entry: CachedAnswer, sentence: str, audio: bytes):
+        """保存一句合成好的音频，总量超限时丢掉最久未用条目的音频"""
+        with self._lock:
+            if self._entries.get(entry.slot) is not entry or sentence in entry.audio:
+                return
+            entry.audio[sentence] = audio
+            self._audio_bytes += len(audio)
+            for other in list(self._entries.values()):
+                if self._audio_bytes <= self.config.max_audio_bytes:
+                    break
+                self._drop_audio(other)
+
+    def audio_for(self, entry: CachedAnswer, sentence: str) -> Optional[bytes]:
+        audio = entry.audio.get(sentence)
+        if audio is not None:
+            self.audio_reused += 1
+        return audio
+
+    def _drop_audio(self, entry: CachedAnswer):
+        self._audio_bytes -= sum(len(audio) for audio in entry.audio.values())
+        entry.audio = {}
+
+    def _remove(self, slot: Tuple[str, str]):
+        entry = self._entries.pop(slot, None)
+        if entry is not None:
+            self._drop_audio(entry)
+            del self._vectors[slot]
+
+    def _evict_expired(self):
+        now = self._clock()
+        for slot in [slot for slot, entry in self._entries.items() if entry.expires_at <= now]:
+            self._remove(slot)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def summary(self) -> str:
+        hits = self.exact_hits + self.similar_hits
+        total = hits + self.misses
+        ratio = hits / total * 100 if total else 0.0
+        return (f"命中 {hits} (精确 {self.exact_hits}, 相似 {self.similar_hits}), 未命中 {self.misses} "
+                f"(命中率 {ratio:.0f}%), 复用音频 {self.audio_reused} 句, "
+                f"条目 {len(self)}, 音频 {self._audio_bytes / 1024 / 1024:.1f}MB")
@@ -1,4 +1,5 @@
 from abc import ABC, abstractmethod
+from typing import Iterator
 
 
 class BaseAgent(ABC):
@@ -17,6 +18,26 @@ class BaseAgent(ABC):
         """
         pass
 
+    def process_stream(self, user_input: str) -> Iterator[str]:
+        """
+        流式处理用户输入
+
+        Args:
+            user_input: 用户输入文本
+
+        Returns:
+            逐段产出的响应文本，默认整段返回
+        """
+        yield self.process(user_input)
+
+    def interrupt(self):
+        """用户插话：中止当前这一轮并将其标记为被打断"""
+        pass
+
+    def is_busy(self) -> bool:
+        """是否正在处理某一轮输入"""
+        return False
+
     @abstractmethod
     def is_ready(self) -> bool:
         """检查Agent是否就绪"""
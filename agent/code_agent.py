@@ -1,54 +1,523 @@
-from smolagents import CodeAgent, DuckDuckGoSearchTool, LiteLLMModel
+import copy
+import time
+import hashlib
+import uuid
+from dataclasses import dataclass
+from typing import Iterator, List, Optional, Set
+from smolagents import CodeAgent, DuckDuckGoSearchTool
+from smolagents.memory import ActionStep, FinalAnswerStep
+from smolagents.utils import AgentMaxStepsError
+from smolagents.models import ChatMessage, ChatMessageStreamDelta, MessageRole
 from .base import BaseAgent
-from .get_weather import WeatherTool
-from config.settings import AgentConfig, WeatherConfig
+from .get_weather import WeatherBatchTool, WeatherTool
+from .final_answer_stream import FinalAnswerStreamParser
+from .router import IntentRouter, ROUTE_AGENT, ROUTE_CACHE, ROUTE_CHAT, ROUTE_WEATHER
+from .memory import ConversationMemory, Turn
+from .instrumented_model import InstrumentedLiteLLMModel
+from utils.backend_pool import BackendPool
+from .memory_tools import RecallMemoryTool, RememberTool
+from .answer_cache import AnswerCache, CachedAnswer, refers_to_user, tools_in_code
+from memory.long_term import LongTermMemory
+from config.settings import AgentConfig, AnswerCacheConfig, MemoryConfig, WeatherConfig
+
+
+@dataclass
+class TurnInfo:
+    """最近一轮的执行情况（批量评测用）"""
+    route: str = ""
+    steps: int = 0  # CodeAgent 执行的步数，快速通道为 0
+    step_errors: int = 0  # 出错后重试的步数（代码执行或解析失败）
+    error: str = ""
 
 
 class SmolCodeAgent(BaseAgent):
     """
     基于 smolagents 的 Code Agent
-    具备上下文记忆能力
+    具备上下文记忆能力（按 token 预算滚动摘要）
     """
 
-    def __init__(self, agent_config: AgentConfig, weather_config: WeatherConfig):
+    # 提前播报的内容与最终答案不一致时，更正前的提示语
+    CORRECTION_PREFIX = "更正一下："
+
+    def __init__(
+            self,
+            agent_config: AgentConfig,
+            weather_config: WeatherConfig,
+            memory_config: Optional[MemoryConfig] = None,
+            cache_config: Optional[AnswerCacheConfig] = None
+    ):
         self.agent_config = agent_config
         self.weather_config = weather_config
         self.agent = None
+        self.model = None
+        self.weather_tool = None
+        self._tools = []
+        self._prompt_fingerprint = ""
+        self._turn_context = ""  # 本轮回答写入缓存时的作用域（见 _cache_scope）
+        self._session_key = uuid.uuid4().hex[:12]  # 问到用户自己的回答只在本会话内复用
+        # 快速通道：闲聊和简单天气查询不进入 CodeAgent 多步循环
+        self.router = IntentRouter(agent_config.chat_max_chars) if agent_config.fast_path else None
+        # 对话记忆：每轮 CodeAgent 都从空白开始（reset=True），只带上摘要和最近几轮问答，
+        # 执行步骤、生成的代码和观察结果不再跨轮累积
+        self.memory = self._new_memory()
+        # 长期记忆：跨会话保存问答与事实，按相关性注入上下文
+        self.long_term = None
+        if memory_config is not None and memory_config.enabled:
+            self.long_term = LongTermMemory(memory_config)
+        # 回答缓存：重复的提问直接复用上次的回答
+        self.answer_cache = None
+        if cache_config is not None and cache_config.enabled:
+            self.answer_cache = AnswerCache(cache_config)
+        # 本轮命中或写入的缓存条目，调用方可以把合成好的音频挂在上面
+        self.last_cached: Optional[CachedAnswer] = None
+        self.last_turn = TurnInfo()
+        # 插话状态：_interrupted 中止进行中的一轮，_last_turn_interrupted 提示下一轮上文被打断
+        self._busy = False
+        self._interrupted = False
+        self._last_turn_interrupted = False
         self._initialize()
 
     def _initialize(self):
         """初始化Agent"""
         try:
-            model = LiteLLMModel(
+            # 配置了多个后端时按负载路由、对冲慢请求、摘除故障后端
+            pool = None
+            if len(self.agent_config.api_bases) > 1:
+                pool = BackendPool(
+                    self.agent_config.api_bases,
+                    eject_failures=self.agent_config.backend_eject_failures,
+                    eject_seconds=self.agent_config.backend_eject_seconds,
+                    hedge_initial_delay=self.agent_config.hedge_initial_delay,
+                    hedge_min_delay=self.agent_config.hedge_min_delay,
+                    name="LLM后端"
+                )
+            model = InstrumentedLiteLLMModel(
                 model_id=self.agent_config.model_id,
-                api_base=self.agent_config.api_base,
-                api_key=self.agent_config.api_key
+                api_base=self.agent_config.api_bases[0] if self.agent_config.api_bases else self.agent_config.api_base,
+                api_key=self.agent_config.api_key,
+                log_calls=self.agent_config.log_llm_calls,
+                pool=pool,
+                hedge=self.agent_config.hedge
             )
 
             get_weather = WeatherTool(weather_config=self.weather_config)
+            self.model = model
+            self.weather_tool = get_weather
 
-            self.agent = CodeAgent(
-                tools=[get_weather],
-                model=model,
-                add_base_tools=True,
-            )
+            # 多城市查询并发执行，耗时不随城市数线性增长
+            get_weather_batch = WeatherBatchTool(get_weather)
+
+            tools = [get_weather, get_weather_batch]
+            if self.long_term is not None:
+                tools += [RecallMemoryTool(self.long_term), RememberTool(self.long_term)]
+            self._tools = tools
+
+            self.agent = self._build_code_agent(tools)
+            self._prompt_fingerprint = self._fingerprint_prompt()
+            print(f"[Agent] 系统提示词 {len(self.agent.system_prompt)} 字, 指纹 {self._prompt_fingerprint}")
             print("[Agent] 工具加载与配置注入成功")
             print(f"[Agent] 初始化成功")
         except Exception as e:
             print(f"[Agent错误] 初始化失败: {e}")
             raise
 
-    def process(self, user_input: str) -> str:
-        """处理用户输入"""
+    def _new_memory(self) -> ConversationMemory:
+        return ConversationMemory(
+            token_budget=self.agent_config.memory_token_budget,
+            fold_turns=self.agent_config.memory_fold_turns,
+            summary_max_chars=self.agent_config.memory_summary_max_chars,
+            summarizer=self._summarize,
+            # 摘要要调用一次模型，放到后台，不拖慢本轮回答的播报
+            background=True
+        )
+
+    def _build_code_agent(self, tools: list) -> CodeAgent:
+        agent = CodeAgent(
+            tools=tools,
+            model=self.model,
+            add_base_tools=True,
+            stream_outputs=self.agent_config.stream_outputs,
+        )
+        # 工具按名称排序，系统提示词每轮逐字节一致，vLLM 前缀缓存才能命中
+        agent.tools = dict(sorted(agent.tools.items()))
+        return agent
+
+    def new_session(self) -> "SmolCodeAgent":
+        """
+        创建一个独立会话（服务模式下每个客户端一个）
+
+        与当前实例共享模型及其连接池、天气工具与缓存、路由和回答缓存；
+        对话记忆、CodeAgent 执行状态和插话状态各自独立。
+        长期记忆不区分用户，新会话不挂载长期记忆及其工具。
+        回答缓存中问到用户自己的回答按会话隔离，不会被其他会话拿到。
+        """
+        session = copy.copy(self)
+        session.long_term = None
+        session._turn_context = ""
+        session._session_key = uuid.uuid4().hex[:12]
+        session.memory = session._new_memory()
+        session.last_cached = None
+        session.last_turn = TurnInfo()
+        session._busy = False
+        session._interrupted = False
+        session._last_turn_interrupted = False
+        session._tools = [tool for tool in self._tools if not isinstance(tool, (RecallMemoryTool, RememberTool))]
+        session.agent = session._build_code_agent(session._tools)
+        session._prompt_fingerprint = session._fingerprint_prompt()
+        return session
+
+    def _begin_turn(self, user_input: str) -> str:
+        """开始新一轮，上一轮被打断时在输入前加上说明"""
+        self._busy = True
+        self._interrupted = False
+        if self._last_turn_interrupted:
+            self._last_turn_interrupted = False
+            return f"（你的上一轮回答播放时被用户打断了）\n{user_input}"
+        return user_input
+
+    def _fingerprint_prompt(self) -> str:
+        return hashlib.sha1(self.agent.system_prompt.encode("utf-8")).hexdigest()[:12]
+
+    def _agent_task(self, user_input: str) -> str:
+        """
+        进入 CodeAgent 的任务
+
+        提示词布局为：系统提示词（含排好序的工具说明）→ 对话摘要 → 最近几轮 → 本轮问题，
+        越靠前的部分越稳定，每轮只有末尾变化。
+        """
+        fingerprint = self._fingerprint_prompt()
+        if fingerprint != self._prompt_fingerprint:
+            print(f"[Agent警告] 系统提示词发生变化 ({self._prompt_fingerprint} → {fingerprint})，前缀缓存将失效")
+            self._prompt_fingerprint = fingerprint
+        task = self._begin_turn(user_input)
+        # 长期记忆与本轮问题相关、每轮不同，放在稳定前缀之后
+        long_term = self._long_term_context(user_input)
+        self._turn_context = self._cache_scope(user_input, long_term)
+        context = "\n\n".join(part for part in (self.memory.render(), long_term) if part)
+        if not context:
+            return task
+        return f"{context}\n\n【当前问题】\n{task}"
+
+    def _cache_scope(self, user_input: str, long_term: str) -> str:
+        """
+        本轮回答在缓存中的作用域，空串表示与记忆无关、任何会话都可复用
+
+        追问和调用了记忆工具的回答本来就不缓存。最近几轮对话每轮都在变，不能按它隔离，
+        否则同一会话里同样的问题再也命不中；只有确实可能来自记忆的回答才隔离：
+        注入了长期记忆时按命中的记忆，问到用户自己（“我叫什么”）时按会话。
+        """
+        parts = [long_term] if long_term else []
+        if refers_to_user(user_input):
+            parts.append(self._session_key)
+        if not parts:
+            return ""
+        return hashlib.sha1("\n\n".join(parts).encode("utf-8")).hexdigest()[:16]
+
+    def _long_term_context(self, user_input: str) -> str:
+        """检索长期记忆，去掉已经在短期记忆里的轮次"""
+        if self.long_term is None or not self.long_term.config.inject:
+            return ""
+        recent = {turn.render() for turn in self.memory.recent_turns(len(self.memory.turns))}
+        try:
+            hits = self.long_term.search(user_input)
+        except Exception as e:
+            # 长期记忆只是辅助上下文，检索失败不影响本轮回答
+            print(f"[Memory警告] 检索长期记忆失败: {e}")
+            return ""
+        results = [(score, item) for score, item in hits if item["text"] not in recent]
+        if not results:
+            return ""
+        return "【相关的长期记忆】\n" + "\n".join(f"- {item['text']}".replace("\n", " ") for _, item in results)
+
+    def _record_turn(self, user_input: str, answer: str):
+        """记录一轮问答：短期记忆 + 长期记忆"""
+        self.memory.add_turn(user_input, answer)
+        if self.long_term is not None:
+            try:
+                self.long_term.remember_turn(user_input, answer)
+            except Exception as e:
+                print(f"[Memory警告] 写入长期记忆失败: {e}")
+
+    def cached_answer(self, user_input: str) -> Optional[CachedAnswer]:
+        """
+        查找回答缓存，命中时记入对话记忆
+
+        Returns:
+            命中的条目；未命中或未启用缓存时返回 None
+        """
+        self.last_cached = None
+        if self.answer_cache is None:
+            return None
+        started = time.perf_counter()
+        entry = self.answer_cache.lookup(user_input, self._cache_scope(user_input, self._long_term_context(user_input)))
+        if entry is None:
+            return None
+        print(f"[Cache] 命中: {entry.question}")
+        # 只进短期记忆：重复的问答不必再写一遍长期记忆
+        self.memory.add_turn(user_input, entry.text)
+        self._record_route(ROUTE_CACHE, started)
+        self.last_cached = entry
+        self.last_turn.route = ROUTE_CACHE
+        return entry
+
+    def _cache_answer(self, user_input: str, answer: str, tools: Set[str], context: str):
+        """
+        一轮正常结束后写入回答缓存
+
+        Args:
+            context: 本轮回答的缓存作用域（见 _cache_scope）
+        """
+        if self.answer_cache is not None:
+            self.last_cached = self.answer_cache.put(user_input, answer, tools, context)
+
+    def _collect_steps(self):
+        """
+        从执行记录统计本轮步数与错误
+
+        smolagents 把步骤错误记在 ActionStep.error 上继续重试，步数耗尽时也只是强行生成答案，
+        都不会抛出异常，需要从记录里取出来。
+        """
+        steps = [step for step in self.agent.memory.steps if isinstance(step, ActionStep)]
+        self.last_turn.steps = len(steps)
+        failed = [step.error for step in steps if step.error is not None]
+        self.last_turn.step_errors = sum(1 for error in failed if not isinstance(error, AgentMaxStepsError))
+        if not self.last_turn.error and steps and isinstance(steps[-1].error, AgentMaxStepsError):
+            error = f"达到最大步数 {self.agent.max_steps}"
+            if len(failed) > 1:
+                error += f"，最后一次步骤错误: {failed[-2]}"
+            self.last_turn.error = error
+
+    def _tools_used(self) -> Set[str]:
+        """本轮 CodeAgent 生成的代码里调用过的工具"""
+        tools = set()
+        for step in self.agent.memory.steps:
+            if isinstance(step, ActionStep) and step.code_action:
+                tools |= tools_in_code(step.code_action, self.agent.tools)
+        return tools
+
+    def _summarize(self, summary: str, turns: List[Turn]) -> str:
+        """用模型把已有摘要和若干轮对话压缩成新摘要"""
+        dialogue = "\n".join(turn.render() for turn in turns)
+        prompt = (
+            f"请把下面的已有摘要和新对话合并成一段不超过 {self.agent_config.memory_summary_max_chars} 字的摘要，"
+            f"保留用户的偏好、提到的地点和未完成的事项，只输出摘要本身。\n\n"
+            f"已有摘要：{summary or '无'}\n\n新对话：\n{dialogue}"
+        )
+        message = self.model.generate([ChatMessage(role=MessageRole.USER, content=[{"type": "text", "text": prompt}])])
+        return message.content if isinstance(message.content, str) else ""
+
+    def _record_route(self, route: str, started: float):
+        if self.router:
+            self.router.stats.record(route, time.perf_counter() - started)
+
+    def _fast_path(self, user_input: str) -> Optional[Iterator[str]]:
+        """
+        快速通道
+
+        Returns:
+            逐段产出回答的迭代器；需要进入 CodeAgent 时返回 None
+        """
+        if not self.router or not self.model:
+            return None
+        route, city = self.router.classify(user_input)
+        self.last_turn.route = route
+        if route == ROUTE_CHAT:
+            return self._chat_stream(user_input)
+        if route == ROUTE_WEATHER:
+            started = time.perf_counter()
+            answer = self.weather_tool.forward(city)
+            if not self.weather_tool.is_success(answer):
+                # 城市名可能需要改写（如英文名），交给 Agent 处理
+                print(f"[Router] 天气直查失败，转入 Agent: {answer}")
+                return None
+            print(f"[Router] 天气直查: {city}")
+            self._record_turn(user_input, answer)
+            self._record_route(ROUTE_WEATHER, started)
+            # 天气直查不读记忆，任何上下文下都可复用
+            self._cache_answer(user_input, answer, {self.weather_tool.name}, "")
+            return iter([answer])
+        return None
+
+    def _chat_stream(self, user_input: str) -> Iterator[str]:
+        """闲聊：一次流式对话补全"""
+        print("[Router] 闲聊直答")
+        started = time.perf_counter()
+        system_prompt = self.agent_config.chat_system_prompt
+        context = self.memory.render()
+        if context:
+            system_prompt = f"{system_prompt}\n\n{context}"
+        messages = [ChatMessage(role=MessageRole.SYSTEM, content=[{"type": "text", "text": system_prompt}])]
+        task = self._begin_turn(user_input)
+        long_term = self._long_term_context(user_input)
+        if long_term:
+            task = f"{long_term}\n\n{task}"
+        scope = self._cache_scope(user_input, long_term)
+        messages.append(ChatMessage(role=MessageRole.USER, content=[{"type": "text", "text": task}]))
+
+        chunks = []
+        try:
+            for delta in self.model.generate_stream(messages):
+                if self._interrupted:
+                    print("[Agent] 本轮被用户打断")
+                    self._record_turn(user_input, "".join(chunks) + "……（被打断）")
+                    return
+                if delta.content:
+                    chunks.append(delta.content)
+                    yield delta.content
+        except Exception as e:
+            print(f"[Agent错误] 闲聊失败: {e}")
+            self.last_turn.error = str(e)
+            if not chunks:
+                yield "抱歉，处理时出现错误。"
+            return
+        finally:
+            self._busy = False
+        self._record_turn(user_input, "".join(chunks))
+        self._record_route(ROUTE_CHAT, started)
+        self._cache_answer(user_input, "".join(chunks), set(), scope)
+
+    def process(self, user_input: str, use_cache: bool = True) -> str:
+        """
+        处理用户输入
+
+        Args:
+            use_cache: 是否先查回答缓存（调用方已经查过时传 False）
+        """
         if not self.agent:
             return "Agent未初始化"
 
+        self.last_cached = None
+        self.last_turn = TurnInfo()
+        cached = self.cached_answer(user_input) if use_cache else None
+        if cached is not None:
+            return cached.text
+        fast = self._fast_path(user_input)
+        if fast is not None:
+            return "".join(fast)
+        return self._run_agent(user_input)
+
+    def _run_agent(self, user_input: str) -> str:
+        """在 CodeAgent 中完整运行一轮"""
+        started = time.perf_counter()
+        task = self._agent_task(user_input)
+        self.last_turn.route = ROUTE_AGENT
         try:
-            response = self.agent.run(user_input, reset=False)  # reset=False会让 Agent 保留之前的对话记录和执行日志
-            return str(response)
+            # reset=True：上下文由 self.memory 提供，不再累积执行日志
+            response = str(self.agent.run(task, reset=True))
+            self._collect_steps()
+            self._record_route(ROUTE_AGENT, started)
+            self._record_turn(user_input, response)
+            if not self.last_turn.error:
+                # 步数耗尽时强行生成的答案不缓存
+                self._cache_answer(user_input, response, self._tools_used(), self._turn_context)
+            return response
         except Exception as e:
+            if self._interrupted:
+                return ""
             print(f"[Agent错误] 处理失败: {e}")
+            self.last_turn.error = str(e)
+            self._collect_steps()
             return "抱歉，处理时出现错误。"
+        finally:
+            self._busy = False
+
+    def process_stream(self, user_input: str, use_cache: bool = True) -> Iterator[str]:
+        """
+        流式处理用户输入
+
+        模型生成 final_answer("...") 时就把字面量逐段产出，
+        运行结束后再用真正的最终答案补齐未产出的部分。
+        被插话打断时立即停止产出。
+
+        Args:
+            use_cache: 是否先查回答缓存（调用方已经查过时传 False）
+        """
+        if not self.agent:
+            yield "Agent未初始化"
+            return
+        self.last_cached = None
+        self.last_turn = TurnInfo()
+        cached = self.cached_answer(user_input) if use_cache else None
+        if cached is not None:
+            yield cached.text
+            return
+        fast = self._fast_path(user_input)
+        if fast is not None:
+            yield from fast
+            return
+        if not self.agent_config.stream_outputs:
+            yield self._run_agent(user_input)
+            return
+
+        started = time.perf_counter()
+        parser = FinalAnswerStreamParser()
+        emitted = ""
+        final_answer = None
+        self.last_turn.route = ROUTE_AGENT
+        events = self.agent.run(self._agent_task(user_input), stream=True, reset=True)
+
+        try:
+            for event in events:
+                if self._interrupted:
+                    print("[Agent] 本轮被用户打断")
+                    self._record_turn(user_input, emitted + "……（被打断）")
+                    return
+                if isinstance(event, ChatMessageStreamDelta):
+                    piece = parser.feed(event.content or "")
+                    if piece:
+                        emitted += piece
+                        yield piece
+                elif isinstance(event, ActionStep):
+                    parser.reset()
+                elif isinstance(event, FinalAnswerStep):
+                    final_answer = str(event.output)
+        except Exception as e:
+            if self._interrupted:
+                self._record_turn(user_input, emitted + "……（被打断）")
+                return
+            print(f"[Agent错误] 处理失败: {e}")
+            self.last_turn.error = str(e)
+            if not emitted:
+                yield "抱歉，处理时出现错误。"
+            return
+        finally:
+            events.close()
+            self._busy = False
+            self._collect_steps()
+
+        if final_answer is None:
+            return
+        self._record_route(ROUTE_AGENT, started)
+        if final_answer.startswith(emitted):
+            rest = final_answer[len(emitted):]
+            # 先把剩下的回答交给 TTS，再记录本轮
+            try:
+                if rest:
+                    yield rest
+            finally:
+                self._record_turn(user_input, final_answer)
+                if not self.last_turn.error:
+                    self._cache_answer(user_input, final_answer, self._tools_used(), self._turn_context)
+        else:
+            # 提前播报的字面量没有成为最终答案（如条件表达式、前面的代码出错后重试），
+            # 用户已经听到了错误的内容：播报更正，记录真正的最终答案
+            print(f"[Agent警告] 最终答案与流式输出不一致，播报更正: {final_answer}")
+            try:
+                yield f"{self.CORRECTION_PREFIX}{final_answer}"
+            finally:
+                self._record_turn(user_input, final_answer)
+                if not self.last_turn.error:
+                    self._cache_answer(user_input, final_answer, self._tools_used(), self._turn_context)
+
+    def interrupt(self):
+        """用户插话：中止进行中的一轮，并让下一轮知道上一轮回答被打断"""
+        self._last_turn_interrupted = True
+        if self._busy and self.agent:
+            self._interrupted = True
+            self.agent.interrupt()
+
+    def is_busy(self) -> bool:
+        return self._busy
 
     def is_ready(self) -> bool:
-        return self.agent is not None
\ No newline at end of file
+        return self.agent is not None
@@ -0,0 +1,106 @@
+import re
+
+
+class FinalAnswerStreamParser:
+    """
+    从流式输出的代码中提取 final_answer("...") 的字符串字面量
+
+    CodeAgent 的最终回答写在生成代码的 final_answer 调用里，
+    边生成边解析就能在代码执行前把回答的前半段交给 TTS。
+    只在本步第一个 final_answer 调用顶格书写（不在 if/for/try 等代码块里，一定会执行）、
+    参数以普通字符串字面量开头时提前解析；f-string、变量、缩进在分支里的调用等
+    无法确定会说出什么的写法直接放弃，由调用方在运行结束后用真正的最终答案补齐。
+    """
+
+    _CALL = "final_answer("
+    _START = re.compile(
+        r'final_answer\(\s*(?:answer\s*=\s*)?([rRuUfFbB]{0,2})("""|\'\'\'|"|\')'
+    )
+    # 字面量开头之前可能出现的字符（answer= 关键字、字符串前缀、空白）
+    _PENDING = re.compile(r"[\sanswerANSWER=rRuUfFbB]*")
+    _ESCAPES = {"n": "\n", "t": "\t", "r": "", "\\": "\\", "'": "'", '"': '"'}
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        """开始解析新的一步"""
+        self._text = ""
+        self._pos = 0
+        self._state = "search"  # search -> literal -> done
+        self._quote = ""
+        self._raw = False
+
+    @property
+    def finished(self) -> bool:
+        """字面量是否已经结束"""
+        return self._state == "done"
+
+    def feed(self, chunk: str) -> str:
+        """
+        喂入一段模型输出
+
+        Returns:
+            本次新解析出的回答文本（可能为空）
+        """
+        if self._state == "done" or not chunk:
+            return ""
+
+        self._text += chunk
+
+        if self._state == "search":
+            call = self._text.find(self._CALL)
+            if call < 0:
+                return ""
+            line_start = self._text.rfind("\n", 0, call) + 1
+            if self._text[line_start:call]:
+                # 缩进在代码块里或前面还有别的代码：不一定执行，或答案不只是这个字面量
+                self._state = "done"
+                return ""
+            match = self._START.match(self._text, call)
+            if not match:
+                if not self._PENDING.fullmatch(self._text, call + len(self._CALL)):
+                    self._state = "done"  # 参数不是字符串字面量
+                return ""
+            if len(match.group(2)) == 1 and len(self._text) - match.end() < 2:
+                return ""  # 还分不清是单引号还是三引号
+            prefix = match.group(1).lower()
+            if "f" in prefix or "b" in prefix:
+                self._state = "done"
+                return ""
+            self._raw = "r" in prefix
+            self._quote = match.group(2)
+            self._pos = match.end()
+            self._state = "literal"
+
+        return self._consume()
+
+    def _consume(self) -> str:
+        """解码字面量中已完整到达的部分"""
+        out = []
+        text, pos, quote = self._text, self._pos, self._quote
+
+        while pos < len(text):
+            ch = text[pos]
+            if ch == "\\":
+                if pos + 1 >= len(text):
+                    break  # 转义序列被截断，等下一个片段
+                nxt = text[pos + 1]
+                if self._raw:
+                    out.append(ch + nxt)
+                else:
+                    out.append(self._ESCAPES.get(nxt, ch + nxt))
+                pos += 2
+                continue
+            if ch == quote[0]:
+                if len(text) - pos < len(quote):
+                    break  # 可能是三引号的开头，等待更多字符
+                if text.startswith(quote, pos):
+                    self._state = "done"
+                    pos += len(quote)
+                    break
+            out.append(ch)
+            pos += 1
+
+        self._pos = pos
+        return "".join(out)
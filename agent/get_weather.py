@@ -1,5 +1,49 @@
-import requests
+import re
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Dict, List
 from smolagents import Tool
+from utils.http_client import HttpClient
+from utils.ttl_cache import TTLCache
+
+# 常用城市的别名（中文、拼音、英文、昵称）到统一键
+CITY_ALIASES = {
+    "北京": "beijing", "帝都": "beijing", "peking": "beijing",
+    "上海": "shanghai", "魔都": "shanghai",
+    "广州": "guangzhou", "canton": "guangzhou",
+    "深圳": "shenzhen",
+    "杭州": "hangzhou",
+    "南京": "nanjing",
+    "成都": "chengdu", "蓉城": "chengdu",
+    "重庆": "chongqing", "山城": "chongqing",
+    "武汉": "wuhan",
+    "西安": "xian",
+    "天津": "tianjin",
+    "苏州": "suzhou",
+    "长沙": "changsha",
+    "郑州": "zhengzhou",
+    "青岛": "qingdao",
+    "厦门": "xiamen",
+    "昆明": "kunming",
+    "拉萨": "lasa", "lhasa": "lasa",
+    "理塘": "litang",
+    "香港": "hongkong",
+    "澳门": "aomen", "macau": "aomen", "macao": "aomen",
+    "台北": "taibei", "taipei": "taibei",
+}
+
+
+def normalize_city(city: str) -> str:
+    """
+    把城市名归一化为缓存键
+
+    去掉空白、撇号、连字符和“市/city”后缀，英文转小写，再查别名表，
+    “北京”“北京市”“Beijing”“帝都”得到同一个键。
+    """
+    key = re.sub(r"[\s'’\-]", "", city).lower()
+    key = re.sub(r"(市|city)$", "", key)
+    return CITY_ALIASES.get(key, key)
+
 
 class WeatherTool(Tool):
     # 1. 定义工具元数据（Agent 会阅读这些信息）
@@ -17,8 +61,22 @@ class WeatherTool(Tool):
         super().__init__(**kwargs)
         # 2. 注入配置：这确保了工具使用的 Key 与 main.py 加载的一致
         self.wea_config = weather_config
+        # 实况天气几分钟才更新一次，同一城市的重复查询直接用缓存，并发查询只请求一次
+        self.cache = TTLCache(ttl=weather_config.cache_ttl, max_entries=weather_config.cache_max_entries)
 
     def forward(self, city: str) -> str:
+        return self.cache.get_or_load(
+            normalize_city(city),
+            lambda: self._fetch(city),
+            should_cache=self.is_success
+        )
+
+    @staticmethod
+    def is_success(result: str) -> bool:
+        """查询失败的结果不缓存"""
+        return "当前天气" in result
+
+    def _fetch(self, city: str) -> str:
         # 3. 具体的业务逻辑
         params = {
             "key": self.wea_config.seniverse_key,
@@ -28,11 +86,73 @@ class WeatherTool(Tool):
         }
 
         try:
-            response = requests.get(self.wea_config.api_url, params=params, timeout=10)
+            # 共享连接池：复用到心知天气的 TLS 连接
+            response = HttpClient.shared().get(self.wea_config.api_url, params=params, timeout=10)
             if response.status_code == 200:
                 data = response.json()
                 res = data['results'][0]
                 return f"{res['location']['name']}当前天气：{res['now']['text']}，温度：{res['now']['temperature']}℃。"
             return f"天气查询失败，错误码：{response.status_code}"
         except Exception as e:
-            return f"工具执行异常: {str(e)}"
\ No newline at end of file
+            return f"工具执行异常: {str(e)}"
+
+
+class WeatherBatchTool(Tool):
+    """同时查询多个城市：在线程池中并发调用 WeatherTool，总耗时约等于最慢的一次请求"""
+    name = "get_weather_batch"
+    description = (
+        "同时查询多个城市的实时天气，按输入顺序返回每个城市的结果列表。"
+        "需要查询两个及以上城市时使用，比逐个调用 get_weather 快得多。"
+    )
+    inputs = {
+        "cities": {
+            "type": "array",
+            "description": "城市名称列表，例如 ['北京', '上海', '广州']。",
+        }
+    }
+    output_type = "array"
+
+    def __init__(self, weather_tool: WeatherTool, **kwargs):
+        super().__init__(**kwargs)
+        # 与单城市工具共用缓存和单飞合并
+        self.weather_tool = weather_tool
+        config = weather_tool.wea_config
+        self.timeout = config.batch_timeout
+        self.max_workers = max(1, config.batch_workers)
+
+    def forward(self, cities: List[str]) -> List[str]:
+        if isinstance(cities, str):
+            cities = [city for city in re.split(r"[、,，和及与\s]+", cities) if city]
+        if not cities:
+            return []
+        # 每次调用单独的线程池，每个城市一个线程，同时进行的查询由下面按 max_workers 控制：
+        # 超时的请求还占着线程，但不再计入并发数，排在后面的城市照常开始，之后的调用也不受影响
+        executor = ThreadPoolExecutor(max_workers=len(cities), thread_name_prefix="weather")
+        results: List[str] = [""] * len(cities)
+        running: Dict[Future, int] = {}
+        deadlines: Dict[Future, float] = {}
+        next_index = 0
+        try:
+            while next_index < len(cities) or running:
+                while next_index < len(cities) and len(running) < self.max_workers:
+                    future = executor.submit(self.weather_tool.forward, cities[next_index])
+                    # 每个城市的超时从它真正开始查询时算起
+                    running[future] = next_index
+                    deadlines[future] = time.monotonic() + self.timeout
+                    next_index += 1
+                wait_for = max(0.0, min(deadlines[future] for future in running) - time.monotonic())
+                done, _ = wait(running, timeout=wait_for, return_when=FIRST_COMPLETED)
+                for future in done:
+                    index = running.pop(future)
+                    try:
+                        results[index] = future.result()
+                    except Exception as e:
+                        results[index] = f"{cities[index]}天气查询异常: {e}"
+                now = time.monotonic()
+                for future in [future for future in running if deadlines[future] <= now]:
+                    index = running.pop(future)
+                    results[index] = f"{cities[index]}天气查询超时"
+        finally:
+            # 进行中的请求结束后线程自行退出
+            executor.shutdown(wait=False)
+        return results
@@ -0,0 +1,133 @@
+import threading
+import time
+from dataclasses import dataclass
+from typing import List, Optional
+import numpy as np
+from smolagents import LiteLLMModel
+from utils.backend_pool import BackendPool
+from .pooled_client import PooledClient
+
+
+@dataclass
+class LLMCall:
+    """一次模型调用的指标"""
+    prompt_tokens: int
+    cached_tokens: Optional[int]  # 服务端未报告时为 None
+    completion_tokens: int
+    ttft: float  # 首 token 延迟（秒），非流式调用等于总耗时
+    total: float
+
+    def summary(self) -> str:
+        cached = "未知" if self.cached_tokens is None else str(self.cached_tokens)
+        return (f"prompt {self.prompt_tokens} tok (缓存 {cached}), 输出 {self.completion_tokens} tok, "
+                f"TTFT {self.ttft * 1000:.0f}ms, 总耗时 {self.total * 1000:.0f}ms")
+
+
+class LLMCallStats:
+    """模型调用统计"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.calls: List[LLMCall] = []
+
+    def record(self, call: LLMCall):
+        with self._lock:
+            self.calls.append(call)
+
+    @property
+    def cache_hit_ratio(self) -> Optional[float]:
+        """缓存命中的 prompt token 占比（只统计服务端报告了缓存的调用）"""
+        reported = [call for call in self.calls if call.cached_tokens is not None]
+        prompt = sum(call.prompt_tokens for call in reported)
+        if not prompt:
+            return None
+        return sum(call.cached_tokens for call in reported) / prompt
+
+    def summary(self) -> str:
+        if not self.calls:
+            return "尚无调用"
+        ttfts = [call.ttft for call in self.calls]
+        prompt = sum(call.prompt_tokens for call in self.calls) / len(self.calls)
+        ratio = self.cache_hit_ratio
+        cached = "未报告" if ratio is None else f"{ratio:.0%}"
+        return (f"{len(self.calls)} 次调用, 平均 prompt {prompt:.0f} tok, 缓存命中 {cached}, "
+                f"TTFT 平均 {np.mean(ttfts) * 1000:.0f}ms / p95 {np.percentile(ttfts, 95) * 1000:.0f}ms")
+
+
+def _cached_tokens(usage) -> Optional[int]:
+    """从 usage 中取出前缀缓存命中的 token 数（vLLM 开启 --enable-prompt-tokens-details 后才会报告）"""
+    details = getattr(usage, "prompt_tokens_details", None)
+    if details is None:
+        return None
+    if isinstance(details, dict):
+        return details.get("cached_tokens")
+    return getattr(details, "cached_tokens", None)
+
+
+class _InstrumentedClient:
+    """包装 litellm 模块：记录每次 completion 调用的 usage 与首 token 延迟"""
+
+    def __init__(self, client, stats: LLMCallStats, log_calls: bool):
+        self._client = client
+        self._stats = stats
+        self._log_calls = log_calls
+
+    def __getattr__(self, name):
+        return getattr(self._client, name)
+
+    def completion(self, **kwargs):
+        started = time.perf_counter()
+        response = self._client.completion(**kwargs)
+        if kwargs.get("stream"):
+            return self._wrap_stream(response, started)
+        elapsed = time.perf_counter() - started
+        self._record(getattr(response, "usage", None), elapsed, elapsed)
+        return response
+
+    def _wrap_stream(self, events, started: float):
+        ttft = None
+        usage = None
+        try:
+            for event in events:
+                if ttft is None and event.choices and event.choices[0].delta \
+                        and (event.choices[0].delta.content or event.choices[0].delta.tool_calls):
+                    ttft = time.perf_counter() - started
+                if getattr(event, "usage", None):
+                    usage = event.usage
+                yield event
+        finally:
+            total = time.perf_counter() - started
+            self._record(usage, total if ttft is None else ttft, total)
+
+    def _record(self, usage, ttft: float, total: float):
+        call = LLMCall(
+            prompt_tokens=getattr(usage, "prompt_tokens", 0) or 0,
+            cached_tokens=_cached_tokens(usage) if usage is not None else None,
+            completion_tokens=getattr(usage, "completion_tokens", 0) or 0,
+            ttft=ttft,
+            total=total
+        )
+        self._stats.record(call)
+        if self._log_calls:
+            print(f"[LLM] {call.summary()}")
+
+
+class InstrumentedLiteLLMModel(LiteLLMModel):
+    """
+    记录 prompt tokens、缓存命中 tokens 和首 token 延迟的 LiteLLMModel
+
+    提供 pool 时请求分发到多个后端（见 PooledClient），统计的首 token 延迟包含对冲与故障转移。
+    """
+
+    def __init__(self, *args, log_calls: bool = True, pool: Optional[BackendPool] = None, hedge: bool = True, **kwargs):
+        self.stats = LLMCallStats()
+        self.log_calls = log_calls
+        self.pool = pool
+        self.hedge = hedge
+        super().__init__(*args, **kwargs)
+
+    def create_client(self):
+        client = super().create_client()
+        if self.pool is not None:
+            client = PooledClient(client, self.pool, hedge=self.hedge)
+        return _InstrumentedClient(client, self.stats, self.log_calls)
@@ -0,0 +1,150 @@
+import re
+import threading
+from dataclasses import dataclass
+from typing import Callable, List, Optional
+
+_CJK = re.compile(r"[\u3000-\u303f\u4e00-\u9fff\uff00-\uffef]")
+
+
+def estimate_tokens(text: str) -> int:
+    """粗略估算 token 数：中日韩字符约 1 个 token，其余约 4 个字符 1 个 token"""
+    cjk = len(_CJK.findall(text))
+    return cjk + (len(text) - cjk + 3) // 4
+
+
+@dataclass
+class Turn:
+    """一轮对话（只保留问答文本，不含执行步骤）"""
+    user: str
+    assistant: str
+
+    def render(self) -> str:
+        return f"用户：{self.user}\n助手：{self.assistant}"
+
+    @property
+    def tokens(self) -> int:
+        return estimate_tokens(self.render())
+
+
+class ConversationMemory:
+    """
+    按 token 预算管理的对话记忆
+
+    渲染结果为“摘要 + 最近几轮原文”，新的一轮只追加在末尾，
+    前缀保持字节不变，vLLM 的前缀缓存可以持续命中。
+    超出预算时把最早的 fold_turns 轮一次性并入摘要（成批折叠，前缀变化的次数尽量少）。
+    调用摘要模型时不持锁；background=True 时折叠在后台线程进行，记录一轮不会等待模型。
+    """
+
+    def __init__(
+            self,
+            token_budget: int = 2048,
+            fold_turns: int = 4,
+            summary_max_chars: int = 300,
+            summarizer: Optional[Callable[[str, List[Turn]], str]] = None,
+            background: bool = False
+    ):
+        """
+        Args:
+            token_budget: 摘要与原文合计的 token 上限
+            fold_turns: 每次并入摘要的轮数
+            summary_max_chars: 摘要的最大字数
+            summarizer: (已有摘要, 待折叠的轮次) -> 新摘要，None 时直接截断拼接
+            background: 在后台线程折叠（折叠完成前仍按原文渲染，暂时略超预算）
+        """
+        self.token_budget = token_budget
+        self.fold_turns = max(1, fold_turns)
+        self.summary_max_chars = summary_max_chars
+        self.summarizer = summarizer
+        self.summary = ""
+        self.turns: List[Turn] = []
+        self.folds = 0
+        self.background = background
+        self._lock = threading.Lock()
+        self._folding = False
+        self._fold_thread: Optional[threading.Thread] = None
+        self._epoch = 0  # clear() 时加一，作废进行中的折叠
+
+    @property
+    def tokens(self) -> int:
+        return estimate_tokens(self.summary) + sum(turn.tokens for turn in self.turns)
+
+    def add_turn(self, user: str, assistant: str):
+        """记录一轮对话，超出预算时折叠最早的几轮"""
+        with self._lock:
+            self.turns.append(Turn(user.strip(), assistant.strip()))
+            if self._folding or not self._over_budget():
+                return
+            self._folding = True
+            if self.background:
+                self._fold_thread = threading.Thread(target=self._fold_loop, daemon=True, name="memory-fold")
+                self._fold_thread.start()
+                return
+        self._fold_loop()
+
+    def _over_budget(self) -> bool:
+        return self.tokens > self.token_budget and bool(self.turns)
+
+    def _fold_loop(self):
+        """反复把最早的 fold_turns 轮并入摘要，直到回到预算内"""
+        try:
+            while True:
+                with self._lock:
+                    if not self._over_budget():
+                        self._folding = False
+                        return
+                    summary, turns, epoch = self.summary, self.turns[:self.fold_turns], self._epoch
+                # 调用摘要模型期间不持锁，渲染和记录新一轮都不受影响
+                new_summary = self._fold(summary, turns)
+                with self._lock:
+                    if epoch != self._epoch:
+                        self._folding = False
+                        return
+                    self.summary = new_summary
+                    self.turns = self.turns[len(turns):]
+                    self.folds += 1
+                    tokens = self.tokens
+                print(f"[Memory] 已将 {len(turns)} 轮对话并入摘要 (约 {tokens} tokens)")
+        except BaseException:
+            with self._lock:
+                self._folding = False
+            raise
+
+    def _fold(self, summary: str, turns: List[Turn]) -> str:
+        """把若干轮并入摘要，返回新摘要"""
+        new_summary = None
+        if self.summarizer is not None:
+            try:
+                new_summary = self.summarizer(summary, turns)
+            except Exception as e:
+                print(f"[Memory警告] 生成摘要失败，改为截断: {e}")
+        if not new_summary:
+            new_summary = "\n".join([summary] + [turn.render() for turn in turns]).strip()
+        # 摘要过长时保留最近的部分
+        return new_summary.strip()[-self.summary_max_chars:]
+
+    def wait_folds(self, timeout: Optional[float] = None):
+        """等待后台折叠完成"""
+        thread = self._fold_thread
+        if thread is not None:
+            thread.join(timeout)
+
+    def render(self) -> str:
+        """渲染为放在任务前面的上下文，没有记忆时返回空串"""
+        with self._lock:
+            parts = []
+            if self.summary:
+                parts.append(f"【对话摘要】\n{self.summary}")
+            if self.turns:
+                parts.append("【最近对话】\n" + "\n".join(turn.render() for turn in self.turns))
+            return "\n\n".join(parts)
+
+    def recent_turns(self, count: int) -> List[Turn]:
+        with self._lock:
+            return list(self.turns[-count:])
+
+    def clear(self):
+        with self._lock:
+            self.summary = ""
+            self.turns = []
+            self._epoch += 1
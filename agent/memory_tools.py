@@ -0,0 +1,44 @@
+from smolagents import Tool
+from memory.long_term import LongTermMemory
+
+
+class RecallMemoryTool(Tool):
+    name = "recall_memory"
+    description = "从长期记忆中检索与问题相关的过往对话和用户让你记住的事情。"
+    inputs = {
+        "query": {
+            "type": "string",
+            "description": "要回忆的内容，例如 '用户住在哪个城市'。",
+        }
+    }
+    output_type = "string"
+
+    def __init__(self, long_term: LongTermMemory, **kwargs):
+        super().__init__(**kwargs)
+        self.long_term = long_term
+
+    def forward(self, query: str) -> str:
+        results = self.long_term.search(query)
+        if not results:
+            return "没有找到相关记忆。"
+        return "\n".join(f"[{score:.2f}] {item['text']}" for score, item in results)
+
+
+class RememberTool(Tool):
+    name = "remember"
+    description = "把用户要求记住的事实（偏好、住址、日程等）写入长期记忆，下次对话仍然可以回忆。"
+    inputs = {
+        "fact": {
+            "type": "string",
+            "description": "要记住的事实，例如 '用户住在杭州'。",
+        }
+    }
+    output_type = "string"
+
+    def __init__(self, long_term: LongTermMemory, **kwargs):
+        super().__init__(**kwargs)
+        self.long_term = long_term
+
+    def forward(self, fact: str) -> str:
+        self.long_term.remember(fact, kind="fact")
+        return f"已记住：{fact}"
@@ -0,0 +1,164 @@
+import queue
+import threading
+import time
+from typing import Iterator, List, Optional
+from utils.backend_pool import Backend, BackendPool
+
+
+def _close_stream(events):
+    """关闭 litellm 的流式响应，释放连接"""
+    for target in (events, getattr(events, "completion_stream", None)):
+        close = getattr(target, "close", None)
+        if close is not None:
+            try:
+                close()
+                return
+            except Exception:
+                pass
+
+
+class _Attempt(threading.Thread):
+    """
+    发往一个后端的一次请求
+
+    流式请求读到第一个事件、非流式请求拿到完整响应后即视为完成，把自己放入结果队列。
+    被取消（另一个后端先出结果）时关闭自己的流并释放后端。
+    """
+
+    def __init__(self, client, pool: BackendPool, backend: Backend, kwargs: dict, results: queue.Queue):
+        super().__init__(daemon=True, name="llm-attempt")
+        self.client = client
+        self.pool = pool
+        self.backend = backend
+        self.kwargs = {**kwargs, "api_base": backend.url}
+        self.stream = bool(kwargs.get("stream"))
+        self.results = results
+        self.response = None
+        self.first_event = None
+        self.error: Optional[BaseException] = None
+        self._iterator: Optional[Iterator] = None
+        self._lock = threading.Lock()
+        self._finished = False
+        self._cancelled = False
+        self._released = False
+
+    @property
+    def finished(self) -> bool:
+        return self._finished
+
+    def run(self):
+        started = time.perf_counter()
+        try:
+            self.response = self.client.completion(**self.kwargs)
+            if self.stream:
+                self._iterator = iter(self.response)
+                self.first_event = next(self._iterator, None)
+            self.pool.record_success(self.backend, time.perf_counter() - started, self.stream)
+        except Exception as e:
+            self.error = e
+            self.pool.record_failure(self.backend, e)
+        with self._lock:
+            self._finished = True
+            if self.error is not None or self._cancelled:
+                self._discard()
+        self.results.put(self)
+
+    def cancel(self):
+        """另一个后端胜出：已完成的立即关闭，未完成的在完成时关闭"""
+        with self._lock:
+            self._cancelled = True
+            if self._finished:
+                self._discard()
+
+    def _discard(self):
+        if self.stream and self.response is not None:
+            _close_stream(self.response)
+        self._release()
+
+    def _release(self):
+        if not self._released:
+            self._released = True
+            self.pool.release(self.backend)
+
+    def result(self):
+        """胜出后的结果：非流式直接返回响应，流式返回从第一个事件开始的事件迭代器"""
+        if not self.stream:
+            self._release()
+            return self.response
+        return self._events()
+
+    def _events(self):
+        try:
+            if self.first_event is not None:
+                yield self.first_event
+            for event in self._iterator:
+                yield event
+        except Exception as e:
+            self.pool.record_failure(self.backend, e)
+            raise
+        finally:
+            _close_stream(self.response)
+            self._release()
+
+
+class PooledClient:
+    """
+    包装 litellm 模块：completion 调用按 BackendPool 分发到多个后端
+
+    开启对冲时，首个结果超过 p95 仍未到达就向另一个后端发出相同请求，
+    先出结果的胜出，另一个被关闭；请求失败时立即转到下一个后端。
+    非流式请求无法中途取消，落败的一方在后台跑完后丢弃。
+    """
+
+    def __init__(self, client, pool: BackendPool, hedge: bool = True):
+        self._client = client
+        self.pool = pool
+        self.hedge = hedge and len(pool) > 1
+
+    def __getattr__(self, name):
+        return getattr(self._client, name)
+
+    def completion(self, **kwargs):
+        results: queue.Queue = queue.Queue()
+        attempts: List[_Attempt] = []
+
+        def launch() -> bool:
+            backend = self.pool.acquire(exclude=[a.backend.url for a in attempts])
+            if backend is None:
+                return False
+            attempt = _Attempt(self._client, self.pool, backend, kwargs, results)
+            attempts.append(attempt)
+            attempt.start()
+            return True
+
+        launch()
+        deadline = None
+        if self.hedge:
+            deadline = time.monotonic() + self.pool.hedge_delay(bool(kwargs.get("stream")))
+        last_error: Optional[BaseException] = None
+        while True:
+            timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+            try:
+                attempt = results.get(timeout=timeout)
+            except queue.Empty:
+                deadline = None  # 每次调用最多对冲一次
+                if launch():
+                    self.pool.record_hedge()
+                    print(f"[LLM后端] {attempts[0].backend.url} 未及时响应，对冲到 {attempts[-1].backend.url}")
+                continue
+
+            if attempt.error is None:
+                for other in attempts:
+                    if other is not attempt:
+                        other.cancel()
+                if attempt is not attempts[0] and len(attempts) > 1 and attempts[0].error is None:
+                    self.pool.record_hedge_win()
+                return attempt.result()
+
+            last_error = attempt.error
+            if any(not a.finished for a in attempts):
+                continue  # 还有请求在路上，等它
+            if not launch():
+                raise last_error
+            self.pool.record_failover()
+            print(f"[LLM后端] {attempt.backend.url} 请求失败，转到 {attempts[-1].backend.url}: {last_error}")
@@ -0,0 +1,106 @@
+import re
+import threading
+from collections import Counter
+from typing import Optional, Tuple
+
+# 路由结果
+ROUTE_CHAT = "chat"  # 闲聊：单次流式对话补全
+ROUTE_WEATHER = "weather"  # 明确的单城市天气查询：直接调用 WeatherTool
+ROUTE_AGENT = "agent"  # 其余请求：进入 CodeAgent 多步循环
+ROUTE_CACHE = "cache"  # 命中回答缓存，不经过任何通道
+
+# 整句只由寒暄组成（可重复、带语气词和标点），如“好的好的，谢谢你！”
+_CHAT_PATTERN = re.compile(
+    r"^(?:(?:你好|您好|哈喽|嗨|早上好|中午好|下午好|晚上好|晚安|谢谢|多谢|感谢|辛苦了|好的|好吧|嗯|对|是的|"
+    r"没事|没关系|不客气|再说一遍|你是谁|你叫什么|你好呀|哈哈)(?:你|您|啦|呀|啊|哦|了)?[，,、。！!？?~～\s]*)+$"
+)
+# 需要工具、实时信息或多步推理的字眼
+_AGENT_KEYWORDS = (
+    "查", "搜", "计算", "算一下", "天气", "气温", "温度", "新闻", "最新", "几点", "日期", "星期",
+    "今天", "明天", "现在", "股价", "汇率", "多少", "网上", "步骤", "比较", "对比", "代码", "帮我"
+)
+# 指代上文的追问，闲聊通道没有上下文，交给 Agent
+_FOLLOW_UP_PATTERN = re.compile(r"^(那|那么|还有|然后)|呢[？?]?$|刚才|上面|它|这个")
+
+_WEATHER_PATTERN = re.compile(
+    r"^(?:请问|麻烦)?(?:帮我|给我)?(?:查(?:一下|询|查)?|看看|说说|问问)?(?:一下)?"
+    r"(?P<city>[\u4e00-\u9fa5]{2,8}?)(?:市)?(?:现在|今天|目前|此刻|当前)?的?"
+    r"(?:天气|气温|温度)(?:怎么样|如何|咋样|情况|多少度?)?(?:啊|呀|呢|吗)?[？?。！!]*$"
+)
+# 天气查询的城市位置上出现这些词时说明不是单纯的城市名
+_NON_CITY_WORDS = ("今天", "明天", "后天", "现在", "这里", "这边", "外面", "我们", "未来", "下周", "周末", "和", "跟")
+
+
+def is_follow_up(text: str) -> bool:
+    """是否是指代上文的追问（回答依赖对话上下文）"""
+    return bool(_FOLLOW_UP_PATTERN.search(text))
+
+
+class RouterStats:
+    """路由统计：各通道次数，以及快速通道相对 Agent 平均耗时节省的时间"""
+
+    SMOOTHING = 0.2
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.routes: Counter = Counter()
+        self.agent_latency: Optional[float] = None  # Agent 通道耗时的滑动平均
+        self.saved_seconds = 0.0
+
+    def record(self, route: str, elapsed: float):
+        with self._lock:
+            self.routes[route] += 1
+            if route == ROUTE_AGENT:
+                if self.agent_latency is None:
+                    self.agent_latency = elapsed
+                else:
+                    self.agent_latency += self.SMOOTHING * (elapsed - self.agent_latency)
+            elif self.agent_latency is not None:
+                self.saved_seconds += max(0.0, self.agent_latency - elapsed)
+
+    def summary(self) -> str:
+        total = sum(self.routes.values())
+        fast = total - self.routes[ROUTE_AGENT]
+        ratio = fast / total * 100 if total else 0.0
+        agent_ms = (self.agent_latency or 0.0) * 1000
+        return (f"共 {total} 轮: 缓存 {self.routes[ROUTE_CACHE]}, 闲聊 {self.routes[ROUTE_CHAT]}, 天气 {self.routes[ROUTE_WEATHER]}, "
+                f"Agent {self.routes[ROUTE_AGENT]} (快速通道 {ratio:.0f}%), "
+                f"Agent 平均 {agent_ms:.0f}ms, 累计节省约 {self.saved_seconds:.1f}s")
+
+
+class IntentRouter:
+    """
+    基于规则的轻量意图路由
+
+    只把把握很大的输入分到快速通道，拿不准的一律交给 CodeAgent。
+    """
+
+    def __init__(self, chat_max_chars: int = 16):
+        self.chat_max_chars = chat_max_chars
+        self.stats = RouterStats()
+
+    def classify(self, text: str) -> Tuple[str, Optional[str]]:
+        """
+        判断一轮输入走哪个通道
+
+        Returns:
+            (通道, 天气通道的城市名)
+        """
+        text = text.strip()
+        if not text:
+            return ROUTE_AGENT, None
+
+        match = _WEATHER_PATTERN.match(text)
+        if match:
+            city = match.group("city")
+            if not any(word in city for word in _NON_CITY_WORDS):
+                return ROUTE_WEATHER, city
+            return ROUTE_AGENT, None
+
+        if is_follow_up(text) or any(word in text for word in _AGENT_KEYWORDS) \
+                or re.search(r"\d", text):
+            return ROUTE_AGENT, None
+        # 整句都是寒暄时不受长度限制，其余只有短句才算闲聊（“好的，那帮我……”仍受限制）
+        if len(text) <= self.chat_max_chars or _CHAT_PATTERN.match(text):
+            return ROUTE_CHAT, None
+        return ROUTE_AGENT, None
@@ -1,16 +1,40 @@
 import os
-from dataclasses import dataclass
-from typing import Literal, Optional
+import json
+from dataclasses import dataclass, field
+from typing import List, Literal, Optional
 
 
 @dataclass
 class TTSConfig:
     """TTS配置"""
     api_url: str = "http://192.168.123.100:8080/v1/tts"
+    # 多个 Fish Speech 端点，为空时只用 api_url；同一回答的句子并发分发到各端点
+    api_urls: List[str] = field(default_factory=list)
+    endpoint_eject_failures: int = 2  # 连续失败多少次后摘除端点
+    endpoint_eject_seconds: float = 30.0  # 摘除多久后重新试探
     timeout: int = 30
     ref_audio_path: str = "dz.mp3"
     # 新增：参考音频对应的文字内容（建议填写，效果更好）
     ref_text: str = "大家好，我是丁真。今天想跟大家分享我们这里的风景。清晨的草原上，马儿在自由奔跑，远处的雪山映着朝阳，特别漂亮。这里的一切都让我感到幸福，欢迎你们来理塘做客。"
+    # 服务端注册的参考音频 ID 前缀，实际注册为“前缀-内容哈希”，换了参考音频会重新注册；留空则每次请求内联发送
+    reference_id: str = "dz"
+    reference_api_url: str = ""  # 参考音频注册接口，留空时由 api_url 推导 (/v1/references/add)
+    streaming: bool = True  # 流式合成：收到第一块音频就开始播放
+    stream_chunk_size: int = 4096
+    lookahead: int = 2  # 播放当前句时最多提前合成的句数
+    synth_workers: int = 1  # 并行合成的线程数（多端点时至少为端点数）
+
+
+@dataclass
+class HttpConfig:
+    """共享 HTTP 客户端配置"""
+    pool_connections: int = 10  # 缓存连接池的主机数
+    pool_maxsize: int = 8  # 每个主机的最大连接数（不小于并行合成线程数）
+    connect_timeout: float = 3.0
+    read_timeout: float = 30.0
+    retries: int = 2  # 幂等请求的重试次数
+    backoff_factor: float = 0.3  # 重试间隔 = backoff_factor × 2^(第几次重试)
+    keepalive_timeout: float = 60.0  # 异步客户端空闲连接保留时长
 
 
 @dataclass
@@ -20,6 +44,19 @@ class STTConfig:
     device: Literal["cpu", "cuda"] = "cpu"
     compute_type: str = "int8"  # cpu用int8, cuda用float16
     beam_size: int = 5
+    cpu_threads: int = 0  # 每个工作单元的 CPU 线程数，0 表示由 CTranslate2 决定
+    num_workers: int = 1  # 可并发执行 transcribe 的工作单元数（STT 服务的线程数）
+    batched: bool = False  # STT 服务把多路语音拼成一批解码（BatchedInferencePipeline）
+    batch_size: int = 8
+    batch_wait_ms: int = 20  # 凑批次的最长等待时间
+    vad_filter: bool = False  # 录音器已用 WebRTC VAD 分段，默认不再跑 Silero VAD
+    use_speech_timestamps: bool = True  # 只解码录音器给出的语音区间（clip_timestamps）
+    no_speech_threshold: float = 0.6  # no_speech_prob 高于此值且 avg_logprob 低于 log_prob_threshold 的段落丢弃
+    log_prob_threshold: float = -1.0
+    min_avg_logprob: float = -1.5  # 平均对数概率低于此值的段落视为幻觉
+    streaming: bool = False  # 说话期间增量转写，结束时只解码尾部
+    stream_interval_s: float = 1.0  # 新增多少秒语音后做一次增量解码
+    stream_commit_margin_s: float = 0.5  # 末尾这段时间内的词还可能变化，暂不确认
 
 
 @dataclass
@@ -28,8 +65,31 @@ class VADConfig:
     aggressiveness: int = 2  # 0-3，越大越激进
     sample_rate: int = 16000
     frame_duration_ms: int = 30
-    max_silent_frames: int = 30
+    max_silent_frames: int = 30  # 静音帧数上限（自适应断句关闭时即为固定阈值）
+    min_silent_frames: int = 10  # 自适应断句的静音帧数下限（约 300ms）
+    adaptive_endpoint: bool = True
+    endpoint_deviation_factor: float = 2.0  # 阈值 = 平均停顿 + 系数 × 平均偏差
+    endpoint_smoothing: float = 0.2  # 停顿与语速统计的滑动平均系数
+    endpoint_reference_rate: float = 4.0  # 参考语速（字/秒）
+    endpoint_complete_min_chars: int = 4  # 语气词结尾至少这么多字才当作说完（“好吧”“我去了”不算）
     ring_buffer_size: int = 10
+    max_buffered_seconds: float = 30.0  # 常驻采集流的最大缓冲时长，超出后丢弃最旧的帧
+    gate_min_speech_s: float = 0.3  # 送入 STT 前的门限：语音时长
+    gate_min_voiced_ratio: float = 0.3  # 语音区间内语音帧占比
+    gate_min_rms: float = 200.0  # 语音区间内能量（int16 幅度）
+    barge_in: bool = True  # 播放/思考期间用户开口即打断
+    barge_in_min_frames: int = 8  # 连续语音帧数达到该值才算插话，过滤扬声器回声
+
+
+@dataclass
+class PipelineConfig:
+    """全双工流水线配置"""
+    full_duplex: bool = True  # talk 模式使用 asyncio 并发流水线，False 时退回顺序循环
+    frame_queue_size: int = 100  # 采集 → VAD 的帧队列（约 3 秒）
+    utterance_queue_size: int = 2  # VAD → STT 的语句队列
+    text_queue_size: int = 2  # STT → Agent 的文本队列
+    stt_workers: int = 1
+    suppress_while_speaking: bool = True  # 播放期间检测到的语音视为回声丢弃
 
 
 @dataclass
@@ -38,12 +98,112 @@ class AgentConfig:
     api_base: str = "http://192.168.123.100:18000/v1"
     model_id: str = "openai/Qwen/Qwen3-4B-Instruct-2507"
     api_key: str = "vllm-token"
+    # 多个 OpenAI 兼容后端（vLLM 副本），为空时只用 api_base；按进行中请求最少路由，连续失败的暂时摘除
+    api_bases: List[str] = field(default_factory=list)
+    hedge: bool = True  # 首 token 迟迟不来时向另一个后端发重复请求，先出结果的胜出
+    hedge_initial_delay: float = 2.0  # 样本不足时的对冲等待时间（秒）
+    hedge_min_delay: float = 0.3  # 对冲等待时间下限：取首 token 延迟的 p95，但不低于此值
+    backend_eject_failures: int = 3  # 连续失败多少次后摘除
+    backend_eject_seconds: float = 30.0  # 摘除多久后重新试探
+    stream_outputs: bool = True  # 流式接收模型输出，final_answer 边生成边送 TTS
+    log_llm_calls: bool = True  # 每次模型调用打印 prompt/缓存 tokens 与首 token 延迟
+    fast_path: bool = True  # 闲聊和单城市天气查询绕过 CodeAgent
+    chat_max_chars: int = 16  # 不含工具字眼且不超过该长度的输入视为闲聊
+    memory_token_budget: int = 2048  # 对话记忆（摘要 + 最近几轮）的 token 上限
+    memory_fold_turns: int = 4  # 超出预算时一次并入摘要的轮数
+    memory_summary_max_chars: int = 300
+    chat_system_prompt: str = "你是一个语音助手。请用简短、口语化的中文直接回答，不要使用 Markdown 或列表。"
+
+@dataclass
+class MemoryConfig:
+    """长期记忆配置"""
+    enabled: bool = True
+    path: str = "data/memory"  # 向量库目录
+    dim: int = 256  # 哈希向量维度
+    dtype: str = "float32"  # float32 或 int8（体积为 1/4，精度略降）
+    top_k: int = 3
+    min_score: float = 0.2  # 余弦相似度低于此值的结果不注入（哈希向量下无关文本约在 0.1 以内）
+    inject: bool = True  # 每轮自动把相关记忆注入上下文
+    remember_turns: bool = True  # 自动记下每轮问答
+
+
+@dataclass
+class AnswerCacheConfig:
+    """回答缓存配置：重复的提问直接复用上次的回答和合成好的音频"""
+    enabled: bool = True
+    max_entries: int = 512
+    similarity: float = 0.7  # 归一化文本不同时，向量相似度不低于此值且只差语气词才算同一问题
+    static_ttl: float = 6 * 3600.0  # 未调用工具的回答（常识、寒暄）
+    weather_ttl: float = 300.0  # 用到天气工具
+    search_ttl: float = 1800.0  # 用到网页搜索
+    clock_ttl: float = 30.0  # 代码读取了当前时间
+    tool_ttl: float = 300.0  # 其他工具
+    max_audio_bytes: int = 64 * 1024 * 1024  # 缓存的合成音频总量上限
+
+
+@dataclass
+class AudioCacheConfig:
+    """合成音频的磁盘缓存：固定短句（告别语、出错提示、过渡语）不必每次都请求 TTS 服务"""
+    enabled: bool = True
+    path: str = "data/tts_cache"  # 缓存目录，每条音频一个文件
+    max_bytes: int = 256 * 1024 * 1024  # 磁盘占用上限，超出后删除最久未用的
+    max_text_chars: int = 40  # 只缓存不超过此长度的句子（长句几乎不会原样重复）
+    # 启动时预先合成的短句
+    prewarm_phrases: List[str] = field(default_factory=lambda: [
+        "好的，再见。",
+        "抱歉，处理时出现错误。",
+        "好的。",
+        "稍等一下。",
+    ])
+    prewarm_path: str = ""  # 额外的预热短句文件，每行一句
+    filler: str = "嗯，我想一想。"  # Agent 迟迟没有产出第一句时先播放的过渡语，留空则不播放
+    filler_delay: float = 1.5  # 等待多久还没有第一句才播放过渡语（秒）
+
+
+@dataclass
+class ServerConfig:
+    """服务模式（--launch serve）配置"""
+    host: str = "0.0.0.0"
+    port: int = 8765
+    max_sessions: int = 64  # 同时保持的会话数，满了先淘汰空闲会话，仍满则拒绝
+    max_concurrent_turns: int = 8  # 同时在跑的 Agent 轮次（即并发的 LLM 请求数上限）
+    session_queue: int = 2  # 每个会话排队中的轮次上限，超出时回复 busy
+    idle_timeout: float = 900.0  # 会话空闲多久后回收（秒）
+    eviction_interval: float = 30.0  # 检查空闲会话的间隔（秒）
+    max_utterance_seconds: float = 30.0  # 单句上传音频的最大长度
+    chunk_buffer: int = 32  # Agent 线程与事件循环之间缓冲的文本段数，满了 Agent 线程等待
+
+
+@dataclass
+class BatchConfig:
+    """批量评测模式（--launch batch）配置"""
+    input_path: str = ""  # JSONL：每行 {"id", "prompt"} 或 {"id", "turns": [...]}
+    output_path: str = "batch_results.jsonl"
+    workers: int = 4  # 并行的独立 Agent 实例数
+
 
 @dataclass
 class WeatherConfig:
     """天气工具配置"""
     seniverse_key: str = "Stqu08wWqILJtfygD"
     api_url: str = "https://api.seniverse.com/v3/weather/now.json"
+    cache_ttl: float = 600.0  # 实况天气缓存有效期（秒）
+    cache_max_entries: int = 256
+    batch_workers: int = 4  # 多城市查询同时进行的查询数（超时的不再计入）
+    batch_timeout: float = 8.0  # 多城市查询中每个城市的超时（秒，从该城市开始查询时算起）
+
+def load_tuned_stt(path: str) -> dict:
+    """读取 stt.tuner 写出的调优结果，文件不存在时返回空字典"""
+    if not path or not os.path.exists(path):
+        return {}
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            tuned = json.load(f).get("stt", {})
+    except (OSError, ValueError) as e:
+        print(f"[配置警告] 读取 STT 调优结果失败: {e}")
+        return {}
+    return {key: value for key, value in tuned.items() if key in STTConfig.__dataclass_fields__}
+
 
 @dataclass
 class AppConfig:
@@ -51,26 +211,67 @@ class AppConfig:
     tts: TTSConfig
     stt: STTConfig
     vad: VADConfig
+    pipeline: PipelineConfig
     agent: AgentConfig
     weather: WeatherConfig
+    http: HttpConfig
+    memory: MemoryConfig
+    answer_cache: AnswerCacheConfig
+    audio_cache: AudioCacheConfig
+    server: ServerConfig
+    batch: BatchConfig
 
     @classmethod
     def from_env(cls):
         """从环境变量加载配置"""
+        # 调优结果作为 STT 的默认值，环境变量仍可覆盖
+        tuned = load_tuned_stt(os.getenv("STT_TUNED_CONFIG", "stt_tuned.json"))
         return cls(
             tts=TTSConfig(
-                api_url=os.getenv("TTS_API_URL", TTSConfig.api_url)
-            ),
-            stt=STTConfig(
-                model_path=os.getenv("STT_MODEL_PATH", STTConfig.model_path),
-                device=os.getenv("STT_DEVICE", STTConfig.device)
+                api_url=os.getenv("TTS_API_URL", TTSConfig.api_url),
+                api_urls=[url.strip() for url in os.getenv("TTS_API_URLS", "").split(",") if url.strip()]
             ),
+            stt=STTConfig(**{
+                **tuned,
+                "model_path": os.getenv("STT_MODEL_PATH", tuned.get("model_path", STTConfig.model_path)),
+                "device": os.getenv("STT_DEVICE", tuned.get("device", STTConfig.device)),
+                "compute_type": os.getenv("STT_COMPUTE_TYPE", tuned.get("compute_type", STTConfig.compute_type)),
+                "beam_size": int(os.getenv("STT_BEAM_SIZE", tuned.get("beam_size", STTConfig.beam_size))),
+                "cpu_threads": int(os.getenv("STT_CPU_THREADS", tuned.get("cpu_threads", STTConfig.cpu_threads))),
+                "streaming": os.getenv("STT_STREAMING", "0") == "1",
+                "num_workers": int(os.getenv("STT_NUM_WORKERS", STTConfig.num_workers)),
+                "batched": os.getenv("STT_BATCHED", "0") == "1"
+            }),
             vad=VADConfig(),
+            pipeline=PipelineConfig(
+                full_duplex=os.getenv("PIPELINE_FULL_DUPLEX", "1") != "0"
+            ),
             agent=AgentConfig(
-                api_base=os.getenv("AGENT_API_BASE", AgentConfig.api_base)
+                api_base=os.getenv("AGENT_API_BASE", AgentConfig.api_base),
+                api_bases=[url.strip() for url in os.getenv("AGENT_API_BASES", "").split(",") if url.strip()]
             ),
             weather=WeatherConfig(
                 seniverse_key=os.getenv("WEATHER_KEY", WeatherConfig.seniverse_key)
+            ),
+            http=HttpConfig(),
+            memory=MemoryConfig(
+                enabled=os.getenv("MEMORY_ENABLED", "1") != "0",
+                path=os.getenv("MEMORY_PATH", MemoryConfig.path)
+            ),
+            answer_cache=AnswerCacheConfig(
+                enabled=os.getenv("ANSWER_CACHE_ENABLED", "1") != "0"
+            ),
+            audio_cache=AudioCacheConfig(
+                enabled=os.getenv("TTS_CACHE_ENABLED", "1") != "0",
+                path=os.getenv("TTS_CACHE_PATH", AudioCacheConfig.path),
+                prewarm_path=os.getenv("TTS_CACHE_PREWARM", AudioCacheConfig.prewarm_path)
+            ),
+            server=ServerConfig(
+                host=os.getenv("SERVER_HOST", ServerConfig.host),
+                port=int(os.getenv("SERVER_PORT", ServerConfig.port))
+            ),
+            batch=BatchConfig(
+                workers=int(os.getenv("BATCH_WORKERS", BatchConfig.workers))
             )
         )
 
@@ -80,6 +281,13 @@ default_config = AppConfig(
     tts=TTSConfig(),
     stt=STTConfig(),
     vad=VADConfig(),
+    pipeline=PipelineConfig(),
     agent=AgentConfig(),
-    weather=WeatherConfig()
+    weather=WeatherConfig(),
+    http=HttpConfig(),
+    memory=MemoryConfig(),
+    answer_cache=AnswerCacheConfig(),
+    audio_cache=AudioCacheConfig(),
+    server=ServerConfig(),
+    batch=BatchConfig()
 )
\ No newline at end of file
@@ -18,19 +18,31 @@ def main():
     parser = argparse.ArgumentParser(description="SmolAgents 多模态对话系统")
 
     # 添加 --launch 参数
-    # choices 限制了只能输入 text 或 talk
+    # choices 限制了可选的启动模式
     # default="talk" 确保了如果直接运行 python main.py，它默认进入语音模式
     parser.add_argument(
         "--launch",
-        choices=["text", "talk"],
+        choices=["text", "talk", "serve", "batch"],
         default="talk",
-        help="启动模式: text (文字模式) 或 talk (语音模式)"
+        help="启动模式: text (文字模式)、talk (语音模式)、serve (多会话 HTTP/WebSocket 服务) 或 batch (批量评测)"
     )
+    # batch 模式的参数
+    parser.add_argument("--input", help="batch 模式: 输入 JSONL，每行 {\"id\", \"prompt\"} 或 {\"id\", \"turns\": [...]}")
+    parser.add_argument("--output", help="batch 模式: 结果 JSONL 路径")
+    parser.add_argument("--workers", type=int, help="batch 模式: 并行的 Agent 实例数")
 
     args = parser.parse_args()
+    if args.launch == "batch" and not args.input:
+        parser.error("batch 模式需要 --input")
 
     # 2. 加载配置
     config = AppConfig.from_env()
+    if args.input:
+        config.batch.input_path = args.input
+    if args.output:
+        config.batch.output_path = args.output
+    if args.workers:
+        config.batch.workers = args.workers
 
     # 3. 启动协调器
     orchestrator = VoiceAgentOrchestrator(config, launch_mode=args.launch)
@@ -0,0 +1,43 @@
+import re
+import zlib
+from typing import List
+import numpy as np
+
+_PUNCTUATION = re.compile(r"[\s\u3000-\u303f\uff00-\uff0f\uff1a-\uff20\uff3b-\uff40\uff5b-\uff65!-/:-@\[-`{-~]+")
+
+
+class HashingEmbedder:
+    """
+    离线的字符 n-gram 哈希向量
+
+    把 1~3 字的 n-gram 哈希到固定维度（带符号，减少碰撞的影响），按 log(1+tf) 加权后 L2 归一化。
+    不依赖任何模型文件，CPU 上每条文本微秒级，适合“说过的话/记下的事实”这类短文本召回。
+    """
+
+    def __init__(self, dim: int = 256, ngram_sizes=(1, 2, 3)):
+        self.dim = dim
+        self.ngram_sizes = ngram_sizes
+
+    def _features(self, text: str) -> List[str]:
+        text = _PUNCTUATION.sub(" ", text.lower()).strip()
+        features = []
+        for word in text.split():
+            for n in self.ngram_sizes:
+                features.extend(word[i:i + n] for i in range(len(word) - n + 1))
+        return features
+
+    def embed(self, text: str) -> np.ndarray:
+        """单条文本 → 归一化的 float32 向量"""
+        vector = np.zeros(self.dim, dtype=np.float32)
+        counts = {}
+        for feature in self._features(text):
+            counts[feature] = counts.get(feature, 0) + 1
+        for feature, count in counts.items():
+            digest = zlib.crc32(feature.encode("utf-8"))
+            sign = 1.0 if digest & 0x80000000 else -1.0
+            vector[digest % self.dim] += sign * np.log1p(count)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm > 0 else vector
+
+    def embed_batch(self, texts: List[str]) -> np.ndarray:
+        return np.stack([self.embed(text) for text in texts]) if texts else np.zeros((0, self.dim), np.float32)
@@ -0,0 +1,54 @@
+import time
+from typing import List, Tuple
+from config.settings import MemoryConfig
+from .embedder import HashingEmbedder
+from .vector_store import VectorStore
+
+
+class LongTermMemory:
+    """
+    跨会话的长期记忆
+
+    把每轮问答和用户要求记住的事实向量化后存入本地向量库，
+    新一轮开始时检索最相关的几条注入上下文，也可以由 Agent 通过工具主动检索。
+    """
+
+    def __init__(self, config: MemoryConfig):
+        self.config = config
+        self.store = VectorStore(config.path, dim=config.dim, dtype=config.dtype)
+        # 已有向量库沿用它的维度（配置改过也一样），否则检索和写入都会维度不匹配
+        self.embedder = HashingEmbedder(dim=self.store.dim)
+        print(f"[Memory] 长期记忆已加载: {len(self.store)} 条 ({config.path})")
+
+    def remember(self, text: str, kind: str = "fact", embed_text: str = ""):
+        """
+        记下一条文本
+
+        Args:
+            text: 保存并在命中时返回的文本
+            kind: 类别（fact / turn）
+            embed_text: 用于向量化的文本，默认与 text 相同
+        """
+        text = text.strip()
+        if not text:
+            return
+        vector = self.embedder.embed(embed_text or text)
+        self.store.add(vector, [{"text": text, "kind": kind, "time": int(time.time())}])
+
+    def remember_turn(self, user: str, assistant: str):
+        """记下一轮问答"""
+        if self.config.remember_turns and user.strip():
+            # “用户/助手”标签每条都有，不参与向量化，以免所有轮次彼此相似
+            self.remember(
+                f"用户：{user.strip()}\n助手：{assistant.strip()}",
+                kind="turn",
+                embed_text=f"{user} {assistant}"
+            )
+
+    def search(self, query: str, top_k: int = 0) -> List[Tuple[float, dict]]:
+        """检索与 query 最相关且相似度不低于 min_score 的记忆"""
+        results = self.store.search(self.embedder.embed(query), top_k or self.config.top_k)
+        return [(score, item) for score, item in results if score >= self.config.min_score]
+
+    def close(self):
+        self.store.close()
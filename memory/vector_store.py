@@ -0,0 +1,150 @@
+import json
+import os
+import threading
+from typing import List, Optional, Tuple
+import numpy as np
+
+
+class VectorStore:
+    """
+    内存映射的向量库
+
+    目录结构：
+        info.json    维度与存储精度
+        vectors.bin  预分配的向量矩阵（float32 或 int8，按需成倍扩容），通过 np.memmap 访问
+        meta.jsonl   只追加的元数据日志，每行对应矩阵中的一行
+
+    写入时先写向量、再追加元数据行，meta.jsonl 的行数就是有效条目数；
+    进程中途退出最多丢掉最后一条，重启时不需要重建索引。
+    """
+
+    INITIAL_CAPACITY = 1024
+    SEARCH_BLOCK = 16384  # int8 检索时每次反量化的行数，限制临时内存
+
+    def __init__(self, path: str, dim: int, dtype: str = "float32"):
+        if dtype not in ("float32", "int8"):
+            raise ValueError(f"不支持的存储精度: {dtype}")
+        os.makedirs(path, exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+        self._info_path = os.path.join(path, "info.json")
+        self._vectors_path = os.path.join(path, "vectors.bin")
+        self._meta_path = os.path.join(path, "meta.jsonl")
+
+        if os.path.exists(self._info_path):
+            with open(self._info_path, "r", encoding="utf-8") as f:
+                info = json.load(f)
+            if info["dim"] != dim or info["dtype"] != dtype:
+                print(f"[Memory警告] 已有向量库为 dim={info['dim']}, dtype={info['dtype']}，沿用已有设置")
+            dim, dtype = info["dim"], info["dtype"]
+        else:
+            with open(self._info_path, "w", encoding="utf-8") as f:
+                json.dump({"dim": dim, "dtype": dtype}, f)
+
+        self.dim = dim
+        self.dtype = np.dtype(dtype)
+        row_bytes = self.dim * self.dtype.itemsize
+        existing = os.path.getsize(self._vectors_path) // row_bytes if os.path.exists(self._vectors_path) else 0
+        # 元数据只按行切分、保留原始字节，检索命中时才解析 JSON
+        self._meta_lines: List[bytes] = []
+        if os.path.exists(self._meta_path):
+            self._load_meta(existing)
+        self._meta_file = open(self._meta_path, "ab")
+
+        self._matrix: Optional[np.memmap] = None
+        self._open_matrix(max(existing, len(self._meta_lines), self.INITIAL_CAPACITY))
+
+    def _load_meta(self, rows: int):
+        """
+        读取元数据行
+
+        进程中途退出可能留下没有换行符的半行，之后追加的行会接在它后面，整行都无法解析；
+        读取时把最后一个换行符之后的内容截掉，行数也不超过向量文件的行数。
+        """
+        with open(self._meta_path, "rb") as f:
+            data = f.read()
+        offset = 0
+        while len(self._meta_lines) < rows:
+            newline = data.find(b"\n", offset)
+            if newline < 0:
+                break
+            line = data[offset:newline]
+            offset = newline + 1
+            if line:
+                self._meta_lines.append(line)
+        if offset < len(data):
+            print(f"[Memory警告] 元数据末尾有 {len(data) - offset} 字节不完整或多出的内容，已截掉")
+            with open(self._meta_path, "r+b") as f:
+                f.truncate(offset)
+
+    def __len__(self) -> int:
+        return len(self._meta_lines)
+
+    def _open_matrix(self, capacity: int):
+        """按容量打开（必要时扩大）向量文件"""
+        if self._matrix is not None:
+            self._matrix.flush()
+            del self._matrix
+        size = capacity * self.dim * self.dtype.itemsize
+        with open(self._vectors_path, "ab") as f:
+            if f.tell() < size:
+                f.truncate(size)
+        self._matrix = np.memmap(self._vectors_path, dtype=self.dtype, mode="r+", shape=(capacity, self.dim))
+
+    def _encode(self, vectors: np.ndarray) -> np.ndarray:
+        if self.dtype == np.int8:
+            # 归一化向量的分量在 [-1, 1]，线性量化到 [-127, 127]
+            return np.clip(np.round(vectors * 127), -127, 127).astype(np.int8)
+        return vectors.astype(np.float32)
+
+    def add(self, vectors: np.ndarray, metadata: List[dict]):
+        """追加若干条（向量须已 L2 归一化）"""
+        vectors = np.atleast_2d(vectors)
+        if len(vectors) != len(metadata):
+            raise ValueError("向量与元数据数量不一致")
+        with self._lock:
+            start = len(self._meta_lines)
+            end = start + len(vectors)
+            if end > self._matrix.shape[0]:
+                self._open_matrix(max(end, self._matrix.shape[0] * 2))
+            self._matrix[start:end] = self._encode(vectors)
+            self._matrix.flush()
+            lines = [json.dumps(item, ensure_ascii=False).encode("utf-8") for item in metadata]
+            self._meta_file.write(b"".join(line + b"\n" for line in lines))
+            self._meta_file.flush()
+            self._meta_lines.extend(lines)
+
+    def search(self, query: np.ndarray, top_k: int = 5) -> List[Tuple[float, dict]]:
+        """
+        余弦相似度 top-k
+
+        Returns:
+            [(相似度, 元数据), ...]，按相似度从高到低
+        """
+        with self._lock:
+            count = len(self._meta_lines)
+            if count == 0 or top_k <= 0:
+                return []
+            matrix = self._matrix[:count]
+            query = query.astype(np.float32)
+            if self.dtype == np.int8:
+                scores = np.empty(count, dtype=np.float32)
+                for start in range(0, count, self.SEARCH_BLOCK):
+                    block = matrix[start:start + self.SEARCH_BLOCK].astype(np.float32)
+                    scores[start:start + len(block)] = block @ query
+                scores /= 127
+            else:
+                scores = matrix @ query
+
+            k = min(top_k, count)
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top])]
+            return [(float(scores[i]), json.loads(self._meta_lines[i])) for i in top]
+
+    def close(self):
+        with self._lock:
+            if self._matrix is not None:
+                self._matrix.flush()
+                del self._matrix
+                self._matrix = None
+            self._meta_file.close()
@@ -1,10 +1,88 @@
+import asyncio
+import threading
+from typing import Callable, Dict, Optional
 from config.settings import AppConfig
 from stt.whisper_stt import WhisperSTT
 from stt.vad_recorder import VADRecorder
+from stt.streaming_stt import StreamingTranscriber
+from stt.gate import SpeechGate
+from stt.service import STTService
 from tts.fish_speech_tts import FishSpeechTTS, AsyncTTSWorker
+from tts.audio_cache import prewarm_phrases
 from agent.code_agent import SmolCodeAgent
-from utils.text_splitter import SentenceSplitter
-import os
+from agent.answer_cache import AnswerCache, CachedAnswer
+from utils.text_splitter import IncrementalSentenceSplitter
+from pipeline.talk_pipeline import TalkPipeline
+from pipeline.barge_in import BargeInController
+from pipeline.batch_runner import BatchRunner
+from utils.http_client import HttpClient
+
+class _AnswerAudio:
+    """
+    收集一轮回答各句合成好的音频
+
+    合成比回答结束得晚，也可能早：回答写入缓存之前到达的音频先暂存，
+    bind() 拿到缓存条目后一并挂上，之后到达的直接挂上。
+    """
+
+    def __init__(self, cache: AnswerCache):
+        self.cache = cache
+        self._entry: Optional[CachedAnswer] = None
+        self._bound = False
+        self._pending: Dict[str, bytes] = {}
+        self._lock = threading.Lock()
+
+    def callback(self, sentence: str) -> Callable[[bytes], None]:
+        return lambda audio: self._add(sentence, audio)
+
+    def _add(self, sentence: str, audio: bytes):
+        with self._lock:
+            if not self._bound:
+                self._pending[sentence] = audio
+                return
+            entry = self._entry
+        if entry is not None:
+            self.cache.attach_audio(entry, sentence, audio)
+
+    def bind(self, entry: Optional[CachedAnswer]):
+        """回答结束：entry 为 None 表示本轮不缓存"""
+        with self._lock:
+            self._entry, self._bound = entry, True
+            pending, self._pending = self._pending, {}
+        if entry is not None:
+            for sentence, audio in pending.items():
+                self.cache.attach_audio(entry, sentence, audio)
+
+
+class _Filler:
+    """
+    Agent 迟迟没有产出第一句时先播放一句过渡语
+
+    第一句到达（cancel）之前计时到期才播放；过渡语的音频已在磁盘缓存里，播放不经网络。
+    """
+
+    def __init__(self, worker: AsyncTTSWorker, text: str, delay: float, generation: int):
+        self.worker = worker
+        self.text = text
+        self.generation = generation
+        self._done = False
+        self._lock = threading.Lock()
+        self._timer = threading.Timer(delay, self._play)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def _play(self):
+        with self._lock:
+            if self._done:
+                return
+            self._done = True
+        self.worker.add_task(self.text, generation=self.generation)
+
+    def cancel(self):
+        with self._lock:
+            self._done = True
+        self._timer.cancel()
+
 
 class VoiceAgentOrchestrator:
     """语音Agent协调器"""
@@ -12,29 +90,72 @@ class VoiceAgentOrchestrator:
     def __init__(self, config: AppConfig, launch_mode: str = "talk"):
         self.config = config
         self.launch_mode = launch_mode
+        # 共享 HTTP 连接池：TTS 与工具调用都复用到各主机的长连接
+        self.http = HttpClient.shared(config.http)
 
         # 1. 基础组件：无论什么模式都需要 Agent
-        self.agent = SmolCodeAgent(config.agent, config.weather)
-        self.splitter = SentenceSplitter()
+        if launch_mode == "batch":
+            # 评测结果要反映模型本身：不带长期记忆和回答缓存
+            self.agent = SmolCodeAgent(config.agent, config.weather)
+        else:
+            self.agent = SmolCodeAgent(config.agent, config.weather, config.memory, config.answer_cache)
         # 2. 语音组件：只有在 talk 模式下才初始化，节省资源
         if self.launch_mode == "talk":
-            self.stt = WhisperSTT(config.stt)
+            # 配置了多个工作单元或批量解码时，经 STT 服务排队识别
+            if config.stt.batched or config.stt.num_workers > 1:
+                self.stt = STTService(config.stt, config.vad.sample_rate)
+            else:
+                self.stt = WhisperSTT(config.stt)
             self.recorder = VADRecorder(config.vad)
-            self.tts = FishSpeechTTS(config.tts)
-            self.tts_worker = AsyncTTSWorker(self.tts)
+            # 送入 Whisper 之前先过滤噪声触发的片段
+            self.gate = SpeechGate(config.vad)
+            # 增量转写：说话期间就开始识别
+            self.streaming_stt = None
+            if config.stt.streaming:
+                self.streaming_stt = StreamingTranscriber(self.stt, config.stt, config.vad.sample_rate)
+                self.recorder.on_segment_audio = self.streaming_stt.feed
+                self.recorder.partial_text = self.streaming_stt.partial_text
+            self.tts = FishSpeechTTS(config.tts, config.audio_cache)
+            # 多个 TTS 端点时，至少每个端点一个合成线程，并提前合成足够多的句子让各端点同时工作
+            endpoints = len(self.tts.endpoints)
+            self.tts_worker = AsyncTTSWorker(
+                self.tts,
+                lookahead=max(config.tts.lookahead, endpoints),
+                synth_workers=max(config.tts.synth_workers, endpoints)
+            )
+
+            self.barge_in = None
+            if config.vad.barge_in:
+                self.barge_in = BargeInController(
+                    self.recorder, self.tts_worker, self.agent,
+                    min_speech_frames=config.vad.barge_in_min_frames
+                )
 
             # 语音组件状态检查
             if not all([self.stt.is_ready(), self.tts.is_ready()]):
                 raise RuntimeError("语音组件初始化失败")
+            self._start_prewarm()
+        elif self.launch_mode == "serve":
+            # 服务模式：识别统一经 STT 服务排队，TTS 客户端共享；不需要本地录音和播放
+            self.stt = STTService(config.stt, config.vad.sample_rate)
+            self.tts = FishSpeechTTS(config.tts, config.audio_cache)
+            if not self.tts.is_ready():
+                print("[系统警告] TTS 不可用，服务只返回文字")
+            self._start_prewarm()
+            self.recorder = None
+            self.gate = None
+            self.streaming_stt = None
+            self.tts_worker = None
+            self.barge_in = None
         else:
             # text 模式下，将语音组件设为 None，避免后续调用报错
             self.stt = None
             self.recorder = None
+            self.gate = None
+            self.streaming_stt = None
             self.tts = None
             self.tts_worker = None
-
-        self.memory = []
-        self.max_memory_length = 10  # 限制记忆轮数，防止 Token 超限
+            self.barge_in = None
 
         # Agent 状态检查
         if not self.agent.is_ready():
@@ -46,6 +167,10 @@ class VoiceAgentOrchestrator:
         """运行主循环"""
         if self.launch_mode == "text":
             self._run_text_loop()
+        elif self.launch_mode == "serve":
+            self._run_server()
+        elif self.launch_mode == "batch":
+            BatchRunner(self.agent, self.config.batch).run()
         else:
             # 将原本语音模式的代码逻辑
             # 封装到 _run_talk_loop 中，或者直接写在这里
@@ -81,57 +206,145 @@ class VoiceAgentOrchestrator:
     def _run_talk_loop(self):
         """运行主循环"""
         try:
-            while True:
-                # 1. 录音
-                audio_file = self.recorder.listen()
+            if self.config.pipeline.full_duplex:
+                pipeline = TalkPipeline(
+                    self.recorder, self.stt, self.tts_worker,
+                    streaming_stt=self.streaming_stt,
+                    on_text=self._handle_voice_input,
+                    config=self.config.pipeline,
+                    barge_in=self.barge_in,
+                    gate=self.gate,
+                    use_speech_timestamps=self.config.stt.use_speech_timestamps
+                )
+                asyncio.run(pipeline.run())
+                return
 
-                # 检查文件是否存在且大小正常
-                if not audio_file or not os.path.exists(audio_file):
+            while True:
+                # 1. 录音（常驻采集流，语音直接以内存数组交给 STT）
+                utterance = self.recorder.listen(
+                    on_frame=self.barge_in.on_frame if self.barge_in else None
+                )
+                if self.barge_in:
+                    self.barge_in.take_triggered()
+                if utterance is None or len(utterance.audio) == 0:
                     continue
 
-                # 2. 语音转文本
-                print("[STT] 正在识别...")
-                user_input = self.stt.transcribe(audio_file)
-
-                # --- 关键逻辑：识别后立即删除临时音频文件 ---
-                try:
-                    os.remove(audio_file)
-                except:
-                    pass
-
-                # 3. 过滤掉幻觉内容
-                # 如果识别结果跟你的 initial_prompt 高度相似，直接舍弃
-                if not user_input or "普通话" in user_input or "简体中文" in user_input:
-                    print("[系统] 忽略无效输入或幻觉")
+                # 2. 语音转文本（增量模式下只需解码尾部）
+                session = self.streaming_stt.end_segment() if self.streaming_stt else None
+                reason = self.gate.check(utterance)
+                if reason:
+                    print(f"[VAD] 忽略本段语音: {reason}")
+                    if session is not None:
+                        session.cancel()
                     continue
 
-                # if not user_input:
-                #     print("[STT] 未识别到有效内容")
-                #     continue
-
-                print(f"\n用户: {user_input}")
+                print("[STT] 正在识别...")
+                if session is not None:
+                    user_input = session.finish()
+                else:
+                    clips = utterance.clip_timestamps() if self.config.stt.use_speech_timestamps else None
+                    user_input = self.stt.transcribe_array(utterance.audio, clips)
+                self.recorder.endpointer.observe_transcript(user_input, utterance.duration)
 
-                # 3. 检查退出指令
-                if self._is_exit_command(user_input):
-                    self.tts_worker.add_task("好的，再见。")
-                    self.tts_worker.wait_complete()
+                if not self._handle_voice_input(user_input):
                     break
 
-                # 4. Agent处理
-                print("[Agent] 思考中...")
-                response = self.agent.process(user_input)
-                print(f"\nAgent: {response}\n")
-
-                # 5. 切分句子并异步播放
-                sentences = self.splitter.split(response)
-                for sentence in sentences:
-                    self.tts_worker.add_task(sentence)
-
         except KeyboardInterrupt:
             print("\n\n[系统] 接收到中断信号")
         finally:
             self.shutdown()
 
+    def _run_server(self):
+        """服务模式：多个客户端通过 HTTP/WebSocket 各自对话，直到 Ctrl+C"""
+        # 按需导入：只有服务模式需要 aiohttp
+        from server.app import VoiceServer
+        server = VoiceServer(self.config, self.agent, self.stt, self.tts if self.tts.is_ready() else None)
+        server.run()
+
+    def _start_prewarm(self):
+        """后台预先合成常用短句，不拖慢启动"""
+        if self.tts.audio_cache is None or not self.tts.is_ready():
+            return
+        phrases = prewarm_phrases(self.config.audio_cache)
+
+        def run():
+            count = self.tts.prewarm(phrases)
+            if count:
+                print(f"[TTS缓存] 预热完成，新合成 {count} 句")
+
+        threading.Thread(target=run, daemon=True, name="tts-prewarm").start()
+
+    def _start_filler(self, generation: int) -> Optional[_Filler]:
+        """过渡语已缓存时开始计时，否则不播放（现合成的过渡语来得比回答还慢）"""
+        filler = self.config.audio_cache.filler
+        if not filler or not self.tts.is_cached(filler):
+            return None
+        return _Filler(self.tts_worker, filler, self.config.audio_cache.filler_delay, generation)
+
+    def _handle_voice_input(self, user_input: str) -> bool:
+        """
+        处理一轮语音识别结果
+
+        Returns:
+            False 表示用户要求结束对话
+        """
+        # 3. 低置信度结果已在 STT 中按 no_speech_prob / avg_logprob 丢弃
+        if not user_input:
+            print("[系统] 忽略无效输入")
+            return True
+
+        print(f"\n用户: {user_input}")
+
+        # 3. 检查退出指令
+        if self._is_exit_command(user_input):
+            self.tts_worker.add_task("好的，再见。")
+            self.tts_worker.wait_complete()
+            return False
+
+        # 记下本轮的播放代号，用户插话后本轮剩余的句子会被丢弃
+        generation = self.tts_worker.generation
+        cache = self.agent.answer_cache
+
+        # 4. 命中回答缓存：不经过模型，合成过的句子直接播放已有音频
+        cached = self.agent.cached_answer(user_input)
+        if cached is not None:
+            splitter = IncrementalSentenceSplitter()
+            for sentence in splitter.feed(cached.text) + splitter.flush():
+                self.tts_worker.add_task(
+                    sentence,
+                    generation=generation,
+                    audio=cache.audio_for(cached, sentence),
+                    on_audio=lambda audio, sentence=sentence: cache.attach_audio(cached, sentence, audio)
+                )
+            print(f"\nAgent(缓存): {cached.text}\n")
+            return True
+
+        # 5. Agent处理：流式接收回答，每凑齐一句立即送去合成播放
+        print("[Agent] 思考中...")
+        answer_audio = _AnswerAudio(cache) if cache is not None else None
+        splitter = IncrementalSentenceSplitter()
+        chunks = []
+        filler = self._start_filler(generation)
+
+        def speak(sentence: str):
+            if filler:
+                filler.cancel()
+            on_audio = answer_audio.callback(sentence) if answer_audio else None
+            self.tts_worker.add_task(sentence, generation=generation, on_audio=on_audio)
+
+        for chunk in self.agent.process_stream(user_input, use_cache=False):
+            chunks.append(chunk)
+            for sentence in splitter.feed(chunk):
+                speak(sentence)
+        for sentence in splitter.flush():
+            speak(sentence)
+        if filler:
+            filler.cancel()
+        if answer_audio:
+            answer_audio.bind(self.agent.last_cached)
+        print(f"\nAgent: {''.join(chunks)}\n")
+        return True
+
     def _is_exit_command(self, text: str) -> bool:
         """检查是否为退出指令"""
         exit_keywords = ["退出", "再见", "结束", "拜拜"]
@@ -143,4 +356,27 @@ class VoiceAgentOrchestrator:
         # 关键点：增加判断，只有在语音模式且 worker 存在时才停止
         if self.launch_mode == "talk" and self.tts_worker:
             self.tts_worker.stop()
+        if self.recorder:
+            self.recorder.close()
+        if self.streaming_stt:
+            self.streaming_stt.close()
+        if isinstance(self.stt, STTService):
+            self.stt.close()
+        if getattr(self.agent, "router", None):
+            print(f"[Router] {self.agent.router.stats.summary()}")
+        if getattr(self.agent, "answer_cache", None):
+            print(f"[回答缓存] {self.agent.answer_cache.summary()}")
+        if getattr(self.agent, "weather_tool", None):
+            print(f"[天气缓存] {self.agent.weather_tool.cache.summary()}")
+        if getattr(self.agent.model, "stats", None):
+            print(f"[LLM] {self.agent.model.stats.summary()}")
+        if getattr(self.agent.model, "pool", None):
+            print(f"[LLM后端]\n{self.agent.model.pool.summary()}")
+        if isinstance(self.tts, FishSpeechTTS) and self.tts.audio_cache is not None:
+            print(f"[TTS缓存] {self.tts.audio_cache.summary()}")
+        if isinstance(self.tts, FishSpeechTTS) and len(self.tts.endpoints) > 1:
+            print(f"[TTS端点]\n{self.tts.endpoints.summary()}")
+        print(f"[HTTP] {self.http.summary()}")
+        if getattr(self.agent, "long_term", None):
+            self.agent.long_term.close()
         print("[系统] 已安全退出")
\ No newline at end of file
@@ -0,0 +1,40 @@
+from agent.base import BaseAgent
+from stt.vad_recorder import VADRecorder
+from tts.fish_speech_tts import AsyncTTSWorker
+
+
+class BargeInController:
+    """
+    插话检测
+
+    播放或合成期间，用户连续说话超过 min_speech_frames 帧即视为插话：
+    立即停止播放、清空待合成句子、中止进行中的 TTS 请求，并把 Agent 当前轮标记为被打断。
+    较短的语音多半是扬声器回声，不触发打断。
+    """
+
+    def __init__(self, recorder: VADRecorder, tts_worker: AsyncTTSWorker, agent: BaseAgent,
+                 min_speech_frames: int):
+        self.recorder = recorder
+        self.tts_worker = tts_worker
+        self.agent = agent
+        self.min_speech_frames = min_speech_frames
+        self._triggered = False
+
+    def on_frame(self):
+        """每处理完一帧调用一次"""
+        if self._triggered or not self.recorder.is_speaking:
+            return
+        if not self.tts_worker.is_busy() and not self.agent.is_busy():
+            return
+        if self.recorder.voiced_frames < self.min_speech_frames:
+            return
+
+        self._triggered = True
+        print("[Barge-in] 检测到用户插话，停止播放")
+        self.tts_worker.interrupt()
+        self.agent.interrupt()
+
+    def take_triggered(self) -> bool:
+        """取出并清除“当前这句话触发过插话”的标记"""
+        triggered, self._triggered = self._triggered, False
+        return triggered
@@ -0,0 +1,143 @@
+import json
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import List
+import numpy as np
+from agent.code_agent import SmolCodeAgent
+from config.settings import BatchConfig
+
+
+@dataclass
+class Conversation:
+    """一条评测用例：单轮 prompt 或多轮对话"""
+    id: str
+    turns: List[str]
+
+
+def load_conversations(path: str) -> List[Conversation]:
+    """
+    读取评测集
+
+    每行一个 JSON 对象：{"id": ..., "prompt": "..."} 或 {"id": ..., "turns": ["...", "..."]}，
+    缺少 id 时用行号。空行跳过，格式错误的行报错并指出行号。
+    """
+    conversations = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line_no, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                item = json.loads(line)
+            except ValueError as e:
+                raise ValueError(f"{path}:{line_no} 不是有效的 JSON: {e}")
+            turns = item.get("turns") or ([item["prompt"]] if "prompt" in item else [])
+            if not turns or not all(isinstance(turn, str) for turn in turns):
+                raise ValueError(f"{path}:{line_no} 缺少 prompt 或 turns")
+            conversations.append(Conversation(id=str(item.get("id", line_no)), turns=turns))
+    return conversations
+
+
+class BatchStats:
+    """批量运行统计：吞吐、逐轮延迟分位数、步数与错误率"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies: List[float] = []
+        self.steps: List[int] = []
+        self.errors = 0
+        self.conversations = 0
+        self.routes: Counter = Counter()
+        self.started_at = time.perf_counter()
+
+    def record_turn(self, latency: float, steps: int, route: str, error: bool):
+        with self._lock:
+            self.latencies.append(latency)
+            self.steps.append(steps)
+            self.routes[route or "unknown"] += 1
+            self.errors += int(error)
+
+    def record_conversation(self):
+        with self._lock:
+            self.conversations += 1
+
+    def summary(self) -> str:
+        with self._lock:
+            wall = time.perf_counter() - self.started_at
+            turns = len(self.latencies)
+            if not turns:
+                return "没有完成任何一轮"
+            p50, p90, p99 = np.percentile(self.latencies, [50, 90, 99]) * 1000
+            agent_steps = [s for s in self.steps if s > 0]
+            routes = ", ".join(f"{route} {count}" for route, count in self.routes.most_common())
+            return (
+                f"{self.conversations} 个对话 / {turns} 轮, 用时 {wall:.1f}s, "
+                f"吞吐 {turns / wall:.2f} 轮/s\n"
+                f"延迟 p50 {p50:.0f}ms, p90 {p90:.0f}ms, p99 {p99:.0f}ms, 最大 {max(self.latencies) * 1000:.0f}ms\n"
+                f"步数 平均 {np.mean(self.steps):.2f}"
+                f"{f'（进入 Agent 的轮次平均 {np.mean(agent_steps):.2f}, 最多 {max(agent_steps)}）' if agent_steps else ''}\n"
+                f"错误 {self.errors} ({self.errors / turns:.1%}); 通道: {routes}"
+            )
+
+
+class BatchRunner:
+    """
+    批量评测
+
+    每个对话分配一个独立的 Agent 会话（对话记忆互不影响、共享模型连接池），
+    workers 个对话并行执行，每轮结果完成即写入输出 JSONL。
+    """
+
+    def __init__(self, agent: SmolCodeAgent, config: BatchConfig):
+        self.agent = agent
+        self.config = config
+        self.stats = BatchStats()
+        self._write_lock = threading.Lock()
+
+    def run(self) -> BatchStats:
+        conversations = load_conversations(self.config.input_path)
+        total_turns = sum(len(c.turns) for c in conversations)
+        workers = max(1, self.config.workers)
+        print(f"[Batch] {len(conversations)} 个对话 / {total_turns} 轮, 并行 {workers}")
+        self.stats = BatchStats()
+        with open(self.config.output_path, "w", encoding="utf-8") as output:
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="batch") as executor:
+                futures = [executor.submit(self._run_conversation, c, output) for c in conversations]
+                for i, future in enumerate(futures, 1):
+                    future.result()
+                    if i % 50 == 0 or i == len(futures):
+                        print(f"[Batch] 进度 {i}/{len(futures)}")
+        print(f"[Batch] 结果已写入 {self.config.output_path}")
+        print(f"[Batch] {self.stats.summary()}")
+        return self.stats
+
+    def _run_conversation(self, conversation: Conversation, output):
+        session = self.agent.new_session()
+        for index, prompt in enumerate(conversation.turns):
+            started = time.perf_counter()
+            try:
+                answer = session.process(prompt)
+                info = session.last_turn
+                route, steps, step_errors, error = info.route, info.steps, info.step_errors, info.error
+            except Exception as e:
+                answer, route, steps, step_errors, error = "", "", 0, 0, f"{type(e).__name__}: {e}"
+            latency = time.perf_counter() - started
+            self.stats.record_turn(latency, steps, route, bool(error))
+            record = {
+                "id": conversation.id,
+                "turn": index,
+                "prompt": prompt,
+                "answer": answer,
+                "route": route,
+                "steps": steps,
+                "step_errors": step_errors,
+                "latency_ms": round(latency * 1000, 1),
+                "error": error or None,
+            }
+            with self._write_lock:
+                output.write(json.dumps(record, ensure_ascii=False) + "\n")
+                output.flush()
+        self.stats.record_conversation()
@@ -0,0 +1,206 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Callable, Dict, Optional
+from config.settings import PipelineConfig
+from stt.base import BaseSTT
+from stt.gate import SpeechGate
+from stt.vad_recorder import VADRecorder
+from stt.streaming_stt import StreamingTranscriber
+from tts.fish_speech_tts import AsyncTTSWorker
+from .barge_in import BargeInController
+
+
+@dataclass
+class StageStats:
+    """单个流水线阶段的统计"""
+    name: str
+    processed: int = 0
+    busy_time: float = 0.0
+    max_queue_depth: int = 0
+
+    def record(self, elapsed: float, queue_depth: int = 0):
+        self.processed += 1
+        self.busy_time += elapsed
+        self.max_queue_depth = max(self.max_queue_depth, queue_depth)
+
+    def summary(self, wall_time: float) -> str:
+        avg_ms = self.busy_time / self.processed * 1000 if self.processed else 0.0
+        utilization = self.busy_time / wall_time * 100 if wall_time > 0 else 0.0
+        return (f"{self.name}: 处理 {self.processed} 项, 平均 {avg_ms:.1f}ms, "
+                f"占用率 {utilization:.1f}%, 最大排队 {self.max_queue_depth}")
+
+
+class TalkPipeline:
+    """
+    全双工语音对话流水线
+
+    capture → VAD → STT → agent → TTS → playback 各阶段并发运行，
+    阶段之间用有界 asyncio 队列连接，下游处理不过来时上游自然阻塞（背压）。
+    麦克风在思考和播放期间也持续采集；TTS 与播放沿用 AsyncTTSWorker 的两级流水线。
+    """
+
+    def __init__(
+            self,
+            recorder: VADRecorder,
+            stt: BaseSTT,
+            tts_worker: AsyncTTSWorker,
+            on_text: Callable[[str], bool],
+            config: PipelineConfig,
+            streaming_stt: Optional[StreamingTranscriber] = None,
+            barge_in: Optional[BargeInController] = None,
+            gate: Optional[SpeechGate] = None,
+            use_speech_timestamps: bool = True
+    ):
+        """
+        Args:
+            recorder: 常驻采集流的录音器
+            stt: 语音识别
+            tts_worker: 合成与播放工作线程
+            on_text: 处理一轮识别文本（运行在 agent 线程中），返回 False 表示结束对话
+            config: 流水线配置
+            streaming_stt: 增量转写器（已接在 recorder 的分段音频回调上），None 表示整句识别
+            barge_in: 插话检测，None 表示不支持打断
+            gate: 送入 STT 前的语音门限，None 表示不过滤
+            use_speech_timestamps: 整句识别时只解码录音器给出的语音区间
+        """
+        self.recorder = recorder
+        self.stt = stt
+        self.tts_worker = tts_worker
+        self.on_text = on_text
+        self.config = config
+        self.streaming_stt = streaming_stt
+        self.barge_in = barge_in
+        self.gate = gate
+        self.use_speech_timestamps = use_speech_timestamps
+
+        self.stats: Dict[str, StageStats] = {
+            name: StageStats(name) for name in ("capture", "vad", "stt", "agent")
+        }
+        # 每个阻塞阶段独占线程池，互不抢占
+        self._capture_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="capture")
+        self._stt_executor = ThreadPoolExecutor(max_workers=max(1, config.stt_workers), thread_name_prefix="stt")
+        self._agent_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="agent")
+        self._stopped: Optional[asyncio.Event] = None
+        self._started_at = 0.0
+
+    async def run(self):
+        """
+        运行流水线，直到 on_text 返回 False
+
+        Raises:
+            任一阶段抛出的异常（其余阶段随之停止）
+        """
+        self.recorder.start()
+        self.recorder.reset()
+        self._stopped = asyncio.Event()
+        self._started_at = time.perf_counter()
+
+        frames: asyncio.Queue = asyncio.Queue(maxsize=self.config.frame_queue_size)
+        utterances: asyncio.Queue = asyncio.Queue(maxsize=self.config.utterance_queue_size)
+        texts: asyncio.Queue = asyncio.Queue(maxsize=self.config.text_queue_size)
+
+        tasks = [
+            asyncio.create_task(self._capture_stage(frames), name="capture"),
+            asyncio.create_task(self._vad_stage(frames, utterances), name="vad"),
+            asyncio.create_task(self._stt_stage(utterances, texts), name="stt"),
+            asyncio.create_task(self._agent_stage(texts), name="agent"),
+        ]
+        stopped = asyncio.create_task(self._stopped.wait(), name="stopped")
+        print("\n[Pipeline] 全双工流水线已启动，请直接说话...")
+
+        try:
+            # 任一阶段异常退出时整条流水线已经断了，不能继续等待结束信号
+            done, _ = await asyncio.wait(tasks + [stopped], return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task is not stopped and not task.cancelled() and task.exception() is not None:
+                    error = task.exception()
+                    print(f"[Pipeline错误] {task.get_name()} 阶段异常退出: {type(error).__name__}: {error}")
+                    raise error
+        finally:
+            stopped.cancel()
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(stopped, *tasks, return_exceptions=True)
+            for executor in (self._capture_executor, self._stt_executor, self._agent_executor):
+                executor.shutdown(wait=False, cancel_futures=True)
+            self.report()
+
+    async def _capture_stage(self, frames: asyncio.Queue):
+        """采集阶段：把录音器缓冲的帧搬进流水线"""
+        loop = asyncio.get_running_loop()
+        while True:
+            frame = await loop.run_in_executor(self._capture_executor, self.recorder.read_frame, 0.5)
+            if frame is None:
+                continue
+            start = time.perf_counter()
+            await frames.put(frame)
+            self.stats["capture"].record(time.perf_counter() - start, frames.qsize())
+
+    async def _vad_stage(self, frames: asyncio.Queue, utterances: asyncio.Queue):
+        """VAD 阶段：逐帧分段，凑成完整语句后交给 STT"""
+        while True:
+            frame = await frames.get()
+            start = time.perf_counter()
+            utterance = self.recorder.process_frame(frame)
+            if self.barge_in:
+                self.barge_in.on_frame()
+            self.stats["vad"].record(time.perf_counter() - start, frames.qsize())
+
+            if utterance is None:
+                continue
+            session = self.streaming_stt.end_segment() if self.streaming_stt else None
+            barged_in = self.barge_in.take_triggered() if self.barge_in else False
+            if not barged_in and self.config.suppress_while_speaking and self.tts_worker.is_busy():
+                # 播放期间拾到的多半是扬声器回声
+                print("[Pipeline] 播放中，忽略本段语音")
+                if session is not None:
+                    session.cancel()
+                continue
+            reason = self.gate.check(utterance) if self.gate else None
+            if reason:
+                print(f"[VAD] 忽略本段语音: {reason}")
+                if session is not None:
+                    session.cancel()
+                continue
+            await utterances.put((utterance, session))
+
+    async def _stt_stage(self, utterances: asyncio.Queue, texts: asyncio.Queue):
+        """STT 阶段：在独立线程池中识别"""
+        loop = asyncio.get_running_loop()
+        while True:
+            utterance, session = await utterances.get()
+            start = time.perf_counter()
+            print("[STT] 正在识别...")
+            if session is not None:
+                # 增量模式：说话期间已确认大部分文本，这里只解码尾部
+                text = await loop.run_in_executor(self._stt_executor, session.finish)
+            else:
+                clips = utterance.clip_timestamps() if self.use_speech_timestamps else None
+                text = await loop.run_in_executor(self._stt_executor, self.stt.transcribe_array, utterance.audio, clips)
+            elapsed = time.perf_counter() - start
+            self.stats["stt"].record(elapsed, utterances.qsize())
+            print(f"[STT] 耗时 {elapsed * 1000:.0f}ms (RTF {elapsed / max(utterance.duration, 1e-6):.2f})")
+            self.recorder.endpointer.observe_transcript(text, utterance.duration)
+            if text:
+                await texts.put(text)
+
+    async def _agent_stage(self, texts: asyncio.Queue):
+        """Agent 阶段：逐轮处理识别文本，回答送入 TTS 队列"""
+        loop = asyncio.get_running_loop()
+        while True:
+            text = await texts.get()
+            start = time.perf_counter()
+            keep_going = await loop.run_in_executor(self._agent_executor, self.on_text, text)
+            self.stats["agent"].record(time.perf_counter() - start, texts.qsize())
+            if not keep_going:
+                self._stopped.set()
+                return
+
+    def report(self):
+        """打印各阶段统计"""
+        wall_time = time.perf_counter() - self._started_at
+        print(f"[Pipeline] 运行 {wall_time:.1f}s")
+        for stats in self.stats.values():
+            print(f"[Pipeline]   {stats.summary(wall_time)}")
@@ -0,0 +1,343 @@
+import asyncio
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import AsyncIterator, Awaitable, Callable, Dict, Optional
+import numpy as np
+from aiohttp import WSMsgType, web
+from agent.code_agent import SmolCodeAgent
+from config.settings import AppConfig
+from stt.service import STTService
+from tts.fish_speech_tts import FishSpeechTTS
+from utils.http_client import AsyncHttpClient
+from utils.text_splitter import IncrementalSentenceSplitter
+from .session import Session, SessionBusyError, SessionLimitError, SessionManager
+
+# 发给客户端的一条消息：dict 以 JSON 文本帧发送，bytes 以二进制帧发送（一句话的 WAV）
+Emit = Callable[[object], Awaitable[None]]
+
+
+class VoiceServer:
+    """
+    多会话语音/文字服务（--launch serve）
+
+    接口：
+        GET  /v1/health  运行状态
+        POST /v1/chat    {"session_id"?: str, "text": str} → {"session_id", "answer"}
+        GET  /v1/ws      WebSocket，?session_id=...&audio=0|1
+
+    WebSocket 协议（客户端 → 服务端）：
+        {"type": "text", "text": "..."}   一轮文字输入
+        二进制帧                            16kHz 单声道 int16 PCM，累积为一句语音
+        {"type": "audio_end"}              一句语音结束，开始识别
+        {"type": "interrupt"}              插话：中止当前一轮
+    服务端 → 客户端：
+        {"type": "session", "session_id"}  连接建立
+        {"type": "transcript", "text"}     语音识别结果
+        {"type": "sentence", "text"}       回答的一句话，开启音频时紧跟该句的 WAV 二进制帧
+        {"type": "done", "answer"}         一轮结束
+        {"type": "busy"} / {"type": "error", "message"}
+
+    STT 服务、TTS 客户端和 LLM 连接池全部共享，每个会话只有自己的对话记忆。
+    同时在跑的轮次受 max_concurrent_turns 限制；每个会话的排队轮次受 session_queue 限制；
+    WebSocket 发送会等待写缓冲排空，慢客户端只会拖慢自己的那一轮。
+    """
+
+    def __init__(self, config: AppConfig, agent: SmolCodeAgent, stt: STTService, tts: Optional[FishSpeechTTS]):
+        self.config = config
+        self.server_config = config.server
+        self.agent = agent
+        self.stt = stt
+        self.tts = tts
+        self.sessions = SessionManager(agent, config.server)
+        # Agent 的流式生成是同步的，在线程池中运行；线程数即并发轮次上限
+        self._executor = ThreadPoolExecutor(
+            max_workers=max(1, self.server_config.max_concurrent_turns),
+            thread_name_prefix="agent-turn"
+        )
+        self._turn_slots: Optional[asyncio.Semaphore] = None
+        self._http: Optional[AsyncHttpClient] = None
+        self._eviction_task: Optional[asyncio.Task] = None
+        self.active_turns = 0
+        self.turn_latency_total = 0.0
+        self.turns = 0
+
+    def build_app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_get("/v1/health", self.handle_health)
+        app.router.add_post("/v1/chat", self.handle_chat)
+        app.router.add_get("/v1/ws", self.handle_ws)
+        app.on_startup.append(self._on_startup)
+        app.on_cleanup.append(self._on_cleanup)
+        return app
+
+    def run(self):
+        print(f"[Server] 监听 {self.server_config.host}:{self.server_config.port}")
+        web.run_app(self.build_app(), host=self.server_config.host, port=self.server_config.port, print=None)
+
+    async def _on_startup(self, app: web.Application):
+        self._turn_slots = asyncio.Semaphore(max(1, self.server_config.max_concurrent_turns))
+        self._http = AsyncHttpClient(self.config.http)
+        self._eviction_task = asyncio.create_task(self.sessions.run_eviction())
+
+    async def _on_cleanup(self, app: web.Application):
+        if self._eviction_task is not None:
+            self._eviction_task.cancel()
+        if self._http is not None:
+            await self._http.close()
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        print(f"[Server] {self.summary()}")
+
+    # ---------------- HTTP ----------------
+
+    async def handle_health(self, request: web.Request) -> web.Response:
+        return web.json_response({
+            "sessions": len(self.sessions),
+            "active_turns": self.active_turns,
+            "summary": self.summary(),
+        })
+
+    async def handle_chat(self, request: web.Request) -> web.Response:
+        try:
+            body = await request.json()
+        except ValueError:
+            return web.json_response({"error": "请求体不是有效的 JSON"}, status=400)
+        text = str(body.get("text", "")).strip()
+        if not text:
+            return web.json_response({"error": "缺少 text"}, status=400)
+        try:
+            session = self.sessions.get_or_create(body.get("session_id"))
+        except SessionLimitError as e:
+            return web.json_response({"error": str(e)}, status=503)
+
+        async def discard(message):
+            pass
+
+        try:
+            answer = await self.run_turn(session, text, discard, with_audio=False)
+        except SessionBusyError as e:
+            return web.json_response({"error": str(e)}, status=429)
+        return web.json_response({"session_id": session.id, "answer": answer})
+
+    # ---------------- WebSocket ----------------
+
+    async def handle_ws(self, request: web.Request) -> web.WebSocketResponse:
+        ws = web.WebSocketResponse(heartbeat=30)
+        await ws.prepare(request)
+        try:
+            session = self.sessions.get_or_create(request.query.get("session_id"))
+        except SessionLimitError as e:
+            await ws.send_json({"type": "error", "message": str(e)})
+            await ws.close()
+            return ws
+
+        with_audio = request.query.get("audio", "1") != "0" and self.tts is not None
+        session.on_evict = lambda: asyncio.ensure_future(ws.close())
+        send_lock = asyncio.Lock()
+
+        async def emit(message):
+            if ws.closed:
+                return
+            async with send_lock:
+                if isinstance(message, bytes):
+                    await ws.send_bytes(message)
+                else:
+                    await ws.send_json(message)
+
+        await emit({"type": "session", "session_id": session.id})
+        max_audio_bytes = int(self.server_config.max_utterance_seconds * self.config.vad.sample_rate) * 2
+        tasks = set()
+
+        def start(coro):
+            task = asyncio.create_task(coro)
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+
+        async for msg in ws:
+            session.touch()
+            if msg.type == WSMsgType.BINARY:
+                if len(session.audio_buffer) + len(msg.data) > max_audio_bytes:
+                    session.audio_buffer.clear()
+                    await emit({"type": "error", "message": "单句语音过长，已丢弃"})
+                else:
+                    session.audio_buffer.extend(msg.data)
+            elif msg.type == WSMsgType.TEXT:
+                try:
+                    data = json.loads(msg.data)
+                except ValueError:
+                    await emit({"type": "error", "message": "消息不是有效的 JSON"})
+                    continue
+                kind = data.get("type")
+                if kind == "text":
+                    start(self._ws_turn(session, str(data.get("text", "")), emit, with_audio))
+                elif kind == "audio_end":
+                    audio = bytes(session.audio_buffer)
+                    session.audio_buffer.clear()
+                    start(self._ws_voice_turn(session, audio, emit, with_audio))
+                elif kind == "interrupt":
+                    session.interrupt()
+                else:
+                    await emit({"type": "error", "message": f"未知的消息类型: {kind}"})
+            elif msg.type == WSMsgType.ERROR:
+                break
+
+        # 连接断开：中止这个会话进行中的轮次，会话本身保留到空闲回收，客户端可以带 session_id 重连
+        session.on_evict = None
+        if session.pending:
+            session.interrupt()
+        for task in list(tasks):
+            task.cancel()
+        return ws
+
+    async def _ws_voice_turn(self, session: Session, audio: bytes, emit: Emit, with_audio: bool):
+        if len(audio) < 2:
+            return
+        # 排队已满时不再做识别，免得识别结果排在后面也只能丢弃
+        if session.pending >= self.server_config.session_queue:
+            await emit({"type": "busy"})
+            return
+        samples = np.frombuffer(audio[:len(audio) // 2 * 2], dtype=np.int16)
+        try:
+            text = await asyncio.wrap_future(self.stt.submit(samples, source=session.id))
+        except Exception as e:
+            await emit({"type": "error", "message": f"语音识别失败: {e}"})
+            return
+        await emit({"type": "transcript", "text": text})
+        if text:
+            await self._ws_turn(session, text, emit, with_audio)
+
+    async def _ws_turn(self, session: Session, text: str, emit: Emit, with_audio: bool):
+        if not text.strip():
+            return
+        try:
+            answer = await self.run_turn(session, text, emit, with_audio)
+        except SessionBusyError:
+            await emit({"type": "busy"})
+            return
+        except Exception as e:
+            # 轮次在独立的任务里运行，异常不会有人等待，必须在这里告诉客户端
+            print(f"[Server错误] 会话 {session.id} 本轮失败: {type(e).__name__}: {e}")
+            await emit({"type": "error", "message": f"处理失败: {e}"})
+            return
+        await emit({"type": "done", "answer": answer})
+
+    # ---------------- 一轮对话 ----------------
+
+    async def run_turn(self, session: Session, text: str, emit: Emit, with_audio: bool) -> str:
+        """
+        在会话中执行一轮：回答逐句发送，开启音频时每句后面跟着合成好的 WAV
+
+        Raises:
+            SessionBusyError: 会话排队轮次已满
+        """
+        async with session.acquire_turn(self.server_config.session_queue):
+            generation = session.generation
+            async with self._turn_slots:
+                self.active_turns += 1
+                started = time.perf_counter()
+                try:
+                    return await self._answer(session, text, emit, with_audio, generation)
+                finally:
+                    self.active_turns -= 1
+                    self.turns += 1
+                    self.turn_latency_total += time.perf_counter() - started
+
+    async def _answer(self, session: Session, text: str, emit: Emit, with_audio: bool, generation: int) -> str:
+        agent = session.agent
+        cache = agent.answer_cache
+        # 查缓存会检索长期记忆、命中时写入对话记忆（可能同步生成摘要），不能在事件循环里做
+        loop = asyncio.get_running_loop()
+        cached = await loop.run_in_executor(self._executor, agent.cached_answer, text)
+        if cached is not None:
+            chunks = self._single(cached.text)
+        else:
+            chunks = self._agent_chunks(agent, text)
+
+        splitter = IncrementalSentenceSplitter()
+        answer = []
+        synthesized: Dict[str, bytes] = {}
+
+        async def speak(sentence: str):
+            if session.generation != generation:
+                return
+            await emit({"type": "sentence", "text": sentence})
+            if not with_audio:
+                return
+            audio = cache.audio_for(cached, sentence) if cached is not None else None
+            if audio is None:
+                audio = await self._synthesize(sentence)
+                synthesized[sentence] = audio
+            if audio and session.generation == generation:
+                await emit(audio)
+
+        try:
+            async for chunk in chunks:
+                answer.append(chunk)
+                for sentence in splitter.feed(chunk):
+                    await speak(sentence)
+            for sentence in splitter.flush():
+                await speak(sentence)
+        finally:
+            # 提前退出时立即收尾，释放 Agent 线程
+            await chunks.aclose()
+
+        # 新合成的音频挂到缓存条目上，下次同样的问题直接复用
+        entry = cached if cached is not None else agent.last_cached
+        if cache is not None and entry is not None:
+            for sentence, audio in synthesized.items():
+                if audio:
+                    cache.attach_audio(entry, sentence, audio)
+        return "".join(answer)
+
+    @staticmethod
+    async def _single(text: str) -> AsyncIterator[str]:
+        yield text
+
+    async def _agent_chunks(self, agent: SmolCodeAgent, text: str) -> AsyncIterator[str]:
+        """
+        在线程池中运行 Agent 的同步流式生成，逐段交给事件循环
+
+        队列有界：事件循环这边发送得慢时 Agent 线程阻塞等待，不会无限缓冲。
+        调用方提前退出（断线、插话）时中止 Agent 并排空队列，释放线程。
+        """
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue(maxsize=max(1, self.server_config.chunk_buffer))
+        done = object()
+
+        def put(item):
+            asyncio.run_coroutine_threadsafe(queue.put(item), loop).result()
+
+        def produce():
+            try:
+                for chunk in agent.process_stream(text, use_cache=False):
+                    put(chunk)
+            except Exception as e:
+                print(f"[Server错误] Agent 执行失败: {e}")
+            finally:
+                put(done)
+
+        future = loop.run_in_executor(self._executor, produce)
+        finished = False
+        try:
+            while True:
+                item = await queue.get()
+                if item is done:
+                    finished = True
+                    break
+                yield item
+        finally:
+            if not finished:
+                agent.interrupt()
+                while await queue.get() is not done:
+                    pass
+            await future
+
+    async def _synthesize(self, sentence: str) -> bytes:
+        chunks = []
+        async for chunk in self.tts.synthesize_stream_async(sentence, self._http):
+            chunks.append(chunk)
+        return b"".join(chunks)
+
+    def summary(self) -> str:
+        avg_ms = self.turn_latency_total / self.turns * 1000 if self.turns else 0.0
+        return f"{self.sessions.summary()}; 完成 {self.turns} 轮, 平均 {avg_ms:.0f}ms"
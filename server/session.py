@@ -0,0 +1,164 @@
+import asyncio
+import time
+import uuid
+from typing import Callable, Dict, List, Optional
+from agent.code_agent import SmolCodeAgent
+from config.settings import ServerConfig
+
+
+class SessionLimitError(RuntimeError):
+    """会话数已满且没有可回收的空闲会话"""
+
+
+class SessionBusyError(RuntimeError):
+    """会话排队的轮次已达上限"""
+
+
+class Session:
+    """一个客户端会话：独立的对话记忆与 Agent 执行状态"""
+
+    def __init__(self, session_id: str, agent: SmolCodeAgent, clock: Callable[[], float]):
+        self.id = session_id
+        self.agent = agent
+        self._clock = clock
+        self.created_at = clock()
+        self.last_active = self.created_at
+        self.turns = 0
+        self.pending = 0  # 排队中 + 进行中的轮次
+        self.generation = 0  # 插话计数：每次打断加一，旧一轮的输出不再发送
+        self.audio_buffer = bytearray()  # 正在上传的一句语音（16kHz 单声道 int16）
+        self.on_evict: Optional[Callable[[], None]] = None  # 被回收时通知连接关闭
+        self._turn_lock = asyncio.Lock()
+
+    def touch(self):
+        self.last_active = self._clock()
+
+    def idle_seconds(self) -> float:
+        return self._clock() - self.last_active
+
+    def acquire_turn(self, max_pending: int) -> "_TurnSlot":
+        """
+        排队进入一轮
+
+        同一会话的轮次按顺序执行；排队数超出 max_pending 时抛出 SessionBusyError，
+        让客户端放慢而不是在服务端无限堆积。
+        """
+        if self.pending >= max_pending:
+            raise SessionBusyError(f"会话 {self.id} 已有 {self.pending} 轮在排队")
+        return _TurnSlot(self)
+
+    def interrupt(self):
+        """用户插话：中止进行中的一轮并丢弃其尚未发送的输出"""
+        self.generation += 1
+        self.audio_buffer.clear()
+        self.agent.interrupt()
+
+
+class _TurnSlot:
+    """async with 期间占用会话的执行权"""
+
+    def __init__(self, session: Session):
+        self.session = session
+        session.pending += 1
+
+    async def __aenter__(self) -> Session:
+        try:
+            await self.session._turn_lock.acquire()
+        except BaseException:
+            self.session.pending -= 1
+            raise
+        self.session.touch()
+        return self.session
+
+    async def __aexit__(self, *exc):
+        self.session.turns += 1
+        self.session.pending -= 1
+        self.session.touch()
+        self.session._turn_lock.release()
+
+
+class SessionManager:
+    """
+    会话表
+
+    每个会话由基础 Agent 派生（共享模型、工具、缓存），超过空闲时限且没有进行中轮次的会话被回收。
+    所有方法都在事件循环线程中调用。
+    """
+
+    def __init__(self, base_agent: SmolCodeAgent, config: ServerConfig, clock: Callable[[], float] = time.monotonic):
+        self.base_agent = base_agent
+        self.config = config
+        self._clock = clock
+        self._sessions: Dict[str, Session] = {}
+        self.created = 0
+        self.evicted = 0
+        self.rejected = 0
+
+    def get(self, session_id: str) -> Optional[Session]:
+        session = self._sessions.get(session_id)
+        if session is not None:
+            session.touch()
+        return session
+
+    def get_or_create(self, session_id: Optional[str] = None) -> Session:
+        """
+        取出已有会话，不存在时新建
+
+        Raises:
+            SessionLimitError: 会话数已满且回收空闲会话后仍然没有空位
+        """
+        if session_id:
+            session = self.get(session_id)
+            if session is not None:
+                return session
+        if len(self._sessions) >= self.config.max_sessions:
+            self.evict_idle(force_oldest=True)
+        if len(self._sessions) >= self.config.max_sessions:
+            self.rejected += 1
+            raise SessionLimitError(f"会话数已达上限 {self.config.max_sessions}")
+        session = Session(session_id or uuid.uuid4().hex, self.base_agent.new_session(), self._clock)
+        self._sessions[session.id] = session
+        self.created += 1
+        return session
+
+    def close(self, session_id: str):
+        session = self._sessions.pop(session_id, None)
+        if session is not None and session.pending:
+            session.interrupt()
+
+    def evict_idle(self, force_oldest: bool = False) -> List[str]:
+        """
+        回收空闲会话
+
+        Args:
+            force_oldest: 没有超时的会话时，回收空闲最久的一个（会话数已满时腾位置）
+
+        Returns:
+            被回收的会话 ID
+        """
+        idle = [s for s in self._sessions.values() if s.pending == 0]
+        victims = [s for s in idle if s.idle_seconds() >= self.config.idle_timeout]
+        if not victims and force_oldest and idle:
+            victims = [min(idle, key=lambda s: s.last_active)]
+        for session in victims:
+            del self._sessions[session.id]
+            self.evicted += 1
+            if session.on_evict is not None:
+                session.on_evict()
+        if victims:
+            print(f"[Server] 回收空闲会话 {len(victims)} 个，剩余 {len(self._sessions)}")
+        return [session.id for session in victims]
+
+    async def run_eviction(self):
+        """后台定期回收空闲会话"""
+        while True:
+            await asyncio.sleep(self.config.eviction_interval)
+            self.evict_idle()
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def summary(self) -> str:
+        active = sum(1 for s in self._sessions.values() if s.pending)
+        return (f"当前会话 {len(self)} (进行中 {active}), 累计创建 {self.created}, "
+                f"回收 {self.evicted}, 拒绝 {self.rejected}")
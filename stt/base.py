@@ -1,5 +1,6 @@
 from abc import ABC, abstractmethod
-from typing import Optional
+from typing import List, Optional
+import numpy as np
 
 
 class BaseSTT(ABC):
@@ -18,7 +19,21 @@ class BaseSTT(ABC):
         """
         pass
 
+    @abstractmethod
+    def transcribe_array(self, audio: np.ndarray, clip_timestamps: Optional[List[float]] = None) -> str:
+        """
+        转录内存中的音频
+
+        Args:
+            audio: 16kHz 单声道 PCM，int16 或 [-1, 1] 的 float32
+            clip_timestamps: 已知的语音区间 [开始, 结束, ...]（秒），可选
+
+        Returns:
+            识别的文本
+        """
+        pass
+
     @abstractmethod
     def is_ready(self) -> bool:
         """检查STT是否就绪"""
-        pass
\ No newline at end of file
+        pass
@@ -0,0 +1,102 @@
+import re
+from typing import Optional
+from config.settings import VADConfig
+
+
+class AdaptiveEndpointer:
+    """
+    自适应断句
+
+    固定等待 max_silent_frames 帧静音才判定说完，这段等待全是延迟。
+    这里跟踪用户句中停顿的长度（指数滑动平均 + 平均偏差，类似 TCP 的 RTO 估计）
+    和语速，把结束判定所需的静音帧数收紧到“比正常停顿明显更长”即可；
+    如果增量转写的文本看起来已经是完整的一句，直接用下限。
+
+    比阈值长的停顿会直接结束这句话，观察到的停顿因此全都偏短（删失），
+    只用它们会把阈值一路压到下限。一句话结束后用户很快又接着说下去，
+    说明刚才那次其实是句中停顿，这时把整段静音补记为一次停顿。
+    """
+
+    # 句末标点，或疑问语气词结尾：一句话已经完整
+    _COMPLETE = re.compile(r'[。！？?!]$')
+    _QUESTION = re.compile(r'[吗呢]$')
+    # 其他语气词既可能收尾也可能在句中（“我去了……”），只把阈值减半，不直接用下限
+    _PARTICLE = re.compile(r'[吧啊呀了嘛]$')
+
+    def __init__(self, config: VADConfig):
+        self.config = config
+        self._pause_mean: Optional[float] = None  # 句中停顿的平均帧数
+        self._pause_dev = 0.0
+        self._speech_rate: Optional[float] = None  # 字/秒
+        self._ended_silence: Optional[int] = None  # 上一句结束时的静音帧数
+
+    def observe_pause(self, frames: int):
+        """记录一次句中停顿（静音后又继续说话）"""
+        if frames < 2:
+            return  # 单帧抖动不算停顿
+        # 单次超长停顿最多按上限计，避免一次咳嗽、走神把平均值拉飞
+        frames = min(frames, self.config.max_silent_frames)
+        if self._pause_mean is None:
+            self._pause_mean = float(frames)
+            self._pause_dev = frames / 2
+            return
+        alpha = self.config.endpoint_smoothing
+        self._pause_dev = (1 - alpha) * self._pause_dev + alpha * abs(frames - self._pause_mean)
+        self._pause_mean = (1 - alpha) * self._pause_mean + alpha * frames
+
+    def observe_end(self, silent_frames: int):
+        """一句话因静音超过阈值而结束（这次停顿的真实长度未知）"""
+        self._ended_silence = silent_frames
+
+    def observe_resume(self, gap_frames: int):
+        """
+        上一句结束后又开始说话
+
+        Args:
+            gap_frames: 上一句结束到这次开口之间的静音帧数
+        """
+        if self._ended_silence is None:
+            return
+        ended, self._ended_silence = self._ended_silence, None
+        if gap_frames <= self.config.max_silent_frames:
+            # 很快接着说：上一句其实被切断在句中停顿上，补记这次完整的停顿
+            self.observe_pause(ended + gap_frames)
+
+    def observe_transcript(self, text: str, duration: float):
+        """记录一句话的识别结果，用于估计语速"""
+        chars = len(re.sub(r'[\W_]', '', text))
+        if chars == 0 or duration <= 0:
+            return
+        rate = chars / duration
+        if self._speech_rate is None:
+            self._speech_rate = rate
+        else:
+            alpha = self.config.endpoint_smoothing
+            self._speech_rate = (1 - alpha) * self._speech_rate + alpha * rate
+
+    def silence_limit(self, partial_text: Optional[str] = None) -> int:
+        """
+        当前判定一句话结束所需的静音帧数
+
+        Args:
+            partial_text: 增量转写得到的当前文本（可选）
+        """
+        lower, upper = self.config.min_silent_frames, self.config.max_silent_frames
+        if not self.config.adaptive_endpoint:
+            return upper
+        text = partial_text.strip() if partial_text else ""
+        long_enough = len(re.sub(r'[\W_]', '', text)) >= self.config.endpoint_complete_min_chars
+        if text and (self._COMPLETE.search(text) or (long_enough and self._QUESTION.search(text))):
+            return lower
+
+        if self._pause_mean is None:
+            limit = float(upper)
+        else:
+            limit = self._pause_mean + self.config.endpoint_deviation_factor * self._pause_dev
+            # 语速快的人停顿也短，按参考语速缩放（限制在 ±20%）
+            if self._speech_rate:
+                scale = self.config.endpoint_reference_rate / self._speech_rate
+                limit *= min(1.2, max(0.8, scale))
+        if long_enough and self._PARTICLE.search(text):
+            limit = (lower + limit) / 2
+        return int(min(upper, max(lower, round(limit))))
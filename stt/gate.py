@@ -0,0 +1,38 @@
+from typing import Optional
+from config.settings import VADConfig
+from .vad_recorder import Utterance
+
+
+class SpeechGate:
+    """
+    送入 Whisper 之前的语音门限
+
+    用录音器已经算好的统计量（语音时长、语音帧占比、能量）过滤噪声触发的片段，
+    避免它们走完整的 beam search 解码之后才被丢弃。
+    """
+
+    def __init__(self, config: VADConfig):
+        self.config = config
+        self.accepted = 0
+        self.rejected = 0
+
+    def check(self, utterance: Utterance) -> Optional[str]:
+        """
+        检查语音片段
+
+        Returns:
+            拒绝原因；通过时返回 None
+        """
+        reason = None
+        if utterance.speech_duration < self.config.gate_min_speech_s:
+            reason = f"语音过短 ({utterance.speech_duration:.2f}s)"
+        elif utterance.voiced_ratio < self.config.gate_min_voiced_ratio:
+            reason = f"语音帧占比过低 ({utterance.voiced_ratio:.0%})"
+        elif utterance.rms < self.config.gate_min_rms:
+            reason = f"能量过低 (RMS {utterance.rms:.0f})"
+
+        if reason:
+            self.rejected += 1
+        else:
+            self.accepted += 1
+        return reason
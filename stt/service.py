@@ -0,0 +1,324 @@
+import bisect
+import queue
+import threading
+import time
+from collections import Counter
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from typing import List, Optional, Tuple
+import numpy as np
+from faster_whisper import BatchedInferencePipeline, decode_audio
+from .base import BaseSTT
+from .whisper_stt import WhisperSTT
+from config.settings import STTConfig
+
+
+@dataclass
+class _Request:
+    """一条待识别的语音"""
+    audio: np.ndarray  # float32
+    clips: List[Tuple[float, float]]  # 语音区间（秒，相对 audio 开头）
+    source: str
+    sample_rate: int = 16000
+    future: Future = field(default_factory=Future)
+    submitted_at: float = field(default_factory=time.perf_counter)
+
+    @property
+    def duration(self) -> float:
+        return len(self.audio) / self.sample_rate
+
+
+class ServiceStats:
+    """STT 服务吞吐统计"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.started_at = time.perf_counter()
+        self.completed = 0
+        self.failed = 0
+        self.audio_seconds = 0.0
+        self.decode_seconds = 0.0
+        self.latency_seconds = 0.0
+        self.batches = 0
+        self.sources: Counter = Counter()
+
+    def record(self, source: str, audio_seconds: float, decode_seconds: float, latency: float):
+        with self._lock:
+            self.completed += 1
+            self.audio_seconds += audio_seconds
+            self.decode_seconds += decode_seconds
+            self.latency_seconds += latency
+            self.sources[source] += 1
+
+    def record_failure(self):
+        with self._lock:
+            self.failed += 1
+
+    def record_batch(self):
+        with self._lock:
+            self.batches += 1
+
+    @property
+    def utterances_per_second(self) -> float:
+        wall = time.perf_counter() - self.started_at
+        return self.completed / wall if wall > 0 else 0.0
+
+    @property
+    def rtf(self) -> float:
+        """解码耗时 / 音频时长（单条语音视角）"""
+        return self.decode_seconds / self.audio_seconds if self.audio_seconds else 0.0
+
+    @property
+    def aggregate_rtf(self) -> float:
+        """墙钟时间 / 音频总时长（整机吞吐视角，并行越好越低）"""
+        wall = time.perf_counter() - self.started_at
+        return wall / self.audio_seconds if self.audio_seconds else 0.0
+
+    def summary(self) -> str:
+        avg_latency = self.latency_seconds / self.completed * 1000 if self.completed else 0.0
+        return (f"完成 {self.completed} 句 (失败 {self.failed}, 批次 {self.batches}, 来源 {len(self.sources)}), "
+                f"吞吐 {self.utterances_per_second:.2f} 句/秒, RTF {self.rtf:.3f}, "
+                f"总体 RTF {self.aggregate_rtf:.3f}, 平均延迟 {avg_latency:.0f}ms")
+
+
+class STTService(BaseSTT):
+    """
+    多路语音识别服务
+
+    多个来源（房间、客户端）的语音统一排队，识别结果通过 Future 返回。两种工作方式：
+    - 批量模式 (batched)：把队列中的多句语音拼在一起，用 BatchedInferencePipeline
+      一次解码，每句的语音区间作为一个 clip，按时间戳把结果分回各句；
+    - 线程池模式：一个 WhisperModel 开 num_workers 个 CTranslate2 工作单元，
+      同样数量的线程并发调用 transcribe。
+    """
+
+    CHUNK_SECONDS = 30.0  # Whisper 单个窗口的最大长度
+
+    def __init__(self, config: STTConfig, sample_rate: int = 16000):
+        self.config = config
+        self.sample_rate = sample_rate
+        self.stt = WhisperSTT(config)
+        self.stats = ServiceStats()
+        self._queue: "queue.Queue[Optional[_Request]]" = queue.Queue()
+        self._stop_event = threading.Event()
+
+        self._pipeline = None
+        if config.batched:
+            self._pipeline = BatchedInferencePipeline(model=self.stt.model)
+            workers = [threading.Thread(target=self._batch_loop, name="stt-batch", daemon=True)]
+        else:
+            workers = [
+                threading.Thread(target=self._worker_loop, name=f"stt-worker-{i}", daemon=True)
+                for i in range(max(1, config.num_workers))
+            ]
+        self._workers = workers
+        for worker in self._workers:
+            worker.start()
+        mode = f"批量 (batch_size={config.batch_size})" if config.batched else f"线程池 ({len(workers)} 路)"
+        print(f"[STT服务] 已启动: {mode}")
+
+    def submit(self, audio: np.ndarray, clip_timestamps: Optional[List[float]] = None, source: str = "default") -> Future:
+        """
+        提交一句语音
+
+        Args:
+            audio: 16kHz 单声道 PCM，int16 或 [-1, 1] 的 float32
+            clip_timestamps: 语音区间 [开始, 结束, ...]（秒），可选
+            source: 来源标识，仅用于统计
+
+        Returns:
+            识别文本的 Future
+        """
+        if audio.dtype == np.int16:
+            audio = audio.astype(np.float32) / 32768.0
+        audio = audio.astype(np.float32, copy=False)
+        if clip_timestamps:
+            clips = list(zip(clip_timestamps[0::2], clip_timestamps[1::2]))
+        else:
+            clips = [(0.0, len(audio) / self.sample_rate)]
+        request = _Request(audio=audio, clips=clips, source=source, sample_rate=self.sample_rate)
+        if self._stop_event.is_set():
+            request.future.set_exception(RuntimeError("STT服务已关闭"))
+        else:
+            self._queue.put(request)
+        return request.future
+
+    def transcribe(self, audio_file: str) -> str:
+        """转录音频文件"""
+        return self.submit(decode_audio(audio_file, sampling_rate=self.sample_rate)).result()
+
+    def transcribe_array(self, audio: np.ndarray, clip_timestamps: Optional[List[float]] = None) -> str:
+        """同步转录：提交后等待结果"""
+        return self.submit(audio, clip_timestamps).result()
+
+    def transcribe_words(self, audio: np.ndarray, initial_prompt: str = "简体中文。") -> List[Tuple[float, float, str]]:
+        """带词级时间戳的转录（增量转写用，直接在调用线程上执行）"""
+        return self.stt.transcribe_words(audio, initial_prompt=initial_prompt)
+
+    def _worker_loop(self):
+        """线程池模式：每个线程独立领取语音并识别"""
+        while not self._stop_event.is_set():
+            try:
+                request = self._queue.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            if request is None:
+                break
+            if not request.future.set_running_or_notify_cancel():
+                continue
+
+            start = time.perf_counter()
+            try:
+                clips = [t for clip in request.clips for t in clip]
+                text = self.stt.transcribe_array(request.audio, clips)
+            except Exception as e:
+                self.stats.record_failure()
+                request.future.set_exception(e)
+                continue
+            finished = time.perf_counter()
+            self.stats.record(request.source, request.duration, finished - start, finished - request.submitted_at)
+            request.future.set_result(text)
+
+    def _collect_batch(self) -> List[_Request]:
+        """领取一批语音：拿到第一句后最多再等 batch_wait_ms 凑满 batch_size 个 clip"""
+        try:
+            first = self._queue.get(timeout=0.5)
+        except queue.Empty:
+            return []
+        if first is None:
+            self._stop_event.set()
+            return []
+
+        batch = [first]
+        clip_count = len(first.clips)
+        deadline = time.perf_counter() + self.config.batch_wait_ms / 1000
+        while clip_count < self.config.batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                request = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if request is None:
+                self._stop_event.set()
+                break
+            batch.append(request)
+            clip_count += len(request.clips)
+        return [request for request in batch if request.future.set_running_or_notify_cancel()]
+
+    def _batch_loop(self):
+        """批量模式：多句语音拼接后一次解码"""
+        while not self._stop_event.is_set():
+            batch = self._collect_batch()
+            if not batch:
+                continue
+
+            start = time.perf_counter()
+            try:
+                texts = self._transcribe_batch(batch)
+            except Exception as e:
+                for request in batch:
+                    self.stats.record_failure()
+                    request.future.set_exception(e)
+                continue
+            elapsed = time.perf_counter() - start
+            finished = time.perf_counter()
+            self.stats.record_batch()
+
+            total_audio = sum(request.duration for request in batch) or 1.0
+            for request, text in zip(batch, texts):
+                # 批次耗时按音频时长分摊到每一句
+                share = elapsed * request.duration / total_audio
+                self.stats.record(request.source, request.duration, share, finished - request.submitted_at)
+                request.future.set_result(text)
+
+    def _transcribe_batch(self, batch: List[_Request]) -> List[str]:
+        """拼接整批音频，每个语音区间作为一个 clip 送入批量解码，再按 clip 起点把结果分回各句"""
+        audio_parts = []
+        clips = []
+        owners = []  # 每个 clip 属于第几句
+        offset = 0.0
+        for index, request in enumerate(batch):
+            audio_parts.append(request.audio)
+            for clip_start, clip_end in request.clips:
+                # 超过一个窗口的区间切开
+                while clip_end - clip_start > 0:
+                    end = min(clip_end, clip_start + self.CHUNK_SECONDS)
+                    clips.append({"start": offset + clip_start, "end": offset + end})
+                    owners.append(index)
+                    clip_start = end
+            offset += request.duration
+
+        segments, _ = self._pipeline.transcribe(
+            np.concatenate(audio_parts),
+            language="zh",
+            beam_size=self.config.beam_size,
+            initial_prompt="简体中文。",
+            no_speech_threshold=self.config.no_speech_threshold,
+            log_prob_threshold=self.config.log_prob_threshold,
+            clip_timestamps=clips,
+            batch_size=self.config.batch_size
+        )
+
+        starts = [clip["start"] for clip in clips]
+        texts = [[] for _ in batch]
+        for segment in segments:
+            clip_index = max(0, bisect.bisect_right(starts, segment.start + 1e-3) - 1)
+            if self.stt._accept_segment(segment):
+                texts[owners[clip_index]].append(segment.text)
+        return ["".join(parts).strip() for parts in texts]
+
+    def is_ready(self) -> bool:
+        return self.stt.is_ready()
+
+    def close(self):
+        """停止工作线程，未处理的语音以异常结束"""
+        self._stop_event.set()
+        for _ in self._workers:
+            self._queue.put(None)
+        for worker in self._workers:
+            worker.join(timeout=5)
+        while True:
+            try:
+                request = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if request is not None and request.future.set_running_or_notify_cancel():
+                request.future.set_exception(RuntimeError("STT服务已关闭"))
+        print(f"[STT服务] {self.stats.summary()}")
+
+
+def main():
+    """基准测试：python -m stt.service a.wav b.wav --repeat 4"""
+    import argparse
+    from config.settings import AppConfig
+
+    parser = argparse.ArgumentParser(description="STT 服务吞吐测试")
+    parser.add_argument("files", nargs="+", help="16kHz 可解码的音频文件")
+    parser.add_argument("--repeat", type=int, default=1, help="每个文件重复提交的次数")
+    parser.add_argument("--batched", action="store_true", help="使用批量解码")
+    parser.add_argument("--workers", type=int, default=None, help="线程池模式的工作线程数")
+    args = parser.parse_args()
+
+    config = AppConfig.from_env().stt
+    config.batched = args.batched or config.batched
+    if args.workers:
+        config.num_workers = args.workers
+
+    audios = [decode_audio(path, sampling_rate=16000) for path in args.files]
+    service = STTService(config)
+    service.stats = ServiceStats()  # 不计模型加载时间
+    futures = [
+        service.submit(audio, source=path)
+        for _ in range(args.repeat)
+        for path, audio in zip(args.files, audios)
+    ]
+    for future in futures:
+        future.result()
+    print(f"[STT服务] {service.stats.summary()}")
+    service.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+import threading
+import numpy as np
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import List, Optional, Tuple
+from config.settings import STTConfig
+from .whisper_stt import WhisperSTT
+
+Word = Tuple[float, float, str]
+
+
+class TranscriptionSession:
+    """
+    一句话的增量转写会话
+
+    说话期间每新增 stream_interval_s 秒语音就解码一次“已确认位置之后”的音频，
+    相邻两次解码结果一致、且不在末尾 stream_commit_margin_s 内的词视为稳定（LocalAgreement），
+    稳定前缀对应的音频之后不再重复解码。说话结束时只需解码剩下的尾部。
+    """
+
+    def __init__(self, stt: WhisperSTT, config: STTConfig, executor: ThreadPoolExecutor, sample_rate: int):
+        self.stt = stt
+        self.config = config
+        self.sample_rate = sample_rate
+        self._executor = executor
+        self._lock = threading.Lock()
+        self._audio = bytearray()  # int16 PCM
+        self._committed: List[str] = []
+        self._committed_samples = 0
+        self._previous: List[Word] = []  # 上一次解码中尚未确认的词（绝对时间）
+        self._decoded_until = 0
+        self._future: Optional[Future] = None
+        self._cancelled = False
+
+    @property
+    def committed_text(self) -> str:
+        """已确认的文本"""
+        return "".join(self._committed).strip()
+
+    def feed(self, pcm: bytes):
+        """追加语音，攒够一个窗口就在后台做一次增量解码"""
+        with self._lock:
+            self._audio.extend(pcm)
+            total = len(self._audio) // 2
+        interval = int(self.config.stream_interval_s * self.sample_rate)
+        if total - self._decoded_until < interval:
+            return
+        if self._future is not None and not self._future.done():
+            return  # 上一次解码还没结束，跳过本窗口
+        self._decoded_until = total
+        self._future = self._executor.submit(self._decode_partial, total)
+
+    def _decode(self, end: int) -> List[Word]:
+        """解码 [已确认位置, end) 的音频，返回绝对时间的词"""
+        with self._lock:
+            start = self._committed_samples
+            pcm = bytes(self._audio[start * 2:end * 2])
+        audio = np.frombuffer(pcm, dtype=np.int16).astype(np.float32) / 32768.0
+        prompt = "简体中文。" + self.committed_text[-50:]
+        offset = start / self.sample_rate
+        words = self.stt.transcribe_words(audio, initial_prompt=prompt)
+        return [(offset + w_start, offset + w_end, word) for w_start, w_end, word in words]
+
+    def _decode_partial(self, end: int):
+        if self._cancelled:
+            return
+        words = self._decode(end)
+        limit = end / self.sample_rate - self.config.stream_commit_margin_s
+
+        agreed = []
+        for previous, current in zip(self._previous, words):
+            if previous[2].strip() != current[2].strip() or current[1] > limit:
+                break
+            agreed.append(current)
+
+        if agreed:
+            self._committed.extend(word for _, _, word in agreed)
+            with self._lock:
+                self._committed_samples = int(agreed[-1][1] * self.sample_rate)
+            print(f"[STT] 已确认: {self.committed_text}")
+        self._previous = words[len(agreed):]
+
+    def finish(self) -> str:
+        """说话结束：等待进行中的解码，只解码剩余尾部，返回完整文本"""
+        if self._future is not None:
+            self._future.result()
+        with self._lock:
+            total = len(self._audio) // 2
+        tail = []
+        if total > self._committed_samples:
+            tail = self._decode(total)
+        return (self.committed_text + "".join(word for _, _, word in tail)).strip()
+
+    def cancel(self):
+        """丢弃本句（例如被判为回声）"""
+        self._cancelled = True
+
+
+class StreamingTranscriber:
+    """增量转写器：接在录音器的分段音频回调上，每句话对应一个会话"""
+
+    def __init__(self, stt: WhisperSTT, config: STTConfig, sample_rate: int = 16000):
+        self.stt = stt
+        self.config = config
+        self.sample_rate = sample_rate
+        # 增量解码串行执行，避免和尾部解码抢 CPU
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="stt-stream")
+        self._session: Optional[TranscriptionSession] = None
+
+    def feed(self, pcm: bytes, start: bool = False):
+        """录音器回调：追加当前这句话的新音频，start 表示新一句话开始"""
+        if start and self._session is not None:
+            self._session.cancel()  # 上一句没有走完（例如录音被重置），直接作废
+            self._session = None
+        if self._session is None:
+            self._session = TranscriptionSession(self.stt, self.config, self._executor, self.sample_rate)
+        self._session.feed(pcm)
+
+    def partial_text(self) -> str:
+        """当前这句话已确认的文本"""
+        return self._session.committed_text if self._session is not None else ""
+
+    def end_segment(self) -> Optional[TranscriptionSession]:
+        """一句话结束，取出它的会话，后续音频进入新会话"""
+        session, self._session = self._session, None
+        return session
+
+    def close(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,197 @@
+"""
+STT 参数自动调优
+
+用本地参考集（同名的 .wav 与 .txt）逐个评测候选配置（模型、计算精度、beam、线程数），
+统计 RTF、p95 延迟和字错误率 (CER)，在满足 CER 与延迟目标的配置中挑选最快的一个写入 JSON。
+AppConfig.from_env() 会读取该文件（STT_TUNED_CONFIG，默认 stt_tuned.json）作为 STT 默认值。
+
+用法:
+    python -m stt.tuner refs/ --models base small --compute-types int8 float32 \\
+        --beams 1 2 5 --threads 0 4 --max-cer 0.1 --max-p95 1.5
+"""
+import argparse
+import glob
+import itertools
+import json
+import os
+import re
+import time
+from dataclasses import asdict, dataclass, replace
+from typing import List, Optional, Sequence, Tuple
+import numpy as np
+from faster_whisper import decode_audio
+from config.settings import STTConfig
+from .whisper_stt import WhisperSTT
+
+# 计算 CER 前去掉的字符：空白与中英文标点
+_IGNORED = re.compile(r"[\s\u3000-\u303f\uff00-\uff0f\uff1a-\uff20\uff3b-\uff40\uff5b-\uff65!-/:-@\[-`{-~]")
+
+
+def normalize_text(text: str) -> str:
+    """统一大小写并去掉空白和标点"""
+    return _IGNORED.sub("", text).lower()
+
+
+def edit_distance(reference: str, hypothesis: str) -> int:
+    """字符级编辑距离"""
+    previous = list(range(len(hypothesis) + 1))
+    for i, ref_char in enumerate(reference, 1):
+        current = [i] + [0] * len(hypothesis)
+        for j, hyp_char in enumerate(hypothesis, 1):
+            current[j] = min(
+                previous[j] + 1,
+                current[j - 1] + 1,
+                previous[j - 1] + (ref_char != hyp_char)
+            )
+        previous = current
+    return previous[-1]
+
+
+def character_error_rate(references: Sequence[str], hypotheses: Sequence[str]) -> float:
+    """整个参考集的 CER：总编辑距离 / 参考文本总字数"""
+    errors = 0
+    total = 0
+    for reference, hypothesis in zip(references, hypotheses):
+        reference, hypothesis = normalize_text(reference), normalize_text(hypothesis)
+        errors += edit_distance(reference, hypothesis)
+        total += len(reference)
+    return errors / total if total else 0.0
+
+
+def load_reference_set(directory: str, sample_rate: int = 16000) -> List[Tuple[str, np.ndarray, str]]:
+    """读取参考集：每个 .wav 旁边放同名 .txt 作为标注"""
+    items = []
+    for wav_path in sorted(glob.glob(os.path.join(directory, "*.wav"))):
+        txt_path = os.path.splitext(wav_path)[0] + ".txt"
+        if not os.path.exists(txt_path):
+            print(f"[调优警告] 缺少标注，跳过: {wav_path}")
+            continue
+        with open(txt_path, "r", encoding="utf-8") as f:
+            transcript = f.read().strip()
+        items.append((wav_path, decode_audio(wav_path, sampling_rate=sample_rate), transcript))
+    return items
+
+
+@dataclass
+class TrialResult:
+    """一个候选配置的评测结果"""
+    model_path: str
+    compute_type: str
+    beam_size: int
+    cpu_threads: int
+    cer: float
+    rtf: float
+    p95_latency: float
+    mean_latency: float
+
+    def meets(self, max_cer: float, max_p95: float) -> bool:
+        return self.cer <= max_cer and self.p95_latency <= max_p95
+
+    def summary(self) -> str:
+        return (f"{self.model_path}/{self.compute_type}/beam={self.beam_size}/threads={self.cpu_threads}: "
+                f"CER {self.cer:.3f}, RTF {self.rtf:.3f}, p95 {self.p95_latency * 1000:.0f}ms")
+
+
+def evaluate(config: STTConfig, references: List[Tuple[str, np.ndarray, str]], sample_rate: int = 16000) -> TrialResult:
+    """用一个配置跑完参考集"""
+    stt = WhisperSTT(config)
+    # 预热一次，不计入统计
+    stt.transcribe_array(references[0][1][:sample_rate])
+
+    latencies = []
+    hypotheses = []
+    audio_seconds = 0.0
+    for _, audio, _ in references:
+        start = time.perf_counter()
+        hypotheses.append(stt.transcribe_array(audio))
+        latencies.append(time.perf_counter() - start)
+        audio_seconds += len(audio) / sample_rate
+
+    return TrialResult(
+        model_path=config.model_path,
+        compute_type=config.compute_type,
+        beam_size=config.beam_size,
+        cpu_threads=config.cpu_threads,
+        cer=character_error_rate([text for _, _, text in references], hypotheses),
+        rtf=sum(latencies) / audio_seconds if audio_seconds else 0.0,
+        p95_latency=float(np.percentile(latencies, 95)),
+        mean_latency=float(np.mean(latencies))
+    )
+
+
+def select_best(results: List[TrialResult], max_cer: float, max_p95: float) -> Optional[TrialResult]:
+    """满足目标的配置中 p95 延迟最低者，并列时取 CER 更低的"""
+    passing = [result for result in results if result.meets(max_cer, max_p95)]
+    if not passing:
+        return None
+    return min(passing, key=lambda result: (result.p95_latency, result.cer))
+
+
+def candidate_configs(base: STTConfig, models, compute_types, beams, threads) -> List[STTConfig]:
+    """展开候选网格，跳过 CPU 上不支持的 float16"""
+    configs = []
+    for model_path, compute_type, beam_size, cpu_threads in itertools.product(models, compute_types, beams, threads):
+        if base.device == "cpu" and compute_type == "float16":
+            continue
+        configs.append(replace(
+            base,
+            model_path=model_path,
+            compute_type=compute_type,
+            beam_size=beam_size,
+            cpu_threads=cpu_threads
+        ))
+    return configs
+
+
+def main():
+    parser = argparse.ArgumentParser(description="STT 参数自动调优")
+    parser.add_argument("reference_dir", help="参考集目录（.wav + 同名 .txt）")
+    parser.add_argument("--models", nargs="+", default=["tiny", "base", "small"])
+    parser.add_argument("--compute-types", nargs="+", default=["int8", "float32"])
+    parser.add_argument("--beams", nargs="+", type=int, default=[1, 2, 5])
+    parser.add_argument("--threads", nargs="+", type=int, default=[0])
+    parser.add_argument("--device", choices=["cpu", "cuda"], default=STTConfig.device)
+    parser.add_argument("--max-cer", type=float, default=0.1, help="可接受的最大字错误率")
+    parser.add_argument("--max-p95", type=float, default=1.5, help="可接受的 p95 延迟（秒）")
+    parser.add_argument("--output", default="stt_tuned.json")
+    args = parser.parse_args()
+
+    references = load_reference_set(args.reference_dir)
+    if not references:
+        print(f"[调优错误] {args.reference_dir} 中没有可用的参考音频")
+        return
+
+    base = STTConfig(device=args.device)
+    results = []
+    for config in candidate_configs(base, args.models, args.compute_types, args.beams, args.threads):
+        try:
+            result = evaluate(config, references)
+        except Exception as e:
+            print(f"[调优警告] 配置不可用 {config.model_path}/{config.compute_type}: {e}")
+            continue
+        results.append(result)
+        print(f"[调优] {result.summary()}")
+
+    best = select_best(results, args.max_cer, args.max_p95)
+    if best is None:
+        print(f"[调优] 没有配置满足 CER <= {args.max_cer} 且 p95 <= {args.max_p95}s")
+        return
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump({
+            "stt": {
+                "model_path": best.model_path,
+                "device": args.device,
+                "compute_type": best.compute_type,
+                "beam_size": best.beam_size,
+                "cpu_threads": best.cpu_threads
+            },
+            "targets": {"max_cer": args.max_cer, "max_p95": args.max_p95},
+            "results": [asdict(result) for result in results]
+        }, f, ensure_ascii=False, indent=2)
+    print(f"[调优] 最佳配置: {best.summary()}")
+    print(f"[调优] 已写入 {args.output}")
+
+
+if __name__ == "__main__":
+    main()
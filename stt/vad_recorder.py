@@ -1,8 +1,71 @@
 import pyaudio
-import wave
+import queue
 import collections
+import threading
 import webrtcvad
+import numpy as np
+from dataclasses import dataclass, field
+from typing import Callable, List, Optional, Tuple
 from config.settings import VADConfig
+from .endpointer import AdaptiveEndpointer
+
+
+@dataclass
+class Utterance:
+    """一段完整的语音（内存中的 16-bit PCM）"""
+    audio: np.ndarray  # int16, 单声道
+    sample_rate: int
+    voiced_frames: int = 0
+    frame_duration_ms: int = 30
+    # 录音器 VAD 判定的语音区间（秒，相对片段开头）
+    speech_spans: List[Tuple[float, float]] = field(default_factory=list)
+
+    @property
+    def duration(self) -> float:
+        """时长（秒）"""
+        return len(self.audio) / self.sample_rate
+
+    @property
+    def speech_duration(self) -> float:
+        """从第一段语音开始到最后一段语音结束的时长（秒）"""
+        if not self.speech_spans:
+            return 0.0
+        return self.speech_spans[-1][1] - self.speech_spans[0][0]
+
+    @property
+    def voiced_ratio(self) -> float:
+        """语音区间内被判为语音的帧占比"""
+        span_frames = self.speech_duration * 1000 / self.frame_duration_ms
+        return self.voiced_frames / span_frames if span_frames > 0 else 0.0
+
+    @property
+    def rms(self) -> float:
+        """语音区间内的均方根能量（int16 幅度）"""
+        if not self.speech_spans:
+            return 0.0
+        start = int(self.speech_spans[0][0] * self.sample_rate)
+        end = int(self.speech_spans[-1][1] * self.sample_rate)
+        samples = self.audio[start:end].astype(np.float32)
+        return float(np.sqrt(np.mean(samples ** 2))) if len(samples) else 0.0
+
+    def clip_timestamps(self, padding: float = 0.2, min_gap: float = 0.3) -> List[float]:
+        """
+        把语音区间转换为 faster-whisper 的 clip_timestamps
+
+        区间两侧各留 padding 秒，间隔小于 min_gap 的区间合并。
+        """
+        clips: List[List[float]] = []
+        for start, end in self.speech_spans:
+            start, end = max(0.0, start - padding), min(self.duration, end + padding)
+            if clips and start - clips[-1][1] < min_gap:
+                clips[-1][1] = max(clips[-1][1], end)
+            else:
+                clips.append([start, end])
+        return [round(t, 3) for clip in clips for t in clip]
+
+    def to_float32(self) -> np.ndarray:
+        """转换为 Whisper 所需的 [-1, 1] float32"""
+        return self.audio.astype(np.float32) / 32768.0
 
 
 class VADRecorder:
@@ -11,69 +74,198 @@ class VADRecorder:
     def __init__(self, config: VADConfig):
         self.config = config
         self.vad = webrtcvad.Vad(config.aggressiveness)
+        self.endpointer = AdaptiveEndpointer(config)
+        # 可选：返回当前这句话已识别文本的回调，用于判断话是否已说完
+        self.partial_text: Optional[Callable[[], str]] = None
         self.frame_size = int(
             config.sample_rate * config.frame_duration_ms / 1000
         )
 
-    def listen(self, output_file: str = "input.wav") -> str:
+        # 常驻采集流：设备只打开一次，回调线程持续把帧放进队列，
+        # 两轮对话之间说的话也会被缓冲下来，不会丢失
+        max_frames = int(config.max_buffered_seconds * 1000 / config.frame_duration_ms)
+        self._frames: "queue.Queue[bytes]" = queue.Queue(maxsize=max(1, max_frames))
+        self._pa: Optional[pyaudio.PyAudio] = None
+        self._stream = None
+        self._lock = threading.Lock()
+
+        # 分段状态机
+        self.reset()
+        # 上一句结束后已经过的静音帧数，用来发现被切断在句中停顿上的语句
+        self._frames_since_end: Optional[int] = None
+        # 分段音频回调：一句话开始后，每追加一段音频就调用一次（供增量转写使用），
+        # 第二个参数为 True 表示这是新一句话的开头
+        self.on_segment_audio: Optional[Callable[[bytes, bool], None]] = None
+
+    def start(self):
+        """打开麦克风并开始后台采集（重复调用无副作用）"""
+        with self._lock:
+            if self._stream is not None:
+                return
+            self._pa = pyaudio.PyAudio()
+            self._stream = self._pa.open(
+                format=pyaudio.paInt16,
+                channels=1,
+                rate=self.config.sample_rate,
+                input=True,
+                frames_per_buffer=self.frame_size,
+                stream_callback=self._on_audio
+            )
+            self._stream.start_stream()
+            print("[VAD] 麦克风采集流已启动")
+
+    def _on_audio(self, in_data, frame_count, time_info, status):
+        """PyAudio 回调：只做入队，不做任何耗时操作"""
+        try:
+            self._frames.put_nowait(in_data)
+        except queue.Full:
+            # 缓冲已满：丢弃最旧的一帧，保证拿到的是最新音频
+            try:
+                self._frames.get_nowait()
+            except queue.Empty:
+                pass
+            try:
+                self._frames.put_nowait(in_data)
+            except queue.Full:
+                pass
+        return None, pyaudio.paContinue
+
+    def read_frame(self, timeout: Optional[float] = None) -> Optional[bytes]:
+        """读取一帧 PCM，超时返回 None"""
+        try:
+            return self._frames.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    @property
+    def is_speaking(self) -> bool:
+        """当前是否处于一句话之中"""
+        return self._is_speaking
+
+    @property
+    def voiced_frames(self) -> int:
+        """当前这句话中被判为语音的帧数"""
+        return self._voiced_frames
+
+    def reset(self):
+        """清空分段状态"""
+        self._segment_frames = []
+        self._is_speaking = False
+        self._silent_frames = 0
+        self._voiced_frames = 0
+        self._speech_spans: List[List[int]] = []  # [起始帧, 结束帧)
+        self._ring_buffer = collections.deque(maxlen=self.config.ring_buffer_size)
+
+    def process_frame(self, frame: bytes) -> Optional[Utterance]:
         """
-        监听并录制语音
+        喂入一帧 PCM，推进分段状态机
 
         Args:
-            output_file: 输出文件路径
+            frame: frame_duration_ms 长度的 16-bit PCM
 
         Returns:
-            录制的音频文件路径
+            一句话结束时返回完整语音，否则返回 None
         """
-        p = pyaudio.PyAudio()
-        stream = p.open(
-            format=pyaudio.paInt16,
-            channels=1,
-            rate=self.config.sample_rate,
-            input=True,
-            frames_per_buffer=self.frame_size
+        is_speech = self.vad.is_speech(frame, self.config.sample_rate)
+
+        if not self._is_speaking:
+            if self._frames_since_end is not None and not is_speech:
+                self._frames_since_end += 1
+            if is_speech:
+                print("[VAD] 检测到语音...")
+                if self._frames_since_end is not None:
+                    self.endpointer.observe_resume(self._frames_since_end)
+                    self._frames_since_end = None
+                self._is_speaking = True
+                self._voiced_frames = 1
+                self._segment_frames.extend(list(self._ring_buffer))
+                self._segment_frames.append(frame)
+                self._mark_voiced()
+                self._emit_segment_audio(b''.join(self._segment_frames), start=True)
+            else:
+                self._ring_buffer.append(frame)
+            return None
+
+        self._segment_frames.append(frame)
+        self._emit_segment_audio(frame)
+        if not is_speech:
+            self._silent_frames += 1
+        else:
+            if self._silent_frames:
+                self.endpointer.observe_pause(self._silent_frames)
+            self._silent_frames = 0
+            self._voiced_frames += 1
+            self._mark_voiced()
+            return None
+
+        limit = self.endpointer.silence_limit(self.partial_text() if self.partial_text else None)
+        if self._silent_frames <= limit:
+            return None
+
+        print(f"[VAD] 语音结束 (静音 {self._silent_frames * self.config.frame_duration_ms}ms)")
+        audio = np.frombuffer(b''.join(self._segment_frames), dtype=np.int16)
+        frame_seconds = self.config.frame_duration_ms / 1000
+        utterance = Utterance(
+            audio=audio,
+            sample_rate=self.config.sample_rate,
+            voiced_frames=self._voiced_frames,
+            frame_duration_ms=self.config.frame_duration_ms,
+            speech_spans=[(start * frame_seconds, end * frame_seconds) for start, end in self._speech_spans]
         )
+        self.endpointer.observe_end(self._silent_frames)
+        self.reset()
+        self._frames_since_end = 0
+        return utterance
+
+    def _mark_voiced(self):
+        """把最新一帧记入语音区间"""
+        index = len(self._segment_frames) - 1
+        if self._speech_spans and self._speech_spans[-1][1] == index:
+            self._speech_spans[-1][1] = index + 1
+        else:
+            self._speech_spans.append([index, index + 1])
+
+    def _emit_segment_audio(self, pcm: bytes, start: bool = False):
+        if self.on_segment_audio is not None:
+            self.on_segment_audio(pcm, start)
+
+    def listen(self, on_frame: Optional[Callable[[], None]] = None) -> Optional[Utterance]:
+        """
+        监听并录制一句话
+
+        Args:
+            on_frame: 每处理完一帧后的回调（如插话检测）
+
+        Returns:
+            内存中的语音片段；采集流被关闭时返回 None
+        """
+        self.start()
+        self.reset()
 
         print("\n[VAD] 正在倾听...")
-        frames = []
-        is_speaking = False
-        silent_frames = 0
-        ring_buffer = collections.deque(maxlen=self.config.ring_buffer_size)
+        while True:
+            frame = self.read_frame(timeout=0.5)
+            if frame is None:
+                if self._stream is None:
+                    return None
+                continue
 
-        try:
-            while True:
-                frame = stream.read(self.frame_size, exception_on_overflow=False)
-                is_speech = self.vad.is_speech(frame, self.config.sample_rate)
-
-                if not is_speaking:
-                    if is_speech:
-                        print("[VAD] 检测到语音...")
-                        is_speaking = True
-                        frames.extend(list(ring_buffer))
-                        frames.append(frame)
-                    else:
-                        ring_buffer.append(frame)
-                else:
-                    frames.append(frame)
-                    if not is_speech:
-                        silent_frames += 1
-                    else:
-                        silent_frames = 0
-
-                    if silent_frames > self.config.max_silent_frames:
-                        print("[VAD] 语音结束")
-                        break
-        finally:
-            stream.stop_stream()
-            stream.close()
-            p.terminate()
-
-        # 保存音频
-        wf = wave.open(output_file, 'wb')
-        wf.setnchannels(1)
-        wf.setsampwidth(p.get_sample_size(pyaudio.paInt16))
-        wf.setframerate(self.config.sample_rate)
-        wf.writeframes(b''.join(frames))
-        wf.close()
-
-        return output_file
\ No newline at end of file
+            utterance = self.process_frame(frame)
+            if on_frame is not None:
+                on_frame()
+            if utterance is not None:
+                return utterance
+
+    def close(self):
+        """关闭采集流并释放设备"""
+        with self._lock:
+            if self._stream is not None:
+                try:
+                    self._stream.stop_stream()
+                    self._stream.close()
+                except Exception as e:
+                    print(f"[VAD警告] 关闭采集流失败: {e}")
+                self._stream = None
+            if self._pa is not None:
+                self._pa.terminate()
+                self._pa = None
@@ -1,4 +1,5 @@
-from typing import Optional
+from typing import List, Optional, Tuple, Union
+import numpy as np
 from faster_whisper import WhisperModel
 from .base import BaseSTT
 from config.settings import STTConfig
@@ -22,7 +23,9 @@ class WhisperSTT(BaseSTT):
             self.model = WhisperModel(
                 self.config.model_path,
                 device=self.config.device,
-                compute_type=compute_type
+                compute_type=compute_type,
+                cpu_threads=self.config.cpu_threads,
+                num_workers=max(1, self.config.num_workers)
             )
             print(f"[STT] Whisper模型加载成功: {self.config.model_path} ({self.config.device})")
         except Exception as e:
@@ -30,26 +33,97 @@ class WhisperSTT(BaseSTT):
             raise
 
     def transcribe(self, audio_file: str) -> str:
+        """转录音频文件"""
+        return self._transcribe(audio_file)
+
+    def transcribe_array(self, audio: np.ndarray, clip_timestamps: Optional[List[float]] = None) -> str:
+        """
+        转录内存中的音频，省去落盘和解码
+
+        Args:
+            audio: 16kHz 单声道 PCM
+            clip_timestamps: 录音器给出的语音区间 [开始, 结束, ...]（秒），
+                提供时只解码这些区间，不再重复跑 Silero VAD
+        """
+        if audio.dtype == np.int16:
+            audio = audio.astype(np.float32) / 32768.0
+        return self._transcribe(audio.astype(np.float32, copy=False), clip_timestamps)
+
+    def _accept_segment(self, segment) -> bool:
+        """按解码置信度判断一段结果是否可信（取代按提示词字符串过滤幻觉）"""
+        if segment.no_speech_prob > self.config.no_speech_threshold and \
+                segment.avg_logprob < self.config.log_prob_threshold:
+            return False
+        return segment.avg_logprob >= self.config.min_avg_logprob
+
+    def _transcribe(self, audio: Union[str, np.ndarray], clip_timestamps: Optional[List[float]] = None) -> str:
         """转录音频"""
         if not self.model:
             raise RuntimeError("STT模型未初始化")
 
+        options = {}
+        if clip_timestamps and not self.config.vad_filter:
+            options["clip_timestamps"] = clip_timestamps
+        else:
+            options["vad_filter"] = self.config.vad_filter
+            options["vad_parameters"] = dict(min_silence_duration_ms=500)
+
         try:
             segments, _ = self.model.transcribe(
-                audio_file,
+                audio,
                 beam_size=self.config.beam_size,
                 language = "zh",  # 强制使用中文
                 initial_prompt="简体中文。",
-                vad_filter = True,
-                vad_parameters = dict(min_silence_duration_ms=500),
-                no_speech_threshold=0.6
+                no_speech_threshold=self.config.no_speech_threshold,
+                log_prob_threshold=self.config.log_prob_threshold,
+                **options
             )
-            text = "".join([s.text for s in segments]).strip()
-            return text
+            kept = []
+            for segment in segments:
+                if self._accept_segment(segment):
+                    kept.append(segment.text)
+                else:
+                    print(f"[STT] 丢弃低置信度结果: {segment.text.strip()} "
+                          f"(no_speech={segment.no_speech_prob:.2f}, logprob={segment.avg_logprob:.2f})")
+            return "".join(kept).strip()
         except Exception as e:
             print(f"[STT错误] 转录失败: {e}")
             return ""
 
+    def transcribe_words(self, audio: np.ndarray, initial_prompt: str = "简体中文。") -> List[Tuple[float, float, str]]:
+        """
+        带词级时间戳的转录，供增量转写对齐使用
+
+        Args:
+            audio: 16kHz float32 音频
+            initial_prompt: 提示词（通常附上已确认的文本）
+
+        Returns:
+            [(开始秒, 结束秒, 词), ...]，时间相对 audio 起点
+        """
+        if not self.model:
+            raise RuntimeError("STT模型未初始化")
+
+        try:
+            segments, _ = self.model.transcribe(
+                audio,
+                beam_size=self.config.beam_size,
+                language="zh",
+                initial_prompt=initial_prompt,
+                word_timestamps=True,
+                condition_on_previous_text=False,
+                no_speech_threshold=self.config.no_speech_threshold,
+                log_prob_threshold=self.config.log_prob_threshold
+            )
+            return [
+                (word.start, word.end, word.word)
+                for segment in segments if self._accept_segment(segment)
+                for word in (segment.words or [])
+            ]
+        except Exception as e:
+            print(f"[STT错误] 转录失败: {e}")
+            return []
+
     def is_ready(self) -> bool:
         """检查是否就绪"""
         return self.model is not None
\ No newline at end of file
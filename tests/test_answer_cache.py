@@ -0,0 +1,149 @@
+import unittest
+from unittest.mock import patch
+from smolagents import CodeAgent
+from smolagents.models import ChatMessage, MessageRole, Model
+from config.settings import AgentConfig, AnswerCacheConfig, WeatherConfig
+from agent.answer_cache import AnswerCache, CLOCK, normalize_query, tools_in_code
+from agent.code_agent import SmolCodeAgent
+from agent.router import ROUTE_AGENT, ROUTE_CACHE
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestAnswerCache(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.cache = AnswerCache(AnswerCacheConfig(max_entries=3, max_audio_bytes=10), clock=self.clock)
+
+    def test_normalize(self):
+        """测试去掉标点和首尾语气词"""
+        self.assertEqual(normalize_query("请问，今天天气怎么样啊？"), "今天天气怎么样")
+        self.assertEqual(normalize_query("现在几点了"), "现在几点")
+
+    def test_exact_and_similar_hits(self):
+        """测试改写后的同一问题命中，只差关键字的问题不命中"""
+        self.cache.put("北京今天天气怎么样", "北京晴。", {"get_weather"})
+        self.assertEqual(self.cache.lookup("北京今天天气怎么样？").text, "北京晴。")
+        self.assertIsNotNone(self.cache.lookup("北京今天的天气怎么样"))
+        self.assertIsNone(self.cache.lookup("上海今天天气怎么样"))
+        self.assertEqual((self.cache.exact_hits, self.cache.similar_hits, self.cache.misses), (1, 1, 1))
+
+    def test_ttl_by_tools(self):
+        """测试按用到的工具决定有效期"""
+        config = self.cache.config
+        self.assertEqual(self.cache.ttl_for(set()), config.static_ttl)
+        self.assertEqual(self.cache.ttl_for({"get_weather", "final_answer"}), config.weather_ttl)
+        self.assertEqual(self.cache.ttl_for({"web_search", CLOCK}), config.clock_ttl)
+        self.assertEqual(self.cache.ttl_for({"remember"}), 0)
+
+        self.cache.put("北京天气", "北京晴。", {"get_weather"})
+        self.cache.put("你是谁", "我是语音助手。", set())
+        self.clock.now = config.weather_ttl + 1
+        self.assertIsNone(self.cache.lookup("北京天气"))
+        self.assertIsNotNone(self.cache.lookup("你是谁"))
+
+    def test_uncacheable(self):
+        """测试追问、求变化的请求和涉及记忆的回答不缓存"""
+        self.assertIsNone(self.cache.put("那明天呢", "明天下雨。", set()))
+        self.assertIsNone(self.cache.put("讲个笑话", "从前有座山。", set()))
+        self.assertIsNone(self.cache.put("我住在哪", "杭州。", {"recall_memory"}))
+
+    def test_scoped_by_memory_context(self):
+        """测试依赖记忆上下文的回答只在同样的上下文下复用，与记忆无关的回答处处可用"""
+        self.cache.put("我叫什么名字", "你叫张三。", set(), context="ctx-a")
+        self.assertIsNone(self.cache.lookup("我叫什么名字"))
+        self.assertIsNone(self.cache.lookup("我叫什么名字", context="ctx-b"))
+        self.assertIsNone(self.cache.lookup("我叫什么名字呀", context="ctx-b"))
+        self.assertEqual(self.cache.lookup("我叫什么名字", context="ctx-a").text, "你叫张三。")
+
+        self.cache.put("北京天气", "北京晴。", {"get_weather"})
+        self.assertIsNotNone(self.cache.lookup("北京天气", context="ctx-b"))
+
+    def test_lru_and_audio_limit(self):
+        """测试条目按 LRU 淘汰，音频总量超限时丢掉最久未用条目的音频"""
+        first = self.cache.put("问题一", "回答一", set())
+        self.cache.attach_audio(first, "回答一", b"123456")
+        second = self.cache.put("问题二", "回答二", set())
+        self.cache.attach_audio(second, "回答二", b"123456")
+        self.assertEqual(first.audio, {})
+        self.assertEqual(self.cache.audio_for(second, "回答二"), b"123456")
+
+        self.cache.put("问题三", "回答三", set())
+        self.cache.lookup("问题一")
+        self.cache.put("问题四", "回答四", set())
+        self.assertIsNone(self.cache.lookup("问题二"))
+        self.assertIsNotNone(self.cache.lookup("问题一"))
+
+    def test_tools_in_code(self):
+        """测试从生成的代码中识别工具"""
+        code = "import datetime\nr = get_weather_batch(['北京'])\nfinal_answer(r)"
+        self.assertEqual(
+            tools_in_code(code, ["get_weather", "get_weather_batch", "final_answer"]),
+            {"get_weather_batch", "final_answer", CLOCK}
+        )
+
+
+class ScriptedModel(Model):
+    """每次都用 final_answer 返回固定回答，记录调用次数"""
+
+    def __init__(self, answer: str):
+        super().__init__(model_id="scripted")
+        self.answer = answer
+        self.calls = 0
+
+    def generate(self, messages, **kwargs):
+        self.calls += 1
+        return ChatMessage(role=MessageRole.ASSISTANT, content=f"<code>\nfinal_answer({self.answer!r})\n</code>")
+
+
+class TestAgentAnswerCache(unittest.TestCase):
+    """真实的 SmolCodeAgent 会话（带对话记忆），CodeAgent 换成按脚本回复的模型"""
+
+    def setUp(self):
+        with patch.object(SmolCodeAgent, "_initialize"):
+            self.agent = SmolCodeAgent(AgentConfig(fast_path=False, stream_outputs=False), WeatherConfig(),
+                                       cache_config=AnswerCacheConfig())
+
+    def new_session(self, answer: str) -> SmolCodeAgent:
+        model = ScriptedModel(answer)
+        code_agent = CodeAgent(tools=[], model=model, verbosity_level=-1)
+        with patch.object(SmolCodeAgent, "_build_code_agent", return_value=code_agent):
+            session = self.agent.new_session()
+        session.model = model
+        return session
+
+    def test_repeat_in_session_hits(self):
+        """测试同一会话里中间隔了几轮再问同样的问题仍然命中"""
+        session = self.new_session("我是语音助手。")
+        session.process("介绍一下故宫")  # 先有一轮对话记忆，之后的回答不再是在空记忆下写入的
+        self.assertEqual(session.process("你能做什么"), "我是语音助手。")
+        self.assertEqual(session.last_turn.route, ROUTE_AGENT)
+        session.process("介绍一下长城")
+        self.assertTrue(session.memory.render())
+
+        self.assertEqual(session.process("你能做什么？"), "我是语音助手。")
+        self.assertEqual(session.last_turn.route, ROUTE_CACHE)
+        self.assertEqual(session.model.calls, 3)
+
+    def test_personal_answer_scoped_to_session(self):
+        """测试问到用户自己的回答只在本会话内复用"""
+        first = self.new_session("你叫张三。")
+        first.process("我叫什么名字")
+        first.process("介绍一下长城")
+        first.process("我叫什么名字")
+        self.assertEqual(first.last_turn.route, ROUTE_CACHE)
+
+        second = self.new_session("我还不知道你的名字。")
+        self.assertEqual(second.process("我叫什么名字"), "我还不知道你的名字。")
+        self.assertEqual(second.last_turn.route, ROUTE_AGENT)
+
+
+if __name__ == "__main__":
+    unittest.main()
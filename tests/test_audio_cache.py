@@ -0,0 +1,76 @@
+import os
+import shutil
+import tempfile
+import unittest
+from config.settings import AudioCacheConfig
+from tts.audio_cache import AudioCache, prewarm_phrases, voice_hash
+
+
+class TestAudioCache(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.config = AudioCacheConfig(path=self.dir, max_bytes=25, max_text_chars=10)
+        self.voice = voice_hash(b"ref", "大家好")
+
+    def tearDown(self):
+        shutil.rmtree(self.dir, ignore_errors=True)
+
+    def test_hit_and_stats(self):
+        """测试命中直接返回音频，并统计命中率与省下的字节数"""
+        cache = AudioCache(self.config, self.voice)
+        self.assertIsNone(cache.get("好的，再见。", "wav"))
+        cache.put("好的，再见。", "wav", b"0123456789")
+        self.assertEqual(cache.get(" 好的，再见。", "wav"), b"0123456789")
+        self.assertIsNone(cache.get("好的，再见。", "wav-stream"))
+        self.assertEqual((cache.hits, cache.misses, cache.bytes_saved), (1, 2, 10))
+        self.assertIn("命中率 33%", cache.summary())
+
+    def test_keyed_by_voice(self):
+        """测试换了参考音频后不复用旧音色的音频"""
+        AudioCache(self.config, self.voice).put("好的。", "wav", b"abc")
+        other = AudioCache(self.config, voice_hash(b"other", "大家好"))
+        self.assertIsNone(other.get("好的。", "wav"))
+
+    def test_voice_hash_inputs(self):
+        """测试参考音频 ID 与合成参数也计入音色标识"""
+        base = voice_hash(b"ref", "大家好", "dz", {"format": "wav"})
+        self.assertEqual(base, voice_hash(b"ref", "大家好", "dz", {"format": "wav"}))
+        self.assertNotEqual(base, voice_hash(b"ref", "大家好", "other", {"format": "wav"}))
+        self.assertNotEqual(base, voice_hash(b"ref", "大家好", "dz", {"format": "mp3"}))
+        self.assertNotEqual(voice_hash(b"", "", "dz"), voice_hash(b"", "", "zd"))
+
+    def test_lru_eviction_survives_restart(self):
+        """测试超出容量时删除最久未用的文件，重启后按使用顺序恢复"""
+        cache = AudioCache(self.config, self.voice)
+        cache.put("一", "wav", b"a" * 10)
+        cache.put("二", "wav", b"b" * 10)
+        os.utime(cache._path(cache.key("一", "wav")), (0, 0))
+        os.utime(cache._path(cache.key("二", "wav")), (1, 1))
+
+        reloaded = AudioCache(self.config, self.voice)
+        self.assertEqual(len(reloaded), 2)
+        reloaded.get("一", "wav")  # “一”变为最近使用
+        reloaded.put("三", "wav", b"c" * 10)
+        self.assertIsNone(reloaded.get("二", "wav"))
+        self.assertEqual(reloaded.get("一", "wav"), b"a" * 10)
+        self.assertFalse(os.path.exists(reloaded._path(reloaded.key("二", "wav"))))
+        self.assertEqual(reloaded.evictions, 1)
+
+    def test_long_text_not_cached(self):
+        """测试长句不写入缓存"""
+        cache = AudioCache(self.config, self.voice)
+        cache.put("这是一句超过十个字的很长的回答", "wav", b"x")
+        self.assertEqual(len(cache), 0)
+
+    def test_prewarm_phrases(self):
+        """测试预热短句合并配置、过渡语和短句文件并去重"""
+        path = os.path.join(self.dir, "phrases.txt")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write("好的。\n\n马上就好。\n")
+        config = AudioCacheConfig(prewarm_phrases=["好的。"], filler="嗯。", prewarm_path=path)
+        self.assertEqual(prewarm_phrases(config), ["好的。", "嗯。", "马上就好。"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,148 @@
+import threading
+import time
+import unittest
+from agent.pooled_client import PooledClient
+from utils.backend_pool import BackendPool
+
+
+class FakeStream:
+    def __init__(self, url: str, delay: float):
+        self.url = url
+        self.delay = delay
+        self.closed = False
+
+    def __iter__(self):
+        time.sleep(self.delay)
+        for i in range(3):
+            if self.closed:
+                return
+            yield f"{self.url}:{i}"
+
+    def close(self):
+        self.closed = True
+
+
+class FakeLiteLLM:
+    """按 api_base 模拟各后端：delays 为首个结果的延迟，failing 中的后端直接报错"""
+
+    def __init__(self, delays, failing=()):
+        self.delays = delays
+        self.failing = set(failing)
+        self.streams = []
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def completion(self, api_base: str, stream: bool = False, **kwargs):
+        with self._lock:
+            self.calls.append(api_base)
+        if api_base in self.failing:
+            raise ConnectionError(f"{api_base} 拒绝连接")
+        if stream:
+            fake = FakeStream(api_base, self.delays[api_base])
+            self.streams.append(fake)
+            return fake
+        time.sleep(self.delays[api_base])
+        return api_base
+
+
+class TestBackendPool(unittest.TestCase):
+
+    def test_least_outstanding(self):
+        """测试优先选择进行中请求最少的后端"""
+        pool = BackendPool(["a", "b"])
+        first = pool.acquire()
+        second = pool.acquire()
+        self.assertNotEqual(first.url, second.url)
+        pool.release(first)
+        self.assertIs(pool.acquire(), first)
+
+    def test_ejection(self):
+        """测试连续失败的后端被摘除，到期后恢复"""
+        pool = BackendPool(["a", "b"], eject_failures=2, eject_seconds=0.05)
+        a = pool.backends[0]
+        pool.record_failure(a, RuntimeError("x"))
+        pool.record_failure(a, RuntimeError("x"))
+        self.assertEqual({pool.acquire().url for _ in range(3)}, {"b"})
+        time.sleep(0.06)
+        for backend in pool.backends:
+            backend.outstanding = 0
+        self.assertEqual(pool.acquire().url, "a")
+
+    def test_half_open_single_probe(self):
+        """测试摘除到期后只放行一个试探请求，试探失败立即重新摘除，成功才恢复"""
+        pool = BackendPool(["a", "b"], eject_failures=2, eject_seconds=0.05)
+        a = pool.backends[0]
+        pool.record_failure(a, RuntimeError("x"))
+        pool.record_failure(a, RuntimeError("x"))
+        time.sleep(0.06)
+        probe = pool.acquire()
+        self.assertIs(probe, a)
+        self.assertEqual({pool.acquire().url for _ in range(3)}, {"b"})  # 试探未完成前不再分给 a
+
+        pool.record_failure(a, RuntimeError("x"))  # 一次失败就重新摘除
+        pool.release(a)
+        time.sleep(0.01)
+        self.assertEqual(pool.acquire(exclude=["b"]), a)  # 只剩被摘除的后端时仍会试探
+        pool.release(a)
+        self.assertEqual(a.state(time.monotonic()), "ejected")
+
+        time.sleep(0.06)
+        self.assertIs(pool.acquire(), a)
+        pool.record_success(a, 0.1, stream=False)
+        pool.release(a)
+        self.assertEqual(a.state(time.monotonic()), "healthy")
+        for backend in pool.backends:
+            backend.outstanding = 0
+        self.assertEqual({pool.acquire().url for _ in range(2)}, {"a", "b"})
+
+    def test_counters_thread_safe(self):
+        """测试多线程同时计数不丢失"""
+        pool = BackendPool(["a"])
+
+        def bump():
+            for _ in range(1000):
+                pool.record_hedge()
+                pool.record_hedge_win()
+                pool.record_failover()
+
+        threads = [threading.Thread(target=bump) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual((pool.hedges, pool.hedge_wins, pool.failovers), (8000, 8000, 8000))
+
+    def test_failover(self):
+        """测试请求失败时立即转到下一个后端"""
+        pool = BackendPool(["a", "b"])
+        client = PooledClient(FakeLiteLLM({"a": 0, "b": 0}, failing={"a"}), pool, hedge=False)
+        self.assertEqual(client.completion(model="m"), "b")
+        self.assertEqual(pool.failovers, 1)
+        self.assertEqual([b.outstanding for b in pool.backends], [0, 0])
+
+    def test_hedge_stream(self):
+        """测试首 token 超时后对冲到另一个后端，落败的流被关闭"""
+        pool = BackendPool(["slow", "fast"], hedge_initial_delay=0.05)
+        fake = FakeLiteLLM({"slow": 0.5, "fast": 0.0})
+        client = PooledClient(fake, pool)
+        started = time.perf_counter()
+        events = list(client.completion(model="m", stream=True))
+        self.assertLess(time.perf_counter() - started, 0.4)
+        self.assertEqual(events, ["fast:0", "fast:1", "fast:2"])
+        self.assertEqual((pool.hedges, pool.hedge_wins), (1, 1))
+
+        time.sleep(0.6)  # 等落败的请求拿到首个事件后自行关闭
+        slow = next(stream for stream in fake.streams if stream.url == "slow")
+        self.assertTrue(slow.closed)
+        self.assertEqual([b.outstanding for b in pool.backends], [0, 0])
+
+    def test_no_hedge_when_fast(self):
+        """测试首个结果在期限内到达时不对冲"""
+        pool = BackendPool(["a", "b"], hedge_initial_delay=0.2)
+        fake = FakeLiteLLM({"a": 0.0, "b": 0.0})
+        self.assertEqual(PooledClient(fake, pool).completion(model="m"), "a")
+        self.assertEqual((len(fake.calls), pool.hedges), (1, 0))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,122 @@
+import json
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+from smolagents import CodeAgent
+from smolagents.models import ChatMessage, MessageRole, Model
+from agent.code_agent import SmolCodeAgent, TurnInfo
+from config.settings import AgentConfig, WeatherConfig
+from config.settings import BatchConfig
+from pipeline.batch_runner import BatchRunner, load_conversations
+
+
+class FakeSession:
+    def __init__(self):
+        self.history = []
+        self.last_turn = TurnInfo()
+
+    def process(self, prompt: str) -> str:
+        if prompt == "boom":
+            raise RuntimeError("模型超时")
+        self.history.append(prompt)
+        self.last_turn = TurnInfo(route="agent", steps=len(self.history))
+        return "/".join(self.history)
+
+
+class FakeAgent:
+    def new_session(self):
+        return FakeSession()
+
+
+class ScriptedModel(Model):
+    """按顺序返回预设的回复，用完后返回固定文本（步数耗尽时的强制作答）"""
+
+    def __init__(self, replies):
+        super().__init__(model_id="scripted")
+        self.replies = list(replies)
+
+    def generate(self, messages, **kwargs):
+        content = self.replies.pop(0) if self.replies else "没能查到。"
+        return ChatMessage(role=MessageRole.ASSISTANT, content=content)
+
+
+class ScriptedAgent:
+    """真实的 SmolCodeAgent 会话，CodeAgent 换成按脚本回复的模型"""
+
+    FAILING = "<code>\nundefined_name\n</code>"
+    SCRIPTS = {
+        "放弃": [FAILING] * 3,
+        "重试": [FAILING, "<code>\nfinal_answer('好的')\n</code>"],
+    }
+
+    def __init__(self):
+        with patch.object(SmolCodeAgent, "_initialize"):
+            self.agent = SmolCodeAgent(AgentConfig(fast_path=False, stream_outputs=False), WeatherConfig())
+
+    def new_session(self):
+        code_agent = CodeAgent(tools=[], model=ScriptedModel([]), max_steps=2, verbosity_level=-1)
+        with patch.object(SmolCodeAgent, "_build_code_agent", return_value=code_agent):
+            session = self.agent.new_session()
+        original = session.process
+
+        def process(prompt: str) -> str:
+            session.agent.model.replies = list(self.SCRIPTS[prompt])
+            return original(prompt)
+
+        session.process = process
+        return session
+
+
+class TestBatchRunner(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.input = os.path.join(self.dir, "in.jsonl")
+        self.output = os.path.join(self.dir, "out.jsonl")
+
+    def _write(self, lines):
+        with open(self.input, "w", encoding="utf-8") as f:
+            f.write("\n".join(json.dumps(line, ensure_ascii=False) for line in lines) + "\n")
+
+    def test_load(self):
+        """测试单轮与多轮用例，缺少 id 时用行号"""
+        self._write([{"prompt": "你好"}, {"id": "c", "turns": ["北京天气", "那上海呢"]}])
+        conversations = load_conversations(self.input)
+        self.assertEqual([(c.id, c.turns) for c in conversations], [("1", ["你好"]), ("c", ["北京天气", "那上海呢"])])
+
+        self._write([{"id": "x"}])
+        with self.assertRaises(ValueError):
+            load_conversations(self.input)
+
+    def test_run(self):
+        """测试每个对话使用独立会话，结果与统计完整"""
+        self._write([{"id": "a", "turns": ["1", "2"]}, {"id": "b", "prompt": "3"}, {"id": "c", "prompt": "boom"}])
+        stats = BatchRunner(FakeAgent(), BatchConfig(self.input, self.output, workers=3)).run()
+
+        with open(self.output, "r", encoding="utf-8") as f:
+            records = {(r["id"], r["turn"]): r for r in map(json.loads, f)}
+        self.assertEqual(records[("a", 1)]["answer"], "1/2")
+        self.assertEqual(records[("b", 0)]["answer"], "3")
+        self.assertEqual(records[("a", 1)]["steps"], 2)
+        self.assertIn("模型超时", records[("c", 0)]["error"])
+        self.assertEqual((len(stats.latencies), stats.errors, stats.conversations), (4, 1, 3))
+        self.assertIn("p99", stats.summary())
+
+    def test_agent_step_errors(self):
+        """测试 smolagents 不抛异常的步骤错误与步数耗尽也写入结果"""
+        self._write([{"id": "a", "prompt": "放弃"}, {"id": "b", "prompt": "重试"}])
+        stats = BatchRunner(ScriptedAgent(), BatchConfig(self.input, self.output, workers=1)).run()
+
+        with open(self.output, "r", encoding="utf-8") as f:
+            records = {r["id"]: r for r in map(json.loads, f)}
+        self.assertIn("达到最大步数 2", records["a"]["error"])
+        self.assertIn("undefined_name", records["a"]["error"])
+        self.assertEqual(records["a"]["step_errors"], 2)
+        self.assertIsNone(records["b"]["error"])
+        self.assertEqual((records["b"]["answer"], records["b"]["step_errors"]), ("好的", 1))
+        self.assertEqual(stats.errors, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,60 @@
+import unittest
+from config.settings import VADConfig
+from stt.endpointer import AdaptiveEndpointer
+
+
+class TestAdaptiveEndpointer(unittest.TestCase):
+
+    def setUp(self):
+        self.config = VADConfig()
+        self.endpointer = AdaptiveEndpointer(self.config)
+
+    def test_default_to_max_without_stats(self):
+        """测试没有统计数据时使用上限"""
+        self.assertEqual(self.endpointer.silence_limit(), self.config.max_silent_frames)
+
+    def test_short_pauses_tighten_limit(self):
+        """测试停顿短的用户阈值收紧"""
+        for _ in range(20):
+            self.endpointer.observe_pause(5)
+        limit = self.endpointer.silence_limit()
+        self.assertLess(limit, self.config.max_silent_frames)
+        self.assertGreaterEqual(limit, self.config.min_silent_frames)
+
+    def test_complete_partial_text_uses_min(self):
+        """测试文本已完整时使用下限"""
+        self.assertEqual(self.endpointer.silence_limit("明天会下雨吗"), self.config.min_silent_frames)
+
+    def test_disabled(self):
+        """测试关闭自适应时保持固定阈值"""
+        endpointer = AdaptiveEndpointer(VADConfig(adaptive_endpoint=False))
+        endpointer.observe_pause(5)
+        self.assertEqual(endpointer.silence_limit("好的。"), VADConfig.max_silent_frames)
+
+    def test_trailing_particle_not_complete(self):
+        """测试“了”“吧”结尾不直接判定说完，短句里的疑问词也不算"""
+        upper = self.config.max_silent_frames
+        self.assertEqual(self.endpointer.silence_limit("吃吗"), upper)
+        self.assertGreater(self.endpointer.silence_limit("我昨天去了"), self.config.min_silent_frames)
+        self.assertLess(self.endpointer.silence_limit("我昨天去了"), upper)
+
+    def test_cut_pause_is_recovered(self):
+        """测试被切断的句中停顿补记为停顿，阈值不会一路缩到下限"""
+        for _ in range(20):
+            self.endpointer.observe_pause(5)
+        tight = self.endpointer.silence_limit()
+        for _ in range(10):
+            # 每次停顿刚超过阈值就被切断，用户随即接着说
+            self.endpointer.observe_end(self.endpointer.silence_limit() + 1)
+            self.endpointer.observe_resume(4)
+        self.assertGreater(self.endpointer.silence_limit(), tight)
+
+        # 说完后隔很久才开口的是新的一句，不计入停顿
+        limit = self.endpointer.silence_limit()
+        self.endpointer.observe_end(limit + 1)
+        self.endpointer.observe_resume(self.config.max_silent_frames + 1)
+        self.assertEqual(self.endpointer.silence_limit(), limit)
+
+
+if __name__ == "__main__":
+    unittest.main()
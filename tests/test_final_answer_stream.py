@@ -0,0 +1,43 @@
+import unittest
+from agent.final_answer_stream import FinalAnswerStreamParser
+
+
+class TestFinalAnswerStreamParser(unittest.TestCase):
+
+    def feed_all(self, parser, chunks):
+        return "".join(parser.feed(chunk) for chunk in chunks)
+
+    def test_extract_literal_by_chunks(self):
+        """测试逐段提取字面量"""
+        parser = FinalAnswerStreamParser()
+        chunks = ["weather = get_weather('上海')\n", "final_ans", "wer(\"上海", "今天晴。\\n", "再见\")"]
+        self.assertEqual(self.feed_all(parser, chunks), "上海今天晴。\n再见")
+        self.assertTrue(parser.finished)
+
+    def test_triple_quoted_literal(self):
+        """测试三引号字面量"""
+        parser = FinalAnswerStreamParser()
+        chunks = ['final_answer(', '"', '""你说"好"', '的"""', ')']
+        self.assertEqual(self.feed_all(parser, chunks), '你说"好"的')
+
+    def test_skip_fstring(self):
+        """测试 f-string 不做提前解析"""
+        parser = FinalAnswerStreamParser()
+        self.assertEqual(self.feed_all(parser, ['final_answer(f"温度{t}度")']), "")
+
+    def test_skip_conditional_call(self):
+        """测试分支里的 final_answer 不提前解析，避免播报没有执行的分支"""
+        parser = FinalAnswerStreamParser()
+        chunks = ["if rain:\n", "    final_answer(\"带伞\")\n", "else:\n", "    final_answer(\"不用带伞\")"]
+        self.assertEqual(self.feed_all(parser, chunks), "")
+        self.assertTrue(parser.finished)
+
+    def test_skip_non_literal_argument(self):
+        """测试参数是变量时放弃，后面出现的字面量也不再解析"""
+        parser = FinalAnswerStreamParser()
+        chunks = ["final_answer(", "result)\n", "final_answer(\"兜底\")"]
+        self.assertEqual(self.feed_all(parser, chunks), "")
+
+
+if __name__ == "__main__":
+    unittest.main()
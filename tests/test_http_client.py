@@ -0,0 +1,86 @@
+import io
+import threading
+import time
+import unittest
+from contextlib import redirect_stdout
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from config.settings import HttpConfig
+from utils.http_client import HttpClient
+
+
+class SlowHandler(BaseHTTPRequestHandler):
+    """每个请求稍等一下再返回，让并发请求同时占用多个连接"""
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        time.sleep(0.05)
+        self.send_response(200)
+        self.send_header("Content-Length", "2")
+        self.end_headers()
+        self.wfile.write(b"ok")
+
+    def log_message(self, *args):
+        pass
+
+
+class TestSharedClient(unittest.TestCase):
+
+    def setUp(self):
+        HttpClient._shared = None
+        self.addCleanup(setattr, HttpClient, "_shared", None)
+
+    def test_same_instance(self):
+        """测试共享客户端只创建一次，相同配置或不传配置不告警"""
+        output = io.StringIO()
+        with redirect_stdout(output):
+            first = HttpClient.shared(HttpConfig(pool_maxsize=16))
+            self.assertIs(HttpClient.shared(), first)
+            self.assertIs(HttpClient.shared(HttpConfig(pool_maxsize=16)), first)
+        self.assertEqual(first.config.pool_maxsize, 16)
+        self.assertEqual(output.getvalue(), "")
+
+    def test_mismatched_config_warns(self):
+        """测试之后传入的不同配置被忽略时打印警告，指出被忽略的字段"""
+        first = HttpClient.shared()
+        output = io.StringIO()
+        with redirect_stdout(output):
+            self.assertIs(HttpClient.shared(HttpConfig(pool_maxsize=16, retries=2)), first)
+        self.assertIn("[HTTP警告]", output.getvalue())
+        self.assertIn("pool_maxsize=16（当前 8）", output.getvalue())
+        self.assertNotIn("retries", output.getvalue())
+        self.assertEqual(first.config.pool_maxsize, 8)
+
+
+class TestConnectionStats(unittest.TestCase):
+
+    def setUp(self):
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), SlowHandler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        self.url = f"http://127.0.0.1:{self.server.server_port}/"
+        self.client = HttpClient(HttpConfig(pool_maxsize=4))
+        self.addCleanup(self.client.close)
+
+    def test_concurrent_new_connections_counted_once(self):
+        """测试并发请求下新建连接数不重复计入，之后的请求复用连接"""
+        threads = [threading.Thread(target=lambda: self.client.get(self.url)) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        host = f"127.0.0.1:{self.server.server_port}"
+        stats = self.client.stats[host]
+        self.assertEqual(stats.requests, 4)
+        self.assertEqual(stats.new_connections, self.client._connection_count(self.url))
+        self.assertLessEqual(stats.new_connections, 4)
+
+        created = stats.new_connections
+        for _ in range(3):
+            self.client.get(self.url)
+        self.assertEqual(stats.new_connections, created)
+        self.assertEqual(stats.requests, 7)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,69 @@
+import threading
+import time
+import unittest
+from agent.memory import ConversationMemory, estimate_tokens
+
+
+class TestConversationMemory(unittest.TestCase):
+
+    def test_estimate_tokens(self):
+        """测试中文按字、英文按约 4 字符估算"""
+        self.assertEqual(estimate_tokens("你好"), 2)
+        self.assertEqual(estimate_tokens("abcdefgh"), 2)
+
+    def test_append_keeps_prefix(self):
+        """测试预算内追加新一轮时前缀不变"""
+        memory = ConversationMemory(token_budget=1000)
+        memory.add_turn("你好", "你好呀")
+        before = memory.render()
+        memory.add_turn("北京天气怎么样", "北京晴，20度")
+        self.assertTrue(memory.render().startswith(before))
+
+    def test_fold_over_budget(self):
+        """测试超出预算时成批折叠进摘要"""
+        calls = []
+
+        def summarizer(summary, turns):
+            calls.append(len(turns))
+            return f"{summary}聊了{len(turns)}轮"
+
+        memory = ConversationMemory(token_budget=60, fold_turns=2, summarizer=summarizer)
+        for i in range(6):
+            memory.add_turn(f"第{i}个问题是什么呢", f"这是第{i}个回答")
+        self.assertLessEqual(memory.tokens, 60)
+        self.assertTrue(all(count == 2 for count in calls))
+        self.assertIn("【对话摘要】", memory.render())
+
+    def test_fold_without_summarizer_truncates(self):
+        """测试摘要失败时退回截断"""
+        def broken(summary, turns):
+            raise RuntimeError("offline")
+
+        memory = ConversationMemory(token_budget=20, fold_turns=1, summary_max_chars=10, summarizer=broken)
+        memory.add_turn("一二三四五六七八九十", "十九八七六五四三二一")
+        memory.add_turn("你好", "你好")
+        self.assertLessEqual(len(memory.summary), 10)
+
+    def test_background_fold_does_not_block(self):
+        """测试后台折叠时记录和渲染不等待摘要模型"""
+        release = threading.Event()
+
+        def slow(summary, turns):
+            release.wait(2)
+            return "聊了几轮"
+
+        memory = ConversationMemory(token_budget=20, fold_turns=1, summarizer=slow, background=True)
+        started = time.perf_counter()
+        memory.add_turn("一二三四五六七八九十", "十九八七六五四三二一")
+        memory.add_turn("你好", "你好")
+        self.assertIn("【最近对话】", memory.render())
+        self.assertLess(time.perf_counter() - started, 0.5)
+
+        release.set()
+        memory.wait_folds(2)
+        self.assertEqual(memory.summary, "聊了几轮")
+        self.assertLessEqual(memory.tokens, 20)
+
+
+if __name__ == "__main__":
+    unittest.main()
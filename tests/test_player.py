@@ -0,0 +1,37 @@
+import io
+import wave
+import unittest
+from tts.player import parse_wav_header
+
+
+class TestParseWavHeader(unittest.TestCase):
+
+    def make_wav(self, pcm: bytes) -> bytes:
+        buf = io.BytesIO()
+        with wave.open(buf, "wb") as wf:
+            wf.setnchannels(1)
+            wf.setsampwidth(2)
+            wf.setframerate(44100)
+            wf.writeframes(pcm)
+        return buf.getvalue()
+
+    def test_parse_complete_header(self):
+        """测试解析完整的 WAV 头"""
+        data = self.make_wav(b"\x01\x00" * 10)
+        channels, rate, width, offset = parse_wav_header(data)
+        self.assertEqual((channels, rate, width), (1, 44100, 2))
+        self.assertEqual(data[offset:], b"\x01\x00" * 10)
+
+    def test_incomplete_header(self):
+        """测试流式场景下头部尚未收全"""
+        data = self.make_wav(b"")
+        self.assertIsNone(parse_wav_header(data[:20]))
+
+    def test_invalid_data(self):
+        """测试非 WAV 数据"""
+        with self.assertRaises(ValueError):
+            parse_wav_header(b"ID3" + b"\x00" * 20)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,41 @@
+import unittest
+from agent.router import IntentRouter, RouterStats, ROUTE_AGENT, ROUTE_CHAT, ROUTE_WEATHER
+
+
+class TestIntentRouter(unittest.TestCase):
+
+    def setUp(self):
+        self.router = IntentRouter()
+
+    def test_chit_chat(self):
+        """测试寒暄走闲聊通道"""
+        for text in ("你好", "谢谢", "晚安。", "你是谁？"):
+            self.assertEqual(self.router.classify(text), (ROUTE_CHAT, None), text)
+
+    def test_single_city_weather(self):
+        """测试单城市天气直接调用工具"""
+        self.assertEqual(self.router.classify("北京天气怎么样？"), (ROUTE_WEATHER, "北京"))
+        self.assertEqual(self.router.classify("帮我查一下上海市现在的气温"), (ROUTE_WEATHER, "上海"))
+
+    def test_complex_requests_use_agent(self):
+        """测试预报、多城市和需要工具的请求进入 Agent"""
+        for text in ("明天天气怎么样", "北京和上海天气", "那广州呢？", "帮我算一下 3 乘以 7",
+                     "搜索一下最新的科技新闻然后总结给我", "好的，帮我查一下北京天气"):
+            self.assertEqual(self.router.classify(text)[0], ROUTE_AGENT, text)
+
+    def test_greeting_prefix_keeps_length_cap(self):
+        """测试以寒暄开头的长请求仍受长度限制，整句寒暄不受限制"""
+        self.assertEqual(self.router.classify("好的，那就这样安排吧我之后再跟你确认订票的具体细节")[0], ROUTE_AGENT)
+        self.assertEqual(self.router.classify("好的好的，谢谢你！辛苦了，晚安啦，哈哈哈哈"), (ROUTE_CHAT, None))
+
+    def test_saved_latency(self):
+        """测试按 Agent 平均耗时估算节省的时间"""
+        stats = RouterStats()
+        stats.record(ROUTE_AGENT, 4.0)
+        stats.record(ROUTE_CHAT, 1.0)
+        self.assertAlmostEqual(stats.saved_seconds, 3.0)
+        self.assertEqual(stats.routes[ROUTE_CHAT], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
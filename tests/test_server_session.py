@@ -0,0 +1,123 @@
+import asyncio
+import threading
+import unittest
+from config.settings import ServerConfig, default_config
+from server.app import VoiceServer
+from server.session import SessionBusyError, SessionLimitError, SessionManager
+
+
+class FakeAgent:
+    def __init__(self):
+        self.interrupted = 0
+
+    def new_session(self):
+        return FakeAgent()
+
+    def interrupt(self):
+        self.interrupted += 1
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestSessionManager(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = FakeClock()
+        config = ServerConfig(max_sessions=2, idle_timeout=60, session_queue=1)
+        self.manager = SessionManager(FakeAgent(), config, clock=self.clock)
+
+    def test_sessions_are_isolated(self):
+        """测试每个会话有独立的 Agent，按 ID 取回同一个会话"""
+        first = self.manager.get_or_create()
+        second = self.manager.get_or_create()
+        self.assertIsNot(first.agent, second.agent)
+        self.assertIs(self.manager.get_or_create(first.id), first)
+
+    def test_idle_eviction(self):
+        """测试超过空闲时限的会话被回收，进行中的会话保留"""
+        idle = self.manager.get_or_create()
+        busy = self.manager.get_or_create()
+        evicted = []
+        idle.on_evict = lambda: evicted.append(idle.id)
+        busy.pending = 1
+        self.clock.now = 61
+        self.assertEqual(self.manager.evict_idle(), [idle.id])
+        self.assertEqual(evicted, [idle.id])
+        self.assertIsNotNone(self.manager.get(busy.id))
+
+    def test_limit(self):
+        """测试会话已满时回收最久未用的空闲会话，全部忙碌时拒绝"""
+        first = self.manager.get_or_create()
+        second = self.manager.get_or_create()
+        self.clock.now = 1
+        second.touch()
+        self.manager.get_or_create()
+        self.assertIsNone(self.manager.get(first.id))
+
+        for session in list(self.manager._sessions.values()):
+            session.pending = 1
+        with self.assertRaises(SessionLimitError):
+            self.manager.get_or_create()
+
+    def test_turn_backpressure(self):
+        """测试会话排队轮次超限时拒绝"""
+        session = self.manager.get_or_create()
+
+        async def run():
+            async with session.acquire_turn(max_pending=1):
+                with self.assertRaises(SessionBusyError):
+                    session.acquire_turn(max_pending=1)
+            self.assertEqual(session.pending, 0)
+            self.assertEqual(session.turns, 1)
+
+        asyncio.run(run())
+
+
+class FailingAgent(FakeAgent):
+    """查缓存时失败，记下在哪个线程被调用"""
+    answer_cache = None
+
+    def __init__(self):
+        super().__init__()
+        self.threads = []
+
+    def new_session(self):
+        return self
+
+    def cached_answer(self, text: str):
+        self.threads.append(threading.current_thread())
+        raise RuntimeError("记忆摘要失败")
+
+
+class TestVoiceServerTurn(unittest.TestCase):
+
+    def test_turn_error_reaches_client(self):
+        """测试一轮失败时客户端收到 error，缓存查询不在事件循环线程里执行"""
+        agent = FailingAgent()
+        server = VoiceServer(default_config, agent, stt=None, tts=None)
+        session = server.sessions.get_or_create()
+        sent = []
+
+        async def emit(message):
+            sent.append(message)
+
+        async def run():
+            server._turn_slots = asyncio.Semaphore(1)
+            await server._ws_turn(session, "你好", emit, with_audio=False)
+
+        asyncio.run(run())
+        server._executor.shutdown()
+        self.assertEqual([m["type"] for m in sent], ["error"])
+        self.assertIn("记忆摘要失败", sent[0]["message"])
+        self.assertIsNot(agent.threads[0], threading.main_thread())
+        self.assertEqual(session.pending, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
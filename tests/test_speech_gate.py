@@ -0,0 +1,112 @@
+import unittest
+from types import SimpleNamespace
+from unittest.mock import patch
+import numpy as np
+from config.settings import STTConfig, VADConfig
+from stt.gate import SpeechGate
+from stt.vad_recorder import Utterance
+from stt.whisper_stt import WhisperSTT
+
+RATE = 16000
+
+
+def make_utterance(spans, voiced_frames=None, amplitude=1000, duration=2.0) -> Utterance:
+    """构造语音片段：spans 内填入给定幅度的方波，默认语音区间内的帧全部判为语音"""
+    audio = np.zeros(int(duration * RATE), dtype=np.int16)
+    for start, end in spans:
+        audio[int(start * RATE):int(end * RATE)] = amplitude
+    if voiced_frames is None:
+        voiced_frames = int(sum(end - start for start, end in spans) * 1000 / 30)
+    return Utterance(audio=audio, sample_rate=RATE, voiced_frames=voiced_frames, speech_spans=spans)
+
+
+class FakeSegment(SimpleNamespace):
+    pass
+
+
+class FakeModel:
+    """记录 transcribe 的参数，返回预设的段落"""
+
+    def __init__(self, segments):
+        self.segments = segments
+        self.kwargs = None
+
+    def transcribe(self, audio, **kwargs):
+        self.kwargs = kwargs
+        return iter(self.segments), None
+
+
+class TestSpeechGate(unittest.TestCase):
+
+    def setUp(self):
+        self.gate = SpeechGate(VADConfig(gate_min_speech_s=0.3, gate_min_voiced_ratio=0.3, gate_min_rms=200.0))
+
+    def test_accept_speech(self):
+        """测试正常的一句话通过门限"""
+        self.assertIsNone(self.gate.check(make_utterance([(0.2, 1.2)])))
+        self.assertEqual((self.gate.accepted, self.gate.rejected), (1, 0))
+
+    def test_reject_noise(self):
+        """测试过短、语音帧稀疏、能量过低的片段分别被拒绝"""
+        cases = [
+            (make_utterance([(0.2, 0.35)]), "语音过短"),
+            (make_utterance([(0.2, 1.2)], voiced_frames=5), "语音帧占比过低"),
+            (make_utterance([(0.2, 1.2)], amplitude=50), "能量过低"),
+            (make_utterance([]), "语音过短"),
+        ]
+        for utterance, reason in cases:
+            self.assertIn(reason, self.gate.check(utterance))
+        self.assertEqual((self.gate.accepted, self.gate.rejected), (0, 4))
+
+
+class TestClipTimestamps(unittest.TestCase):
+
+    def test_padding_and_clamp(self):
+        """测试区间两侧留白，且不超出片段首尾"""
+        utterance = make_utterance([(0.1, 0.8), (1.5, 1.9)], duration=2.0)
+        self.assertEqual(utterance.clip_timestamps(padding=0.2, min_gap=0.3), [0.0, 1.0, 1.3, 2.0])
+
+    def test_merge_close_spans(self):
+        """测试间隔小于 min_gap 的区间合并"""
+        utterance = make_utterance([(0.5, 0.8), (1.2, 1.4)], duration=3.0)
+        self.assertEqual(utterance.clip_timestamps(padding=0.1, min_gap=0.3), [0.4, 1.5])
+        self.assertEqual(utterance.clip_timestamps(padding=0.0, min_gap=0.3), [0.5, 0.8, 1.2, 1.4])
+
+    def test_no_speech(self):
+        self.assertEqual(make_utterance([]).clip_timestamps(), [])
+
+
+class TestWhisperConfidence(unittest.TestCase):
+
+    def make_stt(self, segments, **config) -> WhisperSTT:
+        with patch.object(WhisperSTT, "_initialize"):
+            stt = WhisperSTT(STTConfig(**config))
+        stt.model = FakeModel(segments)
+        return stt
+
+    def test_segment_thresholds(self):
+        """测试按 no_speech_prob 与 avg_logprob 过滤段落"""
+        segments = [
+            FakeSegment(text="今天天气", no_speech_prob=0.1, avg_logprob=-0.3),  # 正常
+            FakeSegment(text="谢谢观看", no_speech_prob=0.9, avg_logprob=-1.2),  # 多半是静音里的幻觉
+            FakeSegment(text="怎么样", no_speech_prob=0.9, avg_logprob=-0.5),  # 像静音但解码很有把握，保留
+            FakeSegment(text="字幕", no_speech_prob=0.1, avg_logprob=-1.8),  # 置信度过低
+        ]
+        stt = self.make_stt(segments, no_speech_threshold=0.6, log_prob_threshold=-1.0, min_avg_logprob=-1.5)
+        self.assertEqual(stt.transcribe_array(np.zeros(RATE, dtype=np.int16)), "今天天气怎么样")
+
+    def test_clip_timestamps_passed(self):
+        """测试给出语音区间时只解码这些区间，不再跑 Silero VAD"""
+        stt = self.make_stt([], vad_filter=False)
+        stt.transcribe_array(np.zeros(RATE, dtype=np.float32), clip_timestamps=[0.0, 0.5])
+        self.assertEqual(stt.model.kwargs["clip_timestamps"], [0.0, 0.5])
+        self.assertNotIn("vad_filter", stt.model.kwargs)
+
+        stt = self.make_stt([], vad_filter=True)
+        stt.transcribe_array(np.zeros(RATE, dtype=np.float32), clip_timestamps=[0.0, 0.5])
+        self.assertNotIn("clip_timestamps", stt.model.kwargs)
+        self.assertTrue(stt.model.kwargs["vad_filter"])
+
+
+if __name__ == "__main__":
+    unittest.main()
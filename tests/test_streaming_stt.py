@@ -0,0 +1,108 @@
+import unittest
+from config.settings import STTConfig
+from stt.streaming_stt import StreamingTranscriber
+
+RATE = 1000  # 采样率取 1000，1 秒 = 1000 个采样，便于换算
+
+
+class FakeWhisper:
+    """按顺序返回预设的词（时间相对本次解码音频的起点），记录每次解码的音频长度与提示词"""
+
+    def __init__(self, replies):
+        self.replies = list(replies)
+        self.calls = []
+
+    def transcribe_words(self, audio, initial_prompt=None):
+        self.calls.append((len(audio), initial_prompt))
+        return self.replies.pop(0) if self.replies else []
+
+
+def seconds(n: float) -> bytes:
+    return b"\0\0" * int(n * RATE)
+
+
+class TestStreamingTranscriber(unittest.TestCase):
+
+    def make(self, replies):
+        self.whisper = FakeWhisper(replies)
+        config = STTConfig(stream_interval_s=1.0, stream_commit_margin_s=0.5)
+        transcriber = StreamingTranscriber(self.whisper, config, sample_rate=RATE)
+        self.addCleanup(transcriber.close)
+        return transcriber
+
+    def feed(self, transcriber, n: float, start: bool = False):
+        """喂入 n 秒语音并等待这次增量解码结束"""
+        transcriber.feed(seconds(n), start=start)
+        future = transcriber._session._future
+        if future is not None:
+            future.result()
+
+    def test_local_agreement(self):
+        """测试相邻两次解码一致的前缀才确认，之后只解码确认位置之后的音频"""
+        transcriber = self.make([
+            [(0.0, 0.3, "今天"), (0.3, 0.6, "天气")],
+            [(0.0, 0.3, "今天"), (0.3, 0.6, "天气"), (0.6, 1.2, "怎么样")],
+            [(0.0, 0.6, "怎么样"), (0.6, 1.0, "啊")],
+        ])
+        self.feed(transcriber, 1.0)
+        self.assertEqual(transcriber.partial_text(), "")  # 只解码过一次，没有可以比较的
+        self.feed(transcriber, 1.0)
+        self.assertEqual(transcriber.partial_text(), "今天天气")
+
+        self.feed(transcriber, 1.0)
+        # 第三次只解码 0.6s 之后的 2.4s，提示词带上已确认的文本
+        self.assertEqual(self.whisper.calls[2], (2400, "简体中文。今天天气"))
+        self.assertEqual(transcriber.partial_text(), "今天天气怎么样")
+
+    def test_revision_not_committed(self):
+        """测试后一次解码改了的词不确认，末尾 commit_margin 内的词也不确认"""
+        transcriber = self.make([
+            [(0.0, 0.3, "今天"), (0.3, 0.6, "天汽")],
+            [(0.0, 0.3, "今天"), (0.3, 0.6, "天气"), (0.6, 1.2, "怎么样")],
+            [(0.0, 0.3, "天气"), (0.3, 2.3, "怎么样")],
+        ])
+        self.feed(transcriber, 1.0)
+        self.feed(transcriber, 1.0)
+        self.assertEqual(transcriber.partial_text(), "今天")
+        self.feed(transcriber, 1.0)
+        # “天气”两次一致而确认；“怎么样”也一致，但结束于 2.6s，落在末尾 0.5s 内，暂不确认
+        self.assertEqual(transcriber.partial_text(), "今天天气")
+
+    def test_short_window_skipped(self):
+        """测试新增语音不足一个窗口时不解码"""
+        transcriber = self.make([])
+        self.feed(transcriber, 0.5)
+        self.feed(transcriber, 0.4)
+        self.assertEqual(self.whisper.calls, [])
+
+    def test_end_segment(self):
+        """测试结束一句话时只解码剩余尾部，之后的音频进入新会话"""
+        transcriber = self.make([
+            [(0.0, 0.3, "你好")],
+            [(0.0, 0.3, "你好"), (0.3, 0.9, "小")],
+            [(0.0, 0.8, "小智")],
+        ])
+        self.feed(transcriber, 1.0)
+        self.feed(transcriber, 1.0)
+        self.feed(transcriber, 0.5)
+        session = transcriber.end_segment()
+        self.assertEqual(session.finish(), "你好小智")
+        self.assertEqual(self.whisper.calls[-1][0], 2200)  # 只解码 0.3s 之后的部分
+
+        self.assertEqual(transcriber.partial_text(), "")
+        self.assertIsNone(transcriber.end_segment())
+        self.feed(transcriber, 0.2)
+        self.assertIsNot(transcriber._session, session)
+
+    def test_restart_cancels_unfinished(self):
+        """测试上一句没结束就开始新一句时旧会话作废"""
+        transcriber = self.make([[(0.0, 0.3, "你好")]])
+        self.feed(transcriber, 0.5)
+        old = transcriber._session
+        self.feed(transcriber, 0.5, start=True)
+        self.assertTrue(old._cancelled)
+        self.assertIsNot(transcriber._session, old)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,85 @@
+import threading
+import time
+import unittest
+from types import SimpleNamespace
+from unittest.mock import patch
+import numpy as np
+from config.settings import STTConfig
+from stt.service import STTService
+from stt.whisper_stt import WhisperSTT
+
+
+class FakeModel:
+    """代替 WhisperModel：记录每次调用的线程与参数，可设定调用前等待的屏障或事件"""
+
+    def __init__(self, barrier=None, gate=None):
+        self.barrier = barrier
+        self.gate = gate
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def transcribe(self, audio, **kwargs):
+        with self._lock:
+            self.calls.append((threading.current_thread().name, audio, kwargs))
+        if self.barrier is not None:
+            self.barrier.wait(2)
+        if self.gate is not None:
+            self.gate.wait(2)
+        segment = SimpleNamespace(text=f"{len(audio)}", no_speech_prob=0.0, avg_logprob=-0.1)
+        return iter([segment]), None
+
+
+class TestSTTService(unittest.TestCase):
+
+    def make_service(self, model: FakeModel, **config) -> STTService:
+        with patch.object(WhisperSTT, "_initialize"):
+            service = STTService(STTConfig(**config))
+        service.stt.model = model
+        return service
+
+    def test_worker_fan_out(self):
+        """测试线程池模式下多句语音同时在不同线程上识别"""
+        model = FakeModel(barrier=threading.Barrier(3))
+        service = self.make_service(model, num_workers=3)
+        self.addCleanup(service.close)
+        futures = [service.submit(np.zeros(1600 * (i + 1), dtype=np.float32), source=f"房间{i}") for i in range(3)]
+        self.assertEqual([future.result(timeout=3) for future in futures], ["1600", "3200", "4800"])
+        self.assertEqual(len({name for name, _, _ in model.calls}), 3)
+        self.assertEqual(service.stats.completed, 3)
+        self.assertEqual(len(service.stats.sources), 3)
+
+    def test_submit_converts_int16(self):
+        """测试 int16 语音转为 [-1, 1] 的 float32，语音区间原样传给模型"""
+        model = FakeModel()
+        service = self.make_service(model, num_workers=1, vad_filter=False)
+        self.addCleanup(service.close)
+        audio = np.full(16000, 16384, dtype=np.int16)
+        service.submit(audio, clip_timestamps=[0.1, 0.5, 0.7, 0.9]).result(timeout=3)
+
+        _, decoded, kwargs = model.calls[0]
+        self.assertEqual(decoded.dtype, np.float32)
+        self.assertAlmostEqual(float(decoded.max()), 0.5)
+        self.assertEqual(kwargs["clip_timestamps"], [0.1, 0.5, 0.7, 0.9])
+
+    def test_close_with_pending(self):
+        """测试关闭时正在识别的句子正常完成，排队中的句子以异常结束，之后的提交直接失败"""
+        gate = threading.Event()
+        model = FakeModel(gate=gate)
+        service = self.make_service(model, num_workers=1)
+        futures = [service.submit(np.zeros(1600, dtype=np.float32)) for _ in range(3)]
+        while not model.calls:
+            time.sleep(0.01)  # 等第一句进入识别
+
+        threading.Timer(0.2, gate.set).start()
+        service.close()
+        self.assertEqual(futures[0].result(timeout=1), "1600")
+        for future in futures[1:]:
+            with self.assertRaisesRegex(RuntimeError, "已关闭"):
+                future.result(timeout=1)
+        self.assertEqual(len(model.calls), 1)
+        with self.assertRaisesRegex(RuntimeError, "已关闭"):
+            service.submit(np.zeros(1600, dtype=np.float32)).result(timeout=1)
+
+
+if __name__ == "__main__":
+    unittest.main()
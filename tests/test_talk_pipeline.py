@@ -0,0 +1,59 @@
+import asyncio
+import unittest
+import numpy as np
+from config.settings import PipelineConfig
+from pipeline.talk_pipeline import TalkPipeline
+
+
+class FakeRecorder:
+    """每次读取都返回一帧，process_frame 可按需失败"""
+
+    def __init__(self, fail_vad: bool = False):
+        self.fail_vad = fail_vad
+
+    def start(self):
+        pass
+
+    def reset(self):
+        pass
+
+    def read_frame(self, timeout: float):
+        return np.zeros(480, dtype=np.int16)
+
+    def process_frame(self, frame):
+        if self.fail_vad:
+            raise RuntimeError("VAD 模型崩溃")
+        return None
+
+
+class TestTalkPipeline(unittest.TestCase):
+
+    def make_pipeline(self, recorder: FakeRecorder) -> TalkPipeline:
+        return TalkPipeline(recorder, stt=None, tts_worker=None, on_text=lambda text: True, config=PipelineConfig())
+
+    def test_failing_stage_stops_pipeline(self):
+        """测试某个阶段异常退出时 run() 抛出该异常，而不是一直挂起"""
+        pipeline = self.make_pipeline(FakeRecorder(fail_vad=True))
+
+        async def run():
+            await asyncio.wait_for(pipeline.run(), timeout=3)
+
+        with self.assertRaisesRegex(RuntimeError, "VAD 模型崩溃"):
+            asyncio.run(run())
+
+    def test_stop_signal(self):
+        """测试收到结束信号时正常返回"""
+        pipeline = self.make_pipeline(FakeRecorder())
+
+        async def run():
+            task = asyncio.create_task(pipeline.run())
+            await asyncio.sleep(0.1)
+            pipeline._stopped.set()
+            await asyncio.wait_for(task, timeout=3)
+
+        asyncio.run(run())
+        self.assertGreater(pipeline.stats["vad"].processed, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,32 @@
+import unittest
+from utils.text_splitter import SentenceSplitter, IncrementalSentenceSplitter
+
+
+class TestIncrementalSentenceSplitter(unittest.TestCase):
+
+    def setUp(self):
+        self.splitter = IncrementalSentenceSplitter()
+
+    def test_emit_when_sentence_complete(self):
+        """测试句子完整后立即产出"""
+        self.assertEqual(self.splitter.feed("今天北京"), [])
+        self.assertEqual(self.splitter.feed("晴。明"), ["今天北京晴。"])
+        self.assertEqual(self.splitter.flush(), ["明"])
+
+    def test_consecutive_punctuation_across_chunks(self):
+        """测试跨片段的连续标点"""
+        self.assertEqual(self.splitter.feed("真的吗！"), [])
+        self.assertEqual(self.splitter.feed("？好"), ["真的吗！？"])
+
+    def test_same_result_as_split(self):
+        """测试逐字喂入与整段切分结果一致"""
+        text = "你好。今天天气晴，温度 20℃！还有什么需要？\n再见"
+        sentences = []
+        for ch in text:
+            sentences.extend(self.splitter.feed(ch))
+        sentences.extend(self.splitter.flush())
+        self.assertEqual(sentences, SentenceSplitter.split(text))
+
+
+if __name__ == "__main__":
+    unittest.main()
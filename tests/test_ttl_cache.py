@@ -0,0 +1,72 @@
+import threading
+import time
+import unittest
+from utils.ttl_cache import TTLCache
+from agent.get_weather import normalize_city
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestTTLCache(unittest.TestCase):
+
+    def test_expiry(self):
+        """测试条目过期后重新加载"""
+        clock = FakeClock()
+        cache = TTLCache(ttl=60, clock=clock)
+        cache.set("beijing", "晴")
+        self.assertEqual(cache.get("beijing"), "晴")
+        clock.now = 61
+        self.assertIsNone(cache.get("beijing"))
+
+    def test_lru_eviction(self):
+        """测试超出容量时淘汰最久未使用的条目"""
+        cache = TTLCache(ttl=60, max_entries=2)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+        self.assertEqual(cache.get("a"), 1)
+        self.assertIsNone(cache.get("b"))
+
+    def test_failures_not_cached(self):
+        """测试 should_cache 为 False 的结果不写入缓存"""
+        cache = TTLCache(ttl=60)
+        cache.get_or_load("x", lambda: "失败", should_cache=lambda value: value != "失败")
+        self.assertIsNone(cache.get("x"))
+
+    def test_single_flight(self):
+        """测试并发的相同查询只访问一次上游"""
+        cache = TTLCache(ttl=60)
+        calls = []
+
+        def loader():
+            calls.append(1)
+            time.sleep(0.1)
+            return "晴"
+
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(cache.get_or_load("beijing", loader)))
+                   for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, ["晴"] * 5)
+        self.assertEqual(cache.coalesced, 4)
+
+    def test_normalize_city(self):
+        """测试城市别名归一化"""
+        keys = {normalize_city(name) for name in ("北京", "北京市", "Beijing", " beijing ", "帝都")}
+        self.assertEqual(keys, {"beijing"})
+        self.assertEqual(normalize_city("Xi'an"), normalize_city("西安"))
+
+
+if __name__ == "__main__":
+    unittest.main()
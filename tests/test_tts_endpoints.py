@@ -0,0 +1,147 @@
+import os
+import shutil
+import tempfile
+import unittest
+from unittest.mock import patch
+import requests
+from config.settings import AudioCacheConfig, TTSConfig
+from tts.fish_speech_tts import FishSpeechTTS
+from utils.http_client import HttpClient
+
+
+class FakeResponse:
+    def __init__(self, url: str, status_code: int = 200):
+        self.url = url
+        self.status_code = status_code
+        self.content = url.encode()
+        self.text = "" if status_code == 200 else "error"
+        self.closed = False
+
+    def iter_content(self, chunk_size: int):
+        yield self.content
+
+    def close(self):
+        self.closed = True
+
+
+class FakeHttp:
+    """按 URL 模拟各端点：down 中的端点拒绝连接，broken 中的端点返回 500"""
+
+    def __init__(self, down=(), broken=()):
+        self.down = set(down)
+        self.broken = set(broken)
+        self.calls = []
+
+    def post(self, url: str, **kwargs):
+        self.calls.append(url)
+        if url in self.down:
+            raise requests.ConnectionError(f"{url} 拒绝连接")
+        return FakeResponse(url, 500 if url in self.broken else 200)
+
+
+class TestTTSEndpoints(unittest.TestCase):
+
+    def make_tts(self, http: FakeHttp, urls, cache_config: AudioCacheConfig = None) -> FishSpeechTTS:
+        config = TTSConfig(api_urls=list(urls), ref_audio_path="", streaming=True)
+        with patch.object(HttpClient, "shared", return_value=http):
+            return FishSpeechTTS(config, cache_config)
+
+    def test_spread_across_endpoints(self):
+        """测试并发的句子分到不同端点，结束后归还"""
+        tts = self.make_tts(FakeHttp(), ["a", "b"])
+        first = tts._post("一", streaming=True)
+        second = tts._post("二", streaming=True)
+        self.assertEqual({first.url, second.url}, {"a", "b"})
+        tts._release(first)
+        tts._release(second)
+        self.assertEqual([e.outstanding for e in tts.endpoints.backends], [0, 0])
+
+    def test_failover(self):
+        """测试端点返回 5xx 时转到下一个端点，失败计入该端点"""
+        http = FakeHttp(broken={"a"})
+        tts = self.make_tts(http, ["a", "b"])
+        http.calls.clear()
+        self.assertEqual(list(tts.synthesize_stream("你好")), [b"b"])
+        self.assertEqual(http.calls, ["a", "b"])
+        self.assertEqual(tts.endpoints.failovers, 1)
+        self.assertEqual(tts.endpoints.backends[0].errors, 1)
+
+    def test_unreachable_ejected(self):
+        """测试启动时连不上的端点被摘除，不再分到请求"""
+        tts = self.make_tts(FakeHttp(down={"a"}), ["a", "b"])
+        self.assertTrue(tts.is_ready())
+        self.assertEqual(tts.endpoints.healthy_count(), 1)
+        self.assertEqual(tts.synthesize("你好"), b"b")
+
+    def test_reference_fallback_only_on_reference_errors(self):
+        """测试临时的 500 不会永久改为内联参考音频，明确指向参考音频的 404 才会"""
+        tts = self.make_tts(FakeHttp(), ["a"])
+        tts._reference_ids["a"] = "dz"
+        self.assertFalse(tts._fallback_to_inline_reference(FakeResponse("a", 500), "a"))
+        self.assertFalse(tts._fallback_to_inline_reference(FakeResponse("a", 422), "a"))
+        self.assertEqual(tts._reference_ids["a"], "dz")
+
+        missing = FakeResponse("a", 404)
+        missing.text = "Reference dz not found"
+        self.assertTrue(tts._fallback_to_inline_reference(missing, "a"))
+        self.assertIsNone(tts._reference_ids["a"])
+
+    def test_register_reference_status(self):
+        """测试“已存在”视为注册成功，“不存在”之类的错误不算"""
+        http = FakeHttp()
+        tts = self.make_tts(http, ["a"])
+        for status, text, expected in ((409, "", True), (400, "Reference dz already exists", True),
+                                       (400, "Endpoint does not exist", False)):
+            response = FakeResponse("a", status)
+            response.text = text
+            http.post = lambda url, **kwargs: response
+            self.assertEqual(tts._register_reference("a", b"ref", ""), expected, text)
+
+    def test_reference_id_follows_content(self):
+        """测试注册的 ID 带参考音频内容的哈希：内容不变 ID 不变，换了参考音频就注册新 ID"""
+        path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, path, True)
+        audio_path = os.path.join(path, "ref.wav")
+        registered = []
+
+        class RecordingHttp(FakeHttp):
+            def post(self, url, **kwargs):
+                if url.endswith("/references/add"):
+                    registered.append(kwargs["data"]["id"])
+                    response = FakeResponse(url, 409)  # 服务端已存在同名 ID
+                    response.text = "already exists"
+                    return response
+                return super().post(url, **kwargs)
+
+        def make(audio: bytes, text: str) -> FishSpeechTTS:
+            with open(audio_path, "wb") as f:
+                f.write(audio)
+            config = TTSConfig(api_urls=["http://tts/v1/tts"], ref_audio_path=audio_path, ref_text=text)
+            with patch.object(HttpClient, "shared", return_value=RecordingHttp()):
+                return FishSpeechTTS(config)
+
+        first = make(b"voice-a", "大家好")
+        make(b"voice-a", "大家好")
+        make(b"voice-b", "大家好")
+        make(b"voice-a", "你好")
+        self.assertTrue(registered[0].startswith("dz-"))
+        self.assertEqual(registered[0], registered[1])
+        self.assertEqual(len(set(registered)), 3)
+        self.assertEqual(first._reference_ids["http://tts/v1/tts"], registered[0])
+
+    def test_cached_phrase_skips_network(self):
+        """测试预热过的短句直接从磁盘缓存播放，不再请求端点"""
+        path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, path, True)
+        http = FakeHttp()
+        tts = self.make_tts(http, ["a"], AudioCacheConfig(path=path))
+        self.assertEqual(tts.prewarm(["好的，再见。", "好的，再见。"]), 1)
+        self.assertTrue(tts.is_cached("好的，再见。"))
+        http.calls.clear()
+        self.assertEqual(list(tts.synthesize_stream("好的，再见。")), [b"a"])
+        self.assertEqual(http.calls, [])
+        self.assertEqual(tts.audio_cache.hits, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
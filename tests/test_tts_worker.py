@@ -0,0 +1,89 @@
+import threading
+import time
+import unittest
+from tts.fish_speech_tts import AsyncTTSWorker
+
+
+class FakeTTS:
+    """按句子设定合成耗时，记录播放顺序"""
+
+    def __init__(self, delays=None):
+        self.delays = delays or {}
+        self.played = []
+        self.started = threading.Event()
+        self.interrupted = 0
+
+    def synthesize_stream(self, text: str):
+        time.sleep(self.delays.get(text, 0.0))
+        yield text.encode()
+
+    def play_stream(self, chunks):
+        played = []
+        for chunk in chunks:
+            played.append(chunk)
+            self.started.set()
+        self.played.append(b"".join(played).decode())
+
+    def interrupt(self):
+        self.interrupted += 1
+
+
+class TestAsyncTTSWorker(unittest.TestCase):
+
+    def test_parallel_synthesis_keeps_order(self):
+        """测试多线程合成时仍按入队顺序播放"""
+        tts = FakeTTS({"一": 0.2, "二": 0.0, "三": 0.1})
+        worker = AsyncTTSWorker(tts, lookahead=3, synth_workers=3)
+        for text in ("一", "二", "三"):
+            worker.add_task(text)
+        worker.wait_complete()
+        worker.stop()
+        self.assertEqual(tts.played, ["一", "二", "三"])
+
+    def test_interrupt_drops_old_generation(self):
+        """测试插话后旧一轮剩下的句子不再播放，新一轮照常播放"""
+        tts = FakeTTS({"一": 0.2, "二": 0.2, "三": 0.2})
+        worker = AsyncTTSWorker(tts, lookahead=1, synth_workers=1)
+        generation = worker.generation
+        for text in ("一", "二", "三"):
+            worker.add_task(text, generation=generation)
+        tts.started.wait(2)
+        worker.interrupt()
+        worker.add_task("旧", generation=generation)
+        worker.add_task("新", generation=worker.generation)
+        worker.wait_complete()
+        worker.stop()
+        self.assertEqual(tts.played[0], "一")
+        self.assertEqual(tts.played[-1], "新")
+        self.assertNotIn("三", tts.played)
+        self.assertNotIn("旧", tts.played)
+        self.assertEqual(tts.interrupted, 1)
+
+    def test_stop_with_pending_jobs(self):
+        """测试还有句子排队合成时 stop() 立即返回，不会卡在被取消的句子上"""
+        tts = FakeTTS({"一": 0.3, "二": 0.3, "三": 0.3})
+        worker = AsyncTTSWorker(tts, lookahead=3, synth_workers=1)
+        for text in ("一", "二", "三"):
+            worker.add_task(text)
+        time.sleep(0.1)
+        started = time.perf_counter()
+        worker.stop()
+        self.assertLess(time.perf_counter() - started, 2.0)
+        self.assertFalse(worker.is_alive())
+
+        # 被取消的句子也已结束，等待其音频的一方不会永远阻塞
+        pending = []
+        while not worker._jobs.empty():
+            job = worker._jobs.get_nowait()
+            if job is not None:
+                pending.append(job)
+        self.assertTrue(pending)
+        for job in pending:
+            reader = threading.Thread(target=lambda job=job: list(job.iter_chunks()), daemon=True)
+            reader.start()
+            reader.join(1)
+            self.assertFalse(reader.is_alive(), job.text)
+
+
+if __name__ == "__main__":
+    unittest.main()
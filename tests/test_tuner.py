@@ -0,0 +1,31 @@
+import unittest
+from stt.tuner import TrialResult, character_error_rate, edit_distance, select_best
+
+
+class TestTuner(unittest.TestCase):
+
+    def test_edit_distance(self):
+        """测试字符级编辑距离"""
+        self.assertEqual(edit_distance("今天天气", "今天天气"), 0)
+        self.assertEqual(edit_distance("今天天气", "今天气"), 1)
+        self.assertEqual(edit_distance("", "你好"), 2)
+
+    def test_cer_ignores_punctuation(self):
+        """测试 CER 忽略标点和空白"""
+        self.assertEqual(character_error_rate(["今天天气怎么样？"], ["今天 天气怎么样"]), 0.0)
+        self.assertAlmostEqual(character_error_rate(["北京天气"], ["背景天气"]), 0.5)
+
+    def test_select_fastest_passing(self):
+        """测试选出满足目标的最快配置"""
+        results = [
+            TrialResult("small", "int8", 5, 0, cer=0.03, rtf=0.5, p95_latency=1.2, mean_latency=0.8),
+            TrialResult("base", "int8", 1, 0, cer=0.06, rtf=0.1, p95_latency=0.3, mean_latency=0.2),
+            TrialResult("tiny", "int8", 1, 0, cer=0.20, rtf=0.05, p95_latency=0.1, mean_latency=0.1),
+        ]
+        best = select_best(results, max_cer=0.1, max_p95=1.5)
+        self.assertEqual(best.model_path, "base")
+        self.assertIsNone(select_best(results, max_cer=0.01, max_p95=1.5))
+
+
+if __name__ == "__main__":
+    unittest.main()
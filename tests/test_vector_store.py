@@ -0,0 +1,96 @@
+import os
+import tempfile
+import unittest
+import numpy as np
+from config.settings import MemoryConfig
+from memory.embedder import HashingEmbedder
+from memory.long_term import LongTermMemory
+from memory.vector_store import VectorStore
+
+
+class TestVectorStore(unittest.TestCase):
+
+    def setUp(self):
+        self.embedder = HashingEmbedder(dim=128)
+        self.texts = ["用户住在杭州", "用户喜欢喝咖啡", "明天下午三点开会", "用户的猫叫小白"]
+
+    def _fill(self, store):
+        store.add(self.embedder.embed_batch(self.texts), [{"text": text} for text in self.texts])
+
+    def test_search_and_reopen(self):
+        """测试检索最相关条目，重新打开后无需重建"""
+        with tempfile.TemporaryDirectory() as path:
+            store = VectorStore(path, dim=128)
+            self._fill(store)
+            store.close()
+
+            store = VectorStore(path, dim=128)
+            self.assertEqual(len(store), 4)
+            score, item = store.search(self.embedder.embed("我住在哪个城市，杭州吗"), top_k=1)[0]
+            self.assertEqual(item["text"], "用户住在杭州")
+            self.assertGreater(score, 0.1)
+            store.close()
+
+    def test_int8_matches_float32(self):
+        """测试 int8 存储的排序与 float32 一致"""
+        query = self.embedder.embed("小白是谁的猫")
+        with tempfile.TemporaryDirectory() as f32_path, tempfile.TemporaryDirectory() as i8_path:
+            stores = [VectorStore(f32_path, dim=128), VectorStore(i8_path, dim=128, dtype="int8")]
+            rankings = []
+            for store in stores:
+                self._fill(store)
+                rankings.append([item["text"] for _, item in store.search(query, top_k=2)])
+                store.close()
+            self.assertEqual(rankings[0], rankings[1])
+
+    def test_grows_beyond_capacity(self):
+        """测试超出预分配容量时自动扩容"""
+        with tempfile.TemporaryDirectory() as path:
+            store = VectorStore(path, dim=8)
+            count = VectorStore.INITIAL_CAPACITY + 10
+            vectors = np.eye(8, dtype=np.float32)[np.arange(count) % 8]
+            store.add(vectors, [{"i": i} for i in range(count)])
+            self.assertEqual(len(store), count)
+            self.assertEqual(store.search(np.eye(8, dtype=np.float32)[3], top_k=1)[0][0], 1.0)
+            store.close()
+
+    def test_partial_trailing_line(self):
+        """测试中途退出留下的半行在重新打开时截掉，之后追加的条目可以正常检索"""
+        with tempfile.TemporaryDirectory() as path:
+            store = VectorStore(path, dim=128)
+            self._fill(store)
+            store.close()
+            with open(os.path.join(path, "meta.jsonl"), "ab") as f:
+                f.write(b'{"text": "\xe5\x86\x99\xe4')  # 写到一半
+
+            store = VectorStore(path, dim=128)
+            self.assertEqual(len(store), 4)
+            store.add(self.embedder.embed("用户的狗叫大黄"), [{"text": "用户的狗叫大黄"}])
+            store.close()
+
+            store = VectorStore(path, dim=128)
+            self.assertEqual(len(store), 5)
+            texts = [item["text"] for _, item in store.search(self.embedder.embed("狗叫什么"), top_k=5)]
+            self.assertEqual(len(texts), 5)
+            self.assertIn("用户的狗叫大黄", texts)
+            store.close()
+
+
+class TestLongTermMemory(unittest.TestCase):
+
+    def test_reopen_with_different_dim(self):
+        """测试改了配置的维度后沿用已有向量库的维度，检索和写入照常"""
+        with tempfile.TemporaryDirectory() as path:
+            memory = LongTermMemory(MemoryConfig(path=path, dim=256))
+            memory.remember("用户住在杭州")
+            memory.close()
+
+            memory = LongTermMemory(MemoryConfig(path=path, dim=512))
+            self.assertEqual(memory.embedder.dim, 256)
+            memory.remember("用户喜欢喝咖啡")
+            self.assertEqual(memory.search("我住在哪，杭州吗")[0][1]["text"], "用户住在杭州")
+            memory.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,63 @@
+import threading
+import time
+import unittest
+from agent.get_weather import WeatherBatchTool, WeatherTool
+from config.settings import WeatherConfig
+
+
+class TestWeatherBatchTool(unittest.TestCase):
+
+    def setUp(self):
+        self.weather = WeatherTool(weather_config=WeatherConfig(batch_timeout=0.5, batch_workers=3))
+        self.release = threading.Event()  # “慢城”的请求一直挂着，直到测试结束
+        self.addCleanup(self.release.set)
+        self.barrier = None
+        self.delays = {}
+
+        def fetch(city):
+            if city == "慢城":
+                self.release.wait(5)
+            elif city in self.delays:
+                time.sleep(self.delays[city])
+            elif self.barrier is not None:
+                self.barrier.wait(2)  # 所有城市同时在查询才能通过
+            return f"{city}当前天气：晴，温度：20℃。"
+
+        self.weather._fetch = fetch
+        self.batch = WeatherBatchTool(self.weather)
+
+    def test_concurrent_in_order(self):
+        """测试多城市并发查询且结果保持输入顺序"""
+        self.barrier = threading.Barrier(3)
+        results = self.batch(["北京", "上海", "广州"])
+        self.assertFalse(self.barrier.broken)
+        self.assertEqual([result[:2] for result in results], ["北京", "上海", "广州"])
+
+    def test_per_call_timeout(self):
+        """测试单个城市超时不拖慢其余结果"""
+        results = self.batch(["慢城", "北京"])
+        self.assertEqual(results[0], "慢城天气查询超时")
+        self.assertTrue(results[1].startswith("北京当前天气"))
+
+    def test_timeout_does_not_starve_later_calls(self):
+        """测试超时的请求仍挂着时，之后的查询不会因为线程被占满而超时"""
+        self.weather.wea_config.batch_workers = 1
+        batch = WeatherBatchTool(self.weather)
+        self.assertEqual(batch(["慢城"]), ["慢城天气查询超时"])
+        self.assertTrue(batch(["北京"])[0].startswith("北京当前天气"))
+
+    def test_queued_city_gets_full_timeout(self):
+        """测试排队的城市从开始查询时计时，不会因为前面的城市用掉了时间而超时"""
+        self.weather.wea_config.batch_workers = 1
+        batch = WeatherBatchTool(self.weather)
+        self.delays = {"北京": 0.3, "上海": 0.3}
+        self.assertEqual([result[:2] for result in batch(["北京", "上海"])], ["北京", "上海"])
+
+        # 前面的城市超时后不再占用并发数，后面的城市照常查询
+        results = batch(["慢城", "广州"])
+        self.assertEqual(results[0], "慢城天气查询超时")
+        self.assertTrue(results[1].startswith("广州当前天气"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,176 @@
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+from config.settings import AudioCacheConfig
+
+_SUFFIX = ".audio"
+
+
+def voice_hash(reference_audio: bytes, reference_text: str, reference_id: str = "",
+               params: Optional[Dict[str, Any]] = None) -> str:
+    """
+    音色标识：影响合成结果的所有输入的哈希，其中任何一项变了旧缓存自然失效
+
+    Args:
+        reference_audio: 参考音频内容（为空即服务端默认音色或已注册的音色）
+        reference_text: 参考音频对应的文字
+        reference_id: 服务端注册的参考音频 ID（服务端可能换了同名 ID 背后的音频）
+        params: 每次请求固定附带的合成参数（格式等）
+    """
+    digest = hashlib.sha256(reference_audio)
+    for part in (reference_text, reference_id, json.dumps(params or {}, sort_keys=True)):
+        digest.update(b"\0")
+        digest.update(part.encode("utf-8"))
+    return digest.hexdigest()[:16]
+
+
+class AudioCache:
+    """
+    合成音频的磁盘缓存（内容寻址）
+
+    键为 sha256(音色, 格式, 文本)，每条音频存成 <目录>/<键前两位>/<键>.audio 一个文件。
+    启动时扫描目录、按修改时间重建 LRU 顺序；命中时刷新修改时间，
+    总大小超过上限时删除最久未用的文件。
+    """
+
+    def __init__(self, config: AudioCacheConfig, voice: str):
+        """
+        Args:
+            config: 缓存配置
+            voice: 音色标识（见 voice_hash），不同音色的音频互不复用
+        """
+        self.config = config
+        self.voice = voice
+        self._entries: "OrderedDict[str, int]" = OrderedDict()  # 键 → 文件大小，最久未用的在前
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+        self.bytes_saved = 0
+        self._load_index()
+
+    def _load_index(self):
+        """扫描缓存目录，清理写了一半的临时文件"""
+        os.makedirs(self.config.path, exist_ok=True)
+        found = []
+        for root, _, files in os.walk(self.config.path):
+            for name in files:
+                path = os.path.join(root, name)
+                try:
+                    if not name.endswith(_SUFFIX):
+                        if ".tmp" in name:
+                            os.remove(path)
+                        continue
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                found.append((stat.st_mtime, name[:-len(_SUFFIX)], stat.st_size))
+        for _, key, size in sorted(found):
+            self._entries[key] = size
+            self._bytes += size
+        with self._lock:
+            self._evict_locked()
+        if found:
+            print(f"[TTS缓存] 已加载 {len(self._entries)} 条音频, {self._bytes / 1024 / 1024:.1f}MB")
+
+    def key(self, text: str, fmt: str) -> str:
+        return hashlib.sha256(f"{self.voice}\0{fmt}\0{text.strip()}".encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.config.path, key[:2], key + _SUFFIX)
+
+    def cacheable(self, text: str) -> bool:
+        """只缓存短句，长句几乎不会原样重复"""
+        return 0 < len(text.strip()) <= self.config.max_text_chars
+
+    def contains(self, text: str, fmt: str) -> bool:
+        """是否已缓存（不计入命中统计）"""
+        with self._lock:
+            return self.key(text, fmt) in self._entries
+
+    def get(self, text: str, fmt: str) -> Optional[bytes]:
+        """读取缓存的音频，未命中返回 None"""
+        if not self.cacheable(text):
+            return None
+        key = self.key(text, fmt)
+        with self._lock:
+            if key not in self._entries:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                audio = f.read()
+            os.utime(path)  # 修改时间即最近使用时间，重启后据此恢复 LRU 顺序
+        except OSError:
+            # 文件被外部删除
+            with self._lock:
+                self._bytes -= self._entries.pop(key, 0)
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+            self.bytes_saved += len(audio)
+        return audio
+
+    def put(self, text: str, fmt: str, audio: bytes):
+        """写入一条音频（先写临时文件再改名，进程中途退出也不会留下残缺的音频）"""
+        if not audio or not self.cacheable(text) or len(audio) > self.config.max_bytes:
+            return
+        key = self.key(text, fmt)
+        path = self._path(key)
+        tmp = f"{path}.tmp{threading.get_ident()}"
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(tmp, "wb") as f:
+                f.write(audio)
+            os.replace(tmp, path)
+        except OSError as e:
+            print(f"[TTS缓存警告] 写入失败: {e}")
+            return
+        with self._lock:
+            self._bytes += len(audio) - self._entries.pop(key, 0)
+            self._entries[key] = len(audio)
+            self.stores += 1
+            self._evict_locked()
+
+    def _evict_locked(self):
+        while self._bytes > self.config.max_bytes and self._entries:
+            key, size = self._entries.popitem(last=False)
+            self._bytes -= size
+            self.evictions += 1
+            try:
+                os.remove(self._path(key))
+            except OSError:
+                pass
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def summary(self) -> str:
+        with self._lock:
+            total = self.hits + self.misses
+            ratio = self.hits / total * 100 if total else 0.0
+            return (f"命中 {self.hits}, 未命中 {self.misses} (命中率 {ratio:.0f}%), "
+                    f"省去合成 {self.bytes_saved / 1024:.0f}KB, 写入 {self.stores}, 淘汰 {self.evictions}, "
+                    f"条目 {len(self._entries)}, 占用 {self._bytes / 1024 / 1024:.1f}MB")
+
+
+def prewarm_phrases(config: AudioCacheConfig) -> List[str]:
+    """需要预热的短句：配置里的短句、过渡语，以及 prewarm_path 文件中的每一行（去重，保持顺序）"""
+    phrases = list(config.prewarm_phrases)
+    if config.filler:
+        phrases.append(config.filler)
+    if config.prewarm_path:
+        try:
+            with open(config.prewarm_path, "r", encoding="utf-8") as f:
+                phrases.extend(f)
+        except OSError as e:
+            print(f"[TTS缓存警告] 读取预热短句失败: {e}")
+    return [phrase for phrase in dict.fromkeys(p.strip() for p in phrases) if phrase]
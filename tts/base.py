@@ -1,4 +1,5 @@
 from abc import ABC, abstractmethod
+from typing import Iterable, Iterator
 
 
 class BaseTTS(ABC):
@@ -17,6 +18,20 @@ class BaseTTS(ABC):
         """
         pass
 
+    def synthesize_stream(self, text: str) -> Iterator[bytes]:
+        """
+        流式合成语音
+
+        Args:
+            text: 要合成的文本
+
+        Returns:
+            依次到达的音频字节块，默认整段返回
+        """
+        audio_data = self.synthesize(text)
+        if audio_data:
+            yield audio_data
+
     @abstractmethod
     def speak(self, text: str):
         """
@@ -27,6 +42,20 @@ class BaseTTS(ABC):
         """
         pass
 
+    @abstractmethod
+    def play_stream(self, chunks: Iterable[bytes]):
+        """
+        播放依次到达的音频块
+
+        Args:
+            chunks: 音频字节块
+        """
+        pass
+
+    def interrupt(self):
+        """中断正在进行的合成与播放（插话时调用）"""
+        pass
+
     @abstractmethod
     def is_ready(self) -> bool:
         """检查TTS是否就绪"""
@@ -1,137 +1,639 @@
 import queue
+import re
 import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import AsyncIterator, Callable, Dict, Iterable, Iterator, Optional, Tuple
 import time
 import requests
+from .audio_cache import AudioCache, voice_hash
 from .base import BaseTTS
 from .player import AudioPlayer
-from config.settings import TTSConfig
+from config.settings import AudioCacheConfig, TTSConfig
+from utils.backend_pool import Backend, BackendPool
+from utils.http_client import AsyncHttpClient, HttpClient
 import ormsgpack  # 必须引入这个库
 import os
 
+
+_ALREADY_EXISTS = re.compile(r"already exists?|已存在", re.IGNORECASE)
+
+
+def _msgpack_map_header(size: int) -> bytes:
+    """msgpack map 头（map 本体就是键值对依次拼接）"""
+    if size < 16:
+        return bytes([0x80 | size])
+    return b"\xde" + size.to_bytes(2, "big")
+
+
 class FishSpeechTTS(BaseTTS):
-    """Fish Speech TTS 实现"""
+    """
+    Fish Speech TTS 实现
+
+    可以配置多个端点（api_urls）：每句话交给排队最少的健康端点，连续失败的端点暂时摘除，
+    请求失败且尚未产出音频时转到下一个端点。配合 AsyncTTSWorker 的多线程合成，
+    同一回答的多句话在各端点上并行合成、按顺序播放。
+    配置了 cache_config 时，短句的合成结果存入磁盘缓存，再次出现时不请求服务端。
+    """
 
-    def __init__(self, config: TTSConfig):
+    # 每次请求固定附带的合成参数，也计入音频缓存的音色标识
+    # 流式模式下服务端只支持 wav：先返回一个 WAV 头，之后是连续的 PCM 块
+    SYNTH_PARAMS = {"format": "wav"}
+
+    def __init__(self, config: TTSConfig, cache_config: Optional[AudioCacheConfig] = None):
         self.config = config
         self.player = AudioPlayer()
+        # 共享连接池：每句话复用到 TTS 服务的长连接，省去 TCP 握手
+        self.http = HttpClient.shared()
+        self.endpoints = BackendPool(
+            config.api_urls or [config.api_url],
+            eject_failures=config.endpoint_eject_failures,
+            eject_seconds=config.endpoint_eject_seconds,
+            name="TTS端点"
+        )
         self._ready = self._check_connection()
 
+        # 参考音频只在启动时准备一次；已注册的端点只传 reference_id
+        self._reference_ids: Dict[str, Optional[str]] = {}
+        self._reference_id = ""  # 注册用的 ID：配置的前缀 + 参考音频与文本的哈希
+        self._reference_audio = b""
+        self._reference_packed = b""
+        self._prepare_reference()
+
+        self.audio_cache = None
+        if cache_config is not None and cache_config.enabled:
+            ref_text = self.config.ref_text if self._reference_audio else ""
+            voice = voice_hash(self._reference_audio, ref_text, self._reference_id, self.SYNTH_PARAMS)
+            self.audio_cache = AudioCache(cache_config, voice)
+
+        # 进行中的合成请求，插话时统一关闭
+        self._inflight = set()
+        self._inflight_lock = threading.Lock()
+        # 请求 → (端点, 开始时间)，释放时归还端点
+        self._requests: Dict[int, Tuple[Backend, float]] = {}
+
     def _check_connection(self) -> bool:
-        """检查服务连接"""
-        try:
-            # 只尝试实际的TTS端点
-            response = requests.post(
-                self.config.api_url,
-                json={"text": "test"},
-                timeout=3
-            )
-            print(f"[TTS] Fish Speech连接成功")
-            return True
-        except Exception as e:
-            print(f"[TTS警告] 无法连接到 {self.config.api_url}: {e}")
-            return False
+        """检查各端点连接，连不上的端点先摘除，至少一个可用即就绪"""
+        ready = False
+        for endpoint in self.endpoints.backends:
+            try:
+                # 只尝试实际的TTS端点
+                self.http.post(endpoint.url, json={"text": "test"}, timeout=3)
+                print(f"[TTS] Fish Speech连接成功: {endpoint.url}")
+                ready = True
+            except Exception as e:
+                print(f"[TTS警告] 无法连接到 {endpoint.url}: {e}")
+                if len(self.endpoints) > 1:
+                    self.endpoints.eject(endpoint, "启动时无法连接")
+        return ready
 
-    def synthesize(self, text: str) -> bytes:
-        """合成语音"""
-        if not text.strip():
-            return b""
+    def _prepare_reference(self):
+        """
+        准备参考音频
 
-        # 1. 读取参考音频数据 (如果配置了路径)
-        ref_audio_bytes = b""
+        优先在每个端点上注册一次，之后只传 reference_id；
+        不支持注册的端点改为内联发送，参考音频常驻内存并预先打包好 msgpack 片段。
+        注册的 ID 带上参考音频与文本的哈希：换了参考音频就是新 ID，服务端不会沿用同名的旧音色。
+        """
         if hasattr(self.config, 'ref_audio_path') and self.config.ref_audio_path:
             if os.path.exists(self.config.ref_audio_path):
                 try:
                     with open(self.config.ref_audio_path, "rb") as f:
-                        ref_audio_bytes = f.read()
+                        self._reference_audio = f.read()
                 except Exception as e:
                     print(f"[TTS警告] 读取参考音频失败: {e}")
             else:
                 print(f"[TTS警告] 参考音频文件不存在: {self.config.ref_audio_path}")
 
-        # 2. 构造请求 Payload (符合 Fish Speech 标准格式)
-        # 注意：这里构造的是一个字典，等下用 msgpack 打包
+        if not self._reference_audio:
+            return
+
+        ref_text = self.config.ref_text if hasattr(self.config, 'ref_text') else ""
+        if self.config.reference_id:
+            self._reference_id = f"{self.config.reference_id}-{voice_hash(self._reference_audio, ref_text)[:12]}"
+        self._reference_packed = ormsgpack.packb("references") + ormsgpack.packb([
+            {
+                "audio": self._reference_audio,  # 直接传 bytes
+                "text": ref_text
+            }
+        ])
+        for endpoint in self.endpoints.backends:
+            if self._ready and self._reference_id \
+                    and self._register_reference(endpoint.url, self._reference_audio, ref_text):
+                self._reference_ids[endpoint.url] = self._reference_id
+                print(f"[TTS] 参考音频已注册: {self._reference_id} ({endpoint.url})")
+            else:
+                print(f"[TTS] 参考音频将随请求内联发送 ({endpoint.url})")
+
+    def _reference_api_url(self, api_url: str) -> str:
+        """参考音频注册接口地址"""
+        if self.config.reference_api_url and len(self.endpoints) == 1:
+            return self.config.reference_api_url
+        return api_url.rsplit("/", 1)[0] + "/references/add"
+
+    def _register_reference(self, api_url: str, audio: bytes, text: str) -> bool:
+        """在服务端注册参考音频，已存在也视为成功（ID 含内容哈希，已存在即是同一份参考音频）"""
+        try:
+            response = self.http.post(
+                self._reference_api_url(api_url),
+                data={"id": self._reference_id, "text": text},
+                files={"audio": (os.path.basename(self.config.ref_audio_path), audio)},
+                timeout=self.config.timeout
+            )
+            if response.status_code == 200:
+                return True
+            # 同一 ID 已注册过：409，或部分版本返回 400 + “already exists”
+            if response.status_code == 409 or _ALREADY_EXISTS.search(response.text):
+                return True
+            print(f"[TTS警告] 服务端不支持注册参考音频 (HTTP {response.status_code})，改为内联发送")
+        except Exception as e:
+            print(f"[TTS警告] 注册参考音频失败: {e}")
+        return False
+
+    def _pack_request(self, text: str, streaming: bool, api_url: str) -> bytes:
+        """打包请求体 (符合 Fish Speech 标准格式)"""
         request_data = {
             "text": text,
-            "streaming": False,
-            "format": "wav",
+            "streaming": streaming,
+            **self.SYNTH_PARAMS,
         }
+        reference_id = self._reference_ids.get(api_url)
+        if reference_id:
+            request_data["reference_id"] = reference_id
+        inline = b"" if reference_id else self._reference_packed
 
-        # 如果有参考音频，塞进去
-        if ref_audio_bytes:
-            request_data["references"] = [
-                {
-                    "audio": ref_audio_bytes, # 直接传 bytes
-                    "text": self.config.ref_text if hasattr(self.config, 'ref_text') else ""
-                }
-            ]
+        # 使用 ormsgpack 进行打包 (这也是 Fish Speech 高效的原因)
+        # 参考音频部分已预先打包好，直接拼在 map 末尾，避免每次重新序列化 ~300KB 数据
+        size = len(request_data) + (1 if inline else 0)
+        body = [_msgpack_map_header(size)]
+        for key, value in request_data.items():
+            body.append(ormsgpack.packb(key))
+            body.append(ormsgpack.packb(value))
+        body.append(inline)
+        return b"".join(body)
 
-        try:
-            # 3. 使用 ormsgpack 进行打包 (这也是 Fish Speech 高效的原因)
+    def _fallback_to_inline_reference(self, response, api_url: str) -> bool:
+        """
+        端点找不到已注册的参考音频时，该端点切换为内联发送
+
+        只认明确指向参考音频的 4xx（服务端重启后注册丢失）；5xx 多半是临时故障，
+        交给端点池按失败处理，不能因此永久改为每次上传参考音频。
+        """
+        reference_id = self._reference_ids.get(api_url)
+        if not reference_id or response.status_code not in (400, 404, 422):
+            return False
+        detail = response.text.lower()
+        if "reference" not in detail and reference_id.lower() not in detail:
+            return False
+        print(f"[TTS警告] {api_url} 上的参考音频 {self._reference_ids[api_url]} 不可用，改为内联发送")
+        self._reference_ids[api_url] = None
+        return True
+
+    def _post(self, text: str, streaming: bool) -> requests.Response:
+        """
+        发送合成请求
+
+        选排队最少的健康端点；连接失败或 5xx 时记为该端点失败并换下一个端点，
+        已注册的参考音频失效时回退为内联发送并重试一次。
+        """
+        tried = []
+        while True:
+            endpoint = self.endpoints.acquire(exclude=tried)
+            if endpoint is None:
+                raise RuntimeError(f"所有 TTS 端点均不可用: {', '.join(tried)}")
+            tried.append(endpoint.url)
+            started = time.perf_counter()
+            try:
+                response = self._post_to(endpoint.url, text, streaming)
+            except requests.RequestException as e:
+                self.endpoints.release(endpoint)
+                self.endpoints.record_failure(endpoint, e)
+                continue
+            if response.status_code >= 500 and len(tried) < len(self.endpoints):
+                self.endpoints.release(endpoint)
+                self.endpoints.record_failure(endpoint, RuntimeError(f"HTTP {response.status_code}"))
+                response.close()
+                continue
+            if len(tried) > 1:
+                self.endpoints.record_failover()
+            with self._inflight_lock:
+                self._inflight.add(response)
+                self._requests[id(response)] = (endpoint, started)
+            return response
+
+    def _post_to(self, api_url: str, text: str, streaming: bool) -> requests.Response:
+        response = None
+        for _ in range(2):
             # headers 必须改为 application/msgpack
-            response = requests.post(
-                self.config.api_url,
-                data=ormsgpack.packb(request_data),  # 使用 packb 打包二进制
+            response = self.http.post(
+                api_url,
+                data=self._pack_request(text, streaming, api_url),
                 headers={"Content-Type": "application/msgpack"},
-                timeout=self.config.timeout
+                timeout=self.config.timeout,
+                stream=True  # 始终按流读取响应体，插话时才能中途关闭连接
             )
+            if response.status_code == 200 or not self._fallback_to_inline_reference(response, api_url):
+                break
+            response.close()
+        return response
+
+    def _first_result(self, response: requests.Response):
+        """收到首块音频：记录该端点的延迟"""
+        with self._inflight_lock:
+            endpoint, started = self._requests.get(id(response), (None, 0.0))
+        if endpoint is not None:
+            self.endpoints.record_success(endpoint, time.perf_counter() - started, stream=True)
+
+    def _release(self, response: requests.Response, error: Optional[BaseException] = None) -> bool:
+        """
+        结束一次请求，归还端点
 
+        Args:
+            error: 非插话导致的失败，计入该端点的失败次数
+
+        Returns:
+            False 表示请求已被 interrupt() 取消
+        """
+        with self._inflight_lock:
+            active = response in self._inflight
+            self._inflight.discard(response)
+            endpoint, _ = self._requests.pop(id(response), (None, 0.0))
+        response.close()
+        if endpoint is not None:
+            self.endpoints.release(endpoint)
+            if error is not None and active:
+                self.endpoints.record_failure(endpoint, error)
+        return active
+
+    def synthesize(self, text: str) -> bytes:
+        """合成语音"""
+        if not text.strip():
+            return b""
+        cached = self._cached(text, streaming=False)
+        if cached is not None:
+            return cached
+
+        try:
+            response = self._post(text, streaming=False)
+        except Exception as e:
+            print(f"[TTS错误] {type(e).__name__}: {e}")
+            return b""
+
+        error = None
+        try:
             if response.status_code == 200:
-                return response.content
+                content = response.content
+                self._first_result(response)
+                self._store(text, False, content)
+                return content
             else:
                 print(f"[TTS错误] HTTP {response.status_code}: {response.text}")
+                error = RuntimeError(f"HTTP {response.status_code}")
                 return b""
         except Exception as e:
-            print(f"[TTS错误] {type(e).__name__}: {e}")
+            error = e
+            if response in self._inflight:
+                print(f"[TTS错误] {type(e).__name__}: {e}")
             return b""
+        finally:
+            self._release(response, error)
+
+    def synthesize_stream(self, text: str) -> Iterator[bytes]:
+        """流式合成：服务端每生成一段音频就立即产出"""
+        if not text.strip():
+            return
+        if not self.config.streaming:
+            yield from super().synthesize_stream(text)
+            return
+        cached = self._cached(text, streaming=True)
+        if cached is not None:
+            yield cached
+            return
+
+        try:
+            response = self._post(text, streaming=True)
+        except Exception as e:
+            print(f"[TTS错误] {type(e).__name__}: {e}")
+            return
+
+        error = None
+        complete = False
+        # 短句边播边攒下完整音频，正常结束后写入缓存
+        chunks = [] if self._should_store(text) else None
+        try:
+            if response.status_code != 200:
+                print(f"[TTS错误] HTTP {response.status_code}: {response.text}")
+                error = RuntimeError(f"HTTP {response.status_code}")
+                return
+            first = True
+            for chunk in response.iter_content(chunk_size=self.config.stream_chunk_size):
+                if chunk:
+                    if first:
+                        self._first_result(response)
+                        first = False
+                    if chunks is not None:
+                        chunks.append(chunk)
+                    yield chunk
+            complete = True
+        except Exception as e:
+            error = e
+            if response in self._inflight:
+                print(f"[TTS错误] {type(e).__name__}: {e}")
+        finally:
+            # 被打断、出错或调用方中途放弃的音频不完整，不缓存
+            if self._release(response, error) and complete and chunks:
+                self._store(text, True, b"".join(chunks))
+
+    async def synthesize_stream_async(self, text: str, client: AsyncHttpClient) -> AsyncIterator[bytes]:
+        """asyncio 版流式合成，供 asyncio 流水线直接 await，不占用合成线程"""
+        if not text.strip():
+            return
+        cached = self._cached(text, streaming=self.config.streaming)
+        if cached is not None:
+            yield cached
+            return
+        chunks = [] if self._should_store(text) else None
+        tried = []
+        while True:
+            endpoint = self.endpoints.acquire(exclude=tried)
+            if endpoint is None:
+                print(f"[TTS错误] 所有 TTS 端点均不可用: {', '.join(tried)}")
+                return
+            tried.append(endpoint.url)
+            started = time.perf_counter()
+            produced = False
+            try:
+                async for chunk in client.stream(
+                        "POST",
+                        endpoint.url,
+                        chunk_size=self.config.stream_chunk_size,
+                        data=self._pack_request(text, self.config.streaming, endpoint.url),
+                        headers={"Content-Type": "application/msgpack"}
+                ):
+                    if chunk:
+                        if not produced:
+                            self.endpoints.record_success(endpoint, time.perf_counter() - started, stream=True)
+                            produced = True
+                        if chunks is not None:
+                            chunks.append(chunk)
+                        yield chunk
+                if chunks:
+                    self._store(text, self.config.streaming, b"".join(chunks))
+                return
+            except Exception as e:
+                self.endpoints.record_failure(endpoint, e)
+                print(f"[TTS错误] {type(e).__name__}: {e}")
+                if produced:
+                    return  # 已经产出部分音频，换端点会重复播放
+            finally:
+                self.endpoints.release(endpoint)
+
+    @staticmethod
+    def _cache_format(streaming: bool) -> str:
+        # 流式响应的 WAV 头不带长度，与整段合成的文件不能混用
+        return "wav-stream" if streaming else "wav"
+
+    def _cached(self, text: str, streaming: bool) -> Optional[bytes]:
+        if self.audio_cache is None:
+            return None
+        return self.audio_cache.get(text, self._cache_format(streaming))
+
+    def _should_store(self, text: str) -> bool:
+        return self.audio_cache is not None and self.audio_cache.cacheable(text)
+
+    def _store(self, text: str, streaming: bool, audio: bytes):
+        if self.audio_cache is not None:
+            self.audio_cache.put(text, self._cache_format(streaming), audio)
+
+    def is_cached(self, text: str) -> bool:
+        """按当前合成方式是否已有缓存的音频（可以不经网络立即播放）"""
+        return self.audio_cache is not None \
+            and self.audio_cache.contains(text, self._cache_format(self.config.streaming))
+
+    def prewarm(self, phrases: Iterable[str]) -> int:
+        """
+        预先合成常用短句写入磁盘缓存
+
+        Returns:
+            本次新合成的句数（已缓存的跳过）
+        """
+        if self.audio_cache is None or not self._ready:
+            return 0
+        synthesized = 0
+        for phrase in dict.fromkeys(p.strip() for p in phrases):
+            if not self.audio_cache.cacheable(phrase) or self.is_cached(phrase):
+                continue
+            for _ in self.synthesize_stream(phrase):
+                pass
+            synthesized += int(self.is_cached(phrase))
+        return synthesized
 
     def speak(self, text: str):
         """合成并播放"""
-        audio_data = self.synthesize(text)
-        if audio_data:
-            self.player.play(audio_data)
+        # 流式模式下收到第一块音频就开始播放
+        self.play_stream(self.synthesize_stream(text))
+
+    def play_stream(self, chunks: Iterable[bytes]):
+        """播放依次到达的音频块"""
+        self.player.play_stream(chunks)
+
+    def interrupt(self):
+        """停止播放并中止所有进行中的合成请求"""
+        self.player.interrupt()
+        with self._inflight_lock:
+            responses = list(self._inflight)
+            self._inflight.clear()
+        for response in responses:
+            try:
+                response.close()
+            except Exception:
+                pass
 
     def is_ready(self) -> bool:
         return self._ready
 
 
+class _SynthesisJob:
+    """一句话的合成任务：合成阶段写入音频块，播放阶段按顺序取出"""
+
+    def __init__(
+            self,
+            text: str,
+            generation: int,
+            audio: Optional[bytes] = None,
+            on_audio: Optional[Callable[[bytes], None]] = None
+    ):
+        self.text = text
+        self.generation = generation
+        self.audio = audio  # 已合成好的音频（来自回答缓存），有则跳过合成
+        self.on_audio = on_audio  # 完整合成后回调整句音频
+        self._chunks: "queue.Queue[Optional[bytes]]" = queue.Queue()
+
+    def put(self, chunk: bytes):
+        self._chunks.put(chunk)
+
+    def finish(self):
+        self._chunks.put(None)
+
+    def iter_chunks(self) -> Iterator[bytes]:
+        """阻塞地依次取出音频块，合成结束时返回"""
+        while True:
+            chunk = self._chunks.get()
+            if chunk is None:
+                return
+            yield chunk
+
+
 class AsyncTTSWorker(threading.Thread):
-    """异步TTS播放队列"""
+    """
+    异步TTS播放队列
 
-    def __init__(self, tts: BaseTTS):
+    分为两个阶段：合成阶段最多提前 lookahead 句开始合成（可多线程并行），
+    播放阶段（本线程）严格按入队顺序播放，播放第 N 句时第 N+1 句已在合成。
+    用户插话时 interrupt() 使当前这一代句子全部作废。
+    """
+
+    def __init__(self, tts: BaseTTS, lookahead: int = 2, synth_workers: int = 1):
         super().__init__()
         self.tts = tts
         self.queue = queue.Queue()
+        # 有界的待播放队列：满了之后合成阶段停止领取新句子
+        self._jobs: "queue.Queue[Optional[_SynthesisJob]]" = queue.Queue(maxsize=max(1, lookahead))
+        self._executor = ThreadPoolExecutor(max_workers=max(1, synth_workers), thread_name_prefix="tts-synth")
         self.daemon = True
         self._stop_event = threading.Event()
+        # 插话计数：每次打断加一，旧一代的句子不再合成和播放
+        self.generation = 0
+        self._dispatcher = threading.Thread(target=self._dispatch_loop, daemon=True)
+        self._dispatcher.start()
         self.start()
 
-    def add_task(self, text: str):
-        """添加播放任务"""
+    def add_task(
+            self,
+            text: str,
+            generation: Optional[int] = None,
+            audio: Optional[bytes] = None,
+            on_audio: Optional[Callable[[bytes], None]] = None
+    ):
+        """
+        添加播放任务
+
+        Args:
+            text: 要播放的句子
+            generation: 句子所属的轮次（取自 self.generation），已被打断的轮次直接丢弃
+            audio: 已合成好的音频，提供时直接播放
+            on_audio: 句子完整合成后以整句音频回调（被打断的不回调），用于缓存
+        """
+        if generation is not None and generation != self.generation:
+            return
         if text.strip():
-            self.queue.put(text)
+            self.queue.put((self.generation, text, audio, on_audio))
 
-    def run(self):
-        """工作线程"""
+    def _dispatch_loop(self):
+        """合成阶段：按顺序领取句子并提交合成"""
         while not self._stop_event.is_set():
             try:
                 text = self.queue.get(timeout=0.5)
-                if text is None:
-                    break
+            except queue.Empty:
+                continue
+            if text is None:
+                break
 
-                print(f"[TTS] 正在合成: {text[:50]}...")
-                self.tts.speak(text)
+            generation, text, audio, on_audio = text
+            if generation != self.generation:
                 self.queue.task_done()
+                continue
+
+            job = _SynthesisJob(text, generation, audio, on_audio)
+            # 先入播放队列再提交合成，保证播放顺序与入队顺序一致
+            self._jobs.put(job)
+            try:
+                future = self._executor.submit(self._synthesize, job)
+            except RuntimeError:
+                job.finish()  # 线程池已关闭
+                continue
+            # stop() 取消了还没开始的合成时也要结束该句，否则播放阶段会一直等它的音频
+            future.add_done_callback(lambda f, job=job: job.finish() if f.cancelled() else None)
+
+    def _synthesize(self, job: _SynthesisJob):
+        """在合成线程中执行，音频块边到边交给播放阶段"""
+        try:
+            if job.generation != self.generation:
+                return
+            if job.audio is not None:
+                print(f"[TTS] 复用缓存音频: {job.text[:50]}...")
+                job.put(job.audio)
+                return
+            print(f"[TTS] 正在合成: {job.text[:50]}...")
+            chunks = []
+            for chunk in self.tts.synthesize_stream(job.text):
+                if job.generation != self.generation:
+                    return
+                job.put(chunk)
+                chunks.append(chunk)
+            if job.on_audio is not None and chunks:
+                job.on_audio(b"".join(chunks))
+        except Exception as e:
+            print(f"[TTS Worker错误] {e}")
+        finally:
+            job.finish()
+
+    def run(self):
+        """播放阶段"""
+        while not self._stop_event.is_set():
+            try:
+                job = self._jobs.get(timeout=0.5)
             except queue.Empty:
                 continue
+            if job is None:
+                break
+            try:
+                if job.generation == self.generation:
+                    self.tts.play_stream(job.iter_chunks())
             except Exception as e:
                 print(f"[TTS Worker错误] {e}")
+            finally:
+                self.queue.task_done()
 
     def stop(self):
-        """停止工作线程"""
+        """停止工作线程（未开始合成的句子直接作废）"""
         self._stop_event.set()
         self.queue.put(None)
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        try:
+            self._jobs.put_nowait(None)  # 播放阶段空闲等待时立即退出
+        except queue.Full:
+            pass  # 队列满时播放阶段正在处理，播完当前句后会看到停止标志
         self.join(timeout=5)
+        if hasattr(self.tts, "player"):
+            self.tts.player.close()
+
+    def interrupt(self) -> bool:
+        """
+        插话打断：停止播放、清空待合成的句子并中止进行中的合成请求
+
+        Returns:
+            打断前是否有句子在合成或播放
+        """
+        was_busy = self.is_busy()
+        self.generation += 1
+
+        while True:
+            try:
+                item = self.queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                self.queue.put(None)  # 保留停止信号
+                break
+            self.queue.task_done()
+
+        self.tts.interrupt()
+        return was_busy
+
+    def is_busy(self) -> bool:
+        """是否还有未播放完的句子"""
+        return self.queue.unfinished_tasks > 0
 
     def wait_complete(self):
         """等待所有任务完成"""
-        self.queue.join()
\ No newline at end of file
+        self.queue.join()
@@ -1,13 +1,64 @@
 import os
+import struct
 import tempfile
 import platform
+import threading
+from typing import Iterable, Optional, Tuple
+
+try:
+    import pyaudio
+except ImportError:  # 没有 PyAudio 时退回系统播放器
+    pyaudio = None
+
+
+def parse_wav_header(data: bytes) -> Optional[Tuple[int, int, int, int]]:
+    """
+    解析 WAV 头
+
+    流式返回的 WAV 头里 data 长度通常是 0，所以这里只认 data 块的起点，
+    之后到达的字节一律当作 PCM。
+
+    Returns:
+        (声道数, 采样率, 采样宽度字节数, PCM 起始偏移)，头还不完整时返回 None
+    """
+    if len(data) < 12:
+        return None
+    if data[:4] != b"RIFF" or data[8:12] != b"WAVE":
+        raise ValueError("不是有效的 WAV 数据")
+
+    fmt = None
+    offset = 12
+    while offset + 8 <= len(data):
+        chunk_id = data[offset:offset + 4]
+        chunk_size = struct.unpack("<I", data[offset + 4:offset + 8])[0]
+        body = offset + 8
+        if chunk_id == b"fmt ":
+            if body + 16 > len(data):
+                return None
+            _, channels, rate, _, _, bits = struct.unpack("<HHIIHH", data[body:body + 16])
+            fmt = (channels, rate, bits // 8)
+        elif chunk_id == b"data":
+            if fmt is None:
+                raise ValueError("WAV 缺少 fmt 块")
+            return fmt + (body,)
+        offset = body + chunk_size + (chunk_size & 1)
+    return None
 
 
 class AudioPlayer:
     """跨平台音频播放器"""
 
-    @staticmethod
-    def play(audio_data: bytes, format: str = "wav"):
+    WRITE_FRAMES = 2048  # 每次写入输出流的采样帧数
+
+    def __init__(self):
+        # 常驻输出流：格式不变时一直复用，避免每句话重新打开设备
+        self._pa = None
+        self._stream = None
+        self._stream_format: Optional[Tuple[int, int, int]] = None
+        self._lock = threading.Lock()
+        self._interrupted = threading.Event()
+
+    def play(self, audio_data: bytes, format: str = "wav"):
         """
         播放音频数据
 
@@ -15,6 +66,78 @@ class AudioPlayer:
             audio_data: 音频字节数据
             format: 音频格式
         """
+        if format == "wav" and pyaudio is not None:
+            self.play_stream([audio_data])
+        else:
+            self._play_with_system(audio_data, format)
+
+    def play_stream(self, chunks: Iterable[bytes]):
+        """
+        边收边播 WAV 字节流（WAV 头 + PCM）
+
+        Args:
+            chunks: 依次到达的字节块
+        """
+        if pyaudio is None:
+            self._play_with_system(b"".join(chunks), "wav")
+            return
+
+        self._interrupted.clear()
+        header = b""
+        frame_width = 0
+        pending = b""
+
+        for chunk in chunks:
+            if self._interrupted.is_set():
+                return
+            if not chunk:
+                continue
+            if not frame_width:
+                header += chunk
+                parsed = parse_wav_header(header)
+                if parsed is None:
+                    continue
+                channels, rate, width, data_offset = parsed
+                frame_width = channels * width
+                self._ensure_stream(channels, rate, width)
+                chunk = header[data_offset:]
+
+            # 只写入完整的采样帧，余下的字节留到下一块
+            pending += chunk
+            usable = len(pending) - len(pending) % frame_width
+            # 分小段写入，被打断时最多再播放一小段
+            slice_size = frame_width * self.WRITE_FRAMES
+            for start in range(0, usable, slice_size):
+                if self._interrupted.is_set():
+                    return
+                self._stream.write(pending[start:min(start + slice_size, usable)])
+            pending = pending[usable:]
+
+    def interrupt(self):
+        """立即停止当前播放"""
+        self._interrupted.set()
+
+    def _ensure_stream(self, channels: int, rate: int, width: int):
+        """按需打开（或在格式变化时重开）输出流"""
+        with self._lock:
+            if self._stream is not None and self._stream_format == (channels, rate, width):
+                return
+            if self._pa is None:
+                self._pa = pyaudio.PyAudio()
+            if self._stream is not None:
+                self._stream.stop_stream()
+                self._stream.close()
+            self._stream = self._pa.open(
+                format=self._pa.get_format_from_width(width),
+                channels=channels,
+                rate=rate,
+                output=True
+            )
+            self._stream_format = (channels, rate, width)
+
+    @staticmethod
+    def _play_with_system(audio_data: bytes, format: str = "wav"):
+        """写临时文件并调用系统播放器（无 PyAudio 时的兜底方案）"""
         # 创建临时文件
         with tempfile.NamedTemporaryFile(
                 suffix=f".{format}",
@@ -44,4 +167,19 @@ class AudioPlayer:
             try:
                 os.remove(temp_path)
             except:
-                pass
\ No newline at end of file
+                pass
+
+    def close(self):
+        """关闭输出流"""
+        with self._lock:
+            if self._stream is not None:
+                try:
+                    self._stream.stop_stream()
+                    self._stream.close()
+                except Exception as e:
+                    print(f"[播放器警告] 关闭输出流失败: {e}")
+                self._stream = None
+                self._stream_format = None
+            if self._pa is not None:
+                self._pa.terminate()
+                self._pa = None
@@ -0,0 +1,167 @@
+import threading
+import time
+from collections import deque
+from typing import Deque, Dict, Iterable, Optional
+import numpy as np
+
+
+class Backend:
+    """一个后端（服务端点）的状态"""
+
+    SMOOTHING = 0.2
+
+    def __init__(self, url: str):
+        self.url = url
+        self.outstanding = 0  # 进行中的请求数
+        self.latency: Optional[float] = None  # 首个结果（首 token / 首块音频）延迟的滑动平均
+        self.consecutive_failures = 0
+        self.ejected_until = 0.0  # 非 0 表示被摘除过且尚未恢复：未到期为摘除，到期后为半开
+        self.probing = False  # 半开状态下是否已有一个试探请求在路上
+        self.requests = 0
+        self.errors = 0
+
+    def state(self, now: float) -> str:
+        """healthy / ejected / half_open"""
+        if not self.ejected_until:
+            return "healthy"
+        return "ejected" if self.ejected_until > now else "half_open"
+
+    def summary(self) -> str:
+        latency = "未知" if self.latency is None else f"{self.latency * 1000:.0f}ms"
+        ejected = {"healthy": "", "ejected": ", 已摘除", "half_open": ", 半开"}[self.state(time.monotonic())]
+        return (f"{self.url}: {self.requests} 次请求, 进行中 {self.outstanding}, 错误 {self.errors}, "
+                f"首个结果平均 {latency}{ejected}")
+
+
+class BackendPool:
+    """
+    多后端的路由与健康状态
+
+    路由：在健康的后端中选进行中请求最少的，相同时选延迟低的。
+    健康：连续失败 eject_failures 次的后端摘除 eject_seconds，到期后进入半开状态：
+    同一时间只放行一个试探请求，成功才恢复，失败则立即重新摘除。
+    对冲等待时间取近期首个结果延迟的 p95。
+    """
+
+    WINDOW = 200  # 计算 p95 的样本窗口
+    MIN_SAMPLES = 20
+
+    def __init__(
+            self,
+            urls: Iterable[str],
+            eject_failures: int = 3,
+            eject_seconds: float = 30.0,
+            hedge_initial_delay: float = 2.0,
+            hedge_min_delay: float = 0.3,
+            name: str = "后端"
+    ):
+        """
+        Args:
+            urls: 后端地址，重复的只保留一个
+            name: 日志前缀
+        """
+        self.name = name
+        self.backends = [Backend(url) for url in dict.fromkeys(urls)]
+        if not self.backends:
+            raise ValueError("至少需要一个后端")
+        self.eject_failures = eject_failures
+        self.eject_seconds = eject_seconds
+        self.hedge_initial_delay = hedge_initial_delay
+        self.hedge_min_delay = hedge_min_delay
+        self._lock = threading.Lock()
+        # 流式与非流式的“首个结果”延迟分开统计
+        self._samples: Dict[bool, Deque[float]] = {True: deque(maxlen=self.WINDOW), False: deque(maxlen=self.WINDOW)}
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.failovers = 0
+
+    def __len__(self) -> int:
+        return len(self.backends)
+
+    def acquire(self, exclude: Iterable[str] = ()) -> Optional[Backend]:
+        """选一个后端并计入进行中请求，全部被排除时返回 None"""
+        exclude = set(exclude)
+        with self._lock:
+            candidates = [b for b in self.backends if b.url not in exclude]
+            if not candidates:
+                return None
+            now = time.monotonic()
+            available = [b for b in candidates if b.state(now) == "healthy"
+                         or (b.state(now) == "half_open" and not b.probing)]
+            if available:
+                backend = min(available, key=lambda b: (b.outstanding, b.latency or 0.0))
+            else:
+                # 全部摘除时试探最快恢复的那个，总比直接失败好
+                backend = min(candidates, key=lambda b: b.ejected_until)
+            if backend.state(now) != "healthy":
+                backend.probing = True
+            backend.outstanding += 1
+            backend.requests += 1
+            return backend
+
+    def release(self, backend: Backend):
+        with self._lock:
+            backend.outstanding -= 1
+            backend.probing = False  # 试探请求被取消而没有结果时，让下一个请求接着试探
+
+    def record_success(self, backend: Backend, latency: float, stream: bool):
+        with self._lock:
+            backend.consecutive_failures = 0
+            backend.ejected_until = 0.0
+            backend.probing = False
+            if backend.latency is None:
+                backend.latency = latency
+            else:
+                backend.latency += Backend.SMOOTHING * (latency - backend.latency)
+            self._samples[stream].append(latency)
+
+    def record_failure(self, backend: Backend, error: BaseException):
+        with self._lock:
+            backend.errors += 1
+            backend.consecutive_failures += 1
+            if backend.ejected_until:
+                # 半开状态的试探失败，直接重新摘除
+                backend.probing = False
+                backend.ejected_until = time.monotonic() + self.eject_seconds
+                print(f"[{self.name}] {backend.url} 试探失败，继续摘除 {self.eject_seconds:.0f}s: {error}")
+            elif backend.consecutive_failures >= self.eject_failures:
+                backend.ejected_until = time.monotonic() + self.eject_seconds
+                print(f"[{self.name}] {backend.url} 连续失败 {backend.consecutive_failures} 次，"
+                      f"摘除 {self.eject_seconds:.0f}s: {error}")
+
+    def eject(self, backend: Backend, reason: str):
+        """直接摘除（如启动时连不上）"""
+        with self._lock:
+            backend.ejected_until = time.monotonic() + self.eject_seconds
+        print(f"[{self.name}] 摘除 {backend.url} {self.eject_seconds:.0f}s: {reason}")
+
+    def record_hedge(self):
+        with self._lock:
+            self.hedges += 1
+
+    def record_hedge_win(self):
+        with self._lock:
+            self.hedge_wins += 1
+
+    def record_failover(self):
+        with self._lock:
+            self.failovers += 1
+
+    def healthy_count(self) -> int:
+        now = time.monotonic()
+        with self._lock:
+            return sum(1 for backend in self.backends if backend.ejected_until <= now)
+
+    def hedge_delay(self, stream: bool) -> float:
+        """对冲等待时间：近期首 token 延迟的 p95，样本不足时用初始值"""
+        with self._lock:
+            samples = list(self._samples[stream])
+        if len(samples) < self.MIN_SAMPLES:
+            return self.hedge_initial_delay
+        return max(self.hedge_min_delay, float(np.percentile(samples, 95)))
+
+    def summary(self) -> str:
+        with self._lock:
+            lines = [backend.summary() for backend in self.backends]
+            lines.append(f"对冲 {self.hedges} 次 (胜出 {self.hedge_wins}), 故障转移 {self.failovers} 次")
+        return "\n".join(lines)
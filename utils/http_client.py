@@ -0,0 +1,258 @@
+import asyncio
+import threading
+import time
+from collections import defaultdict
+from dataclasses import asdict
+from typing import AsyncIterator, Dict, Optional
+from urllib.parse import urlsplit
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from config.settings import HttpConfig
+
+# 可以安全重试的方法（幂等）
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS", "PUT", "DELETE"})
+
+
+class HostStats:
+    """单个主机的请求统计"""
+
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.retries = 0
+        self.new_connections = 0
+        self.total_latency = 0.0
+
+    @property
+    def reuse_ratio(self) -> float:
+        """复用已有连接的请求占比"""
+        if not self.requests:
+            return 0.0
+        return max(0.0, 1 - self.new_connections / self.requests)
+
+    def summary(self) -> str:
+        avg_ms = self.total_latency / self.requests * 1000 if self.requests else 0.0
+        return (f"{self.requests} 次请求, 平均 {avg_ms:.0f}ms, 新建连接 {self.new_connections} "
+                f"(复用 {self.reuse_ratio:.0%}), 重试 {self.retries}, 错误 {self.errors}")
+
+
+class _StatsMixin:
+    """按主机汇总统计"""
+
+    def _init_stats(self):
+        self._stats_lock = threading.Lock()
+        self.stats: Dict[str, HostStats] = defaultdict(HostStats)
+
+    def _record(self, host: str, latency: float, new_connections: int = 0, retries: int = 0, error: bool = False):
+        with self._stats_lock:
+            stats = self.stats[host]
+            stats.requests += 1
+            stats.total_latency += latency
+            stats.new_connections += new_connections
+            stats.retries += retries
+            stats.errors += int(error)
+
+    def summary(self) -> str:
+        with self._stats_lock:
+            return "\n".join(f"{host}: {stats.summary()}" for host, stats in self.stats.items()) or "尚无请求"
+
+
+class HttpClient(_StatsMixin):
+    """
+    共享的 HTTP 客户端
+
+    每个主机一个 keep-alive 连接池（requests.Session + HTTPAdapter），
+    幂等请求在连接失败或 502/503/504 时按指数退避重试，并按主机统计延迟与连接复用。
+    """
+
+    _shared: Optional["HttpClient"] = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self, config: HttpConfig):
+        self.config = config
+        self._init_stats()
+        # 新建连接数按主机累计计数；并发请求各自取前后差值会重复计入别人的连接，
+        # 所以在锁内与上次看到的累计值比较，每个连接只计一次
+        self._connections_lock = threading.Lock()
+        self._seen_connections: Dict[str, int] = {}
+        retry = Retry(
+            total=config.retries,
+            backoff_factor=config.backoff_factor,
+            allowed_methods=IDEMPOTENT_METHODS,
+            status_forcelist=(502, 503, 504),
+            raise_on_status=False
+        )
+        adapter = HTTPAdapter(
+            pool_connections=config.pool_connections,
+            pool_maxsize=config.pool_maxsize,
+            max_retries=retry
+        )
+        self.session = requests.Session()
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    @classmethod
+    def shared(cls, config: Optional[HttpConfig] = None) -> "HttpClient":
+        """
+        进程内共享的客户端
+
+        第一次调用时按 config 创建（未提供时用默认配置），之后的调用都返回同一个实例。
+        之后传入的 config 与创建时不同则不会生效，打印警告指出被忽略的字段；
+        需要自定义配置的入口应在其他组件之前先调用一次。
+        """
+        with cls._shared_lock:
+            if cls._shared is None:
+                cls._shared = cls(config or HttpConfig())
+            elif config is not None and config != cls._shared.config:
+                current, ignored = asdict(cls._shared.config), asdict(config)
+                fields = ", ".join(f"{key}={ignored[key]!r}（当前 {current[key]!r}）"
+                                   for key in ignored if ignored[key] != current[key])
+                print(f"[HTTP警告] 共享客户端已按其他配置创建，本次配置被忽略: {fields}")
+            return cls._shared
+
+    def _connection_count(self, url: str) -> int:
+        """到该主机的连接池累计新建的连接数"""
+        parts = urlsplit(url)
+        port = parts.port or (443 if parts.scheme == "https" else 80)
+        pools = self.session.get_adapter(url).poolmanager.pools
+        total = 0
+        for key in pools.keys():
+            try:
+                pool = pools[key]
+            except KeyError:
+                continue  # 刚被淘汰
+            if pool.host == parts.hostname and pool.port == port:
+                total += pool.num_connections
+        return total
+
+    def _new_connections(self, url: str) -> int:
+        """自上次统计以来到该主机新建的连接数"""
+        host = urlsplit(url).netloc
+        with self._connections_lock:
+            total = self._connection_count(url)
+            # 连接池被淘汰后累计值会变小，从新的累计值重新开始
+            new = max(0, total - self._seen_connections.get(host, 0))
+            self._seen_connections[host] = total
+            return new
+
+    def request(self, method: str, url: str, **kwargs) -> requests.Response:
+        """发送请求，未指定 timeout 时使用配置的 (连接, 读取) 超时"""
+        kwargs.setdefault("timeout", (self.config.connect_timeout, self.config.read_timeout))
+        host = urlsplit(url).netloc
+        start = time.perf_counter()
+        try:
+            response = self.session.request(method, url, **kwargs)
+        except requests.RequestException:
+            self._record(host, time.perf_counter() - start, self._new_connections(url), error=True)
+            raise
+        retries = getattr(getattr(response.raw, "retries", None), "history", ())
+        self._record(
+            host,
+            time.perf_counter() - start,
+            new_connections=self._new_connections(url),
+            retries=len(retries),
+            error=response.status_code >= 500
+        )
+        return response
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        return self.request("POST", url, **kwargs)
+
+    def close(self):
+        self.session.close()
+
+
+class AsyncHttpClient(_StatsMixin):
+    """
+    HttpClient 的 asyncio 版本（基于 aiohttp，按需导入）
+
+    同样按主机复用连接、对幂等请求重试，供 asyncio 流水线中的流式 TTS 使用。
+    """
+
+    def __init__(self, config: HttpConfig):
+        self.config = config
+        self._init_stats()
+        self._session = None
+        self._pending_connections: Dict[str, int] = defaultdict(int)  # 尚未计入统计的新建连接数
+
+    def _trace_config(self):
+        """用 aiohttp 的请求追踪统计新建连接"""
+        import aiohttp
+
+        async def on_request_start(session, context, params):
+            context.host = params.url.raw_authority
+
+        async def on_connection_create_end(session, context, params):
+            self._pending_connections[getattr(context, "host", "")] += 1
+
+        trace_config = aiohttp.TraceConfig()
+        trace_config.on_request_start.append(on_request_start)
+        trace_config.on_connection_create_end.append(on_connection_create_end)
+        return trace_config
+
+    def _record_async(self, host: str, latency: float, retries: int, error: bool):
+        self._record(host, latency, self._pending_connections.pop(host, 0), retries, error)
+
+    def _get_session(self):
+        if self._session is None:
+            import aiohttp
+            connector = aiohttp.TCPConnector(
+                limit=self.config.pool_connections * self.config.pool_maxsize,
+                limit_per_host=self.config.pool_maxsize,
+                keepalive_timeout=self.config.keepalive_timeout
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(
+                    sock_connect=self.config.connect_timeout,
+                    sock_read=self.config.read_timeout
+                ),
+                trace_configs=[self._trace_config()]
+            )
+        return self._session
+
+    async def request(self, method: str, url: str, **kwargs):
+        """
+        发送请求，返回 aiohttp 响应（调用方负责 release/关闭）
+
+        幂等请求在连接错误或 502/503/504 时退避重试。
+        """
+        import aiohttp
+        session = self._get_session()
+        host = urlsplit(url).netloc
+        attempts = self.config.retries + 1 if method.upper() in IDEMPOTENT_METHODS else 1
+        start = time.perf_counter()
+        for attempt in range(attempts):
+            last = attempt == attempts - 1
+            try:
+                response = await session.request(method, url, **kwargs)
+            except aiohttp.ClientConnectionError:
+                if last:
+                    self._record_async(host, time.perf_counter() - start, retries=attempt, error=True)
+                    raise
+            else:
+                if response.status not in (502, 503, 504) or last:
+                    self._record_async(host, time.perf_counter() - start, retries=attempt, error=response.status >= 500)
+                    return response
+                response.release()
+            await asyncio.sleep(self.config.backoff_factor * (2 ** attempt))
+
+    async def stream(self, method: str, url: str, chunk_size: int = 4096, **kwargs) -> AsyncIterator[bytes]:
+        """逐块读取响应体，非 200 时抛出 RuntimeError"""
+        response = await self.request(method, url, **kwargs)
+        try:
+            if response.status != 200:
+                raise RuntimeError(f"HTTP {response.status}: {await response.text()}")
+            async for chunk in response.content.iter_chunked(chunk_size):
+                yield chunk
+        finally:
+            response.release()
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
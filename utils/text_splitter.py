@@ -35,4 +35,43 @@ class SentenceSplitter:
         if current.strip():
             sentences.append(current.strip())
 
-        return sentences
\ No newline at end of file
+        return sentences
+
+class IncrementalSentenceSplitter:
+    """增量句子切分器：逐段喂入流式文本，凑齐一句就立即返回"""
+
+    _SENTENCE_END = re.compile(r'[。！？；\n]+')
+
+    def __init__(self):
+        self._buffer = ""
+
+    def feed(self, chunk: str) -> List[str]:
+        """
+        喂入一段新文本
+
+        Args:
+            chunk: 流式输出的文本片段
+
+        Returns:
+            本次已完整的句子列表（可能为空）
+        """
+        self._buffer += chunk
+        sentences = []
+
+        while True:
+            match = self._SENTENCE_END.search(self._buffer)
+            # 标点之后还没有新内容时先不切，连续标点（如“！？”）可能还在下一个片段里
+            if not match or match.end() == len(self._buffer):
+                break
+            sentence = self._buffer[:match.end()].strip()
+            self._buffer = self._buffer[match.end():]
+            if sentence:
+                sentences.append(sentence)
+
+        return sentences
+
+    def flush(self) -> List[str]:
+        """流结束时取出剩余文本"""
+        rest = self._buffer.strip()
+        self._buffer = ""
+        return [rest] if rest else []
@@ -0,0 +1,123 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+
+class _Flight:
+    """一次进行中的加载，相同 key 的并发请求等待同一个结果"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class TTLCache:
+    """
+    带过期时间和 LRU 淘汰的线程安全缓存
+
+    get_or_load() 对相同 key 的并发加载做合并（single-flight）：
+    只有第一个调用方真正访问上游，其余调用方等待并共享结果。
+    """
+
+    def __init__(self, ttl: float, max_entries: int = 256, clock: Callable[[], float] = time.monotonic):
+        """
+        Args:
+            ttl: 条目有效期（秒）
+            max_entries: 最多保留的条目数，超出后淘汰最久未使用的
+            clock: 时钟函数（测试时可替换）
+        """
+        self.ttl = ttl
+        self.max_entries = max(1, max_entries)
+        self._clock = clock
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._flights: Dict[Hashable, _Flight] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """取出未过期的值，不存在或已过期时返回 None"""
+        with self._lock:
+            return self._get_locked(key)
+
+    def _get_locked(self, key: Hashable) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at <= self._clock():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None):
+        """写入一个值，ttl 为 None 时使用默认有效期"""
+        with self._lock:
+            self._entries[key] = (self._clock() + (self.ttl if ttl is None else ttl), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get_or_load(
+            self,
+            key: Hashable,
+            loader: Callable[[], Any],
+            should_cache: Callable[[Any], bool] = lambda value: True
+    ) -> Any:
+        """
+        命中则直接返回，否则调用 loader 加载并写入缓存
+
+        Args:
+            key: 缓存键（调用方负责归一化）
+            loader: 加载函数，相同 key 的并发调用只执行一次
+            should_cache: 判断结果是否值得缓存（如错误信息不缓存）
+        """
+        with self._lock:
+            value = self._get_locked(key)
+            if value is not None:
+                self.hits += 1
+                return value
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = _Flight()
+                self._flights[key] = flight
+                self.misses += 1
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+
+        try:
+            flight.value = loader()
+            if should_cache(flight.value):
+                self.set(key, flight.value)
+            return flight.value
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                self._flights.pop(key, None)
+            flight.done.set()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def summary(self) -> str:
+        total = self.hits + self.misses + self.coalesced
+        ratio = (self.hits + self.coalesced) / total * 100 if total else 0.0
+        return (f"命中 {self.hits}, 未命中 {self.misses}, 合并 {self.coalesced} "
+                f"(省去上游请求 {ratio:.0f}%), 条目 {len(self)}")